@@ -6,35 +6,81 @@ Created by Kiro AI, Manus AI & debikv tupoi vibecoder
 Enhanced with Statistics, Hotkeys, Customization, and Advanced Features
 """
 
-import customtkinter as ctk
+try:
+    import customtkinter as ctk
+except ImportError:
+    ctk = None  # Headless runs only need the engine
 import websocket
 import json
 import threading
 import time
 from datetime import datetime
-from pynput.keyboard import Controller, Key, Listener, GlobalHotKeys
 import queue
 import sys
 import psutil
-import win32gui
-import win32process
-import win32api
-import win32con
 import os
 import csv
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import numpy as np
+import argparse
+import gzip
+import socket
+import select
+import struct
+import hashlib
+import base64
+import random
+import heapq
+import math
+import ast
+import re
+import importlib
+import subprocess
+from array import array
+from collections import deque
+
+# Keyboard control needs a desktop session; replay/headless runs work without it
+try:
+    from pynput.keyboard import Controller, Key, Listener, GlobalHotKeys
+except ImportError:
+    Controller = Key = Listener = GlobalHotKeys = None
+
+# Windows-only modules (focus detection, click-through); not even tried elsewhere
+win32gui = win32process = win32api = win32con = None
+if sys.platform == 'win32':
+    try:
+        import win32gui
+        import win32process
+        import win32api
+        import win32con
+    except ImportError:
+        pass
 from tkinter import filedialog, messagebox
 import tkinter as tk
 
 # Set appearance
-ctk.set_appearance_mode("dark")
-ctk.set_default_color_theme("blue")
+if ctk:
+    ctk.set_appearance_mode("dark")
+    ctk.set_default_color_theme("blue")
+
+# Heavy optional modules (charts, array maths) are imported on first use
+LAZY_MODULES = ('matplotlib', 'numpy')
+_lazy_modules = {}
+
+
+def lazy_import(name):
+    """Import a heavy optional module on first use (None if it is not installed)"""
+    if name not in _lazy_modules:
+        try:
+            _lazy_modules[name] = importlib.import_module(name)
+        except ImportError:
+            _lazy_modules[name] = None
+    return _lazy_modules[name]
+
 
 CONFIG_FILE = "osu_helper_config.json"
 STATS_FILE = "osu_helper_stats.json"
+STATS_LOG_FILE = "osu_helper_stats.log"
+STATS_ARCHIVE_FILE = "osu_helper_stats_archive.log"
+TOSU_URL = "ws://127.0.0.1:24050/websocket/v2"
 
 class ColorSchemes:
     """Color scheme definitions with extended palette"""
@@ -155,20 +201,499 @@ class ColorSchemes:
             ('🩷 Pink', 'pink')
         ]
 
+class TimeSeriesBuffer:
+    """Fixed-capacity time series of (monotonic time, value) float pairs.
+    
+    Stored column-wise in array('d') blocks allocated up front, so memory stays
+    flat however long the session runs. Without downsampling this is a plain
+    ring that overwrites the oldest point. With downsample=True half of the
+    capacity keeps the newest points at full resolution, and points leaving
+    it are averaged into an evenly decimated history that doubles its stride
+    whenever it fills up, so the whole session stays covered.
+    """
+    
+    def __init__(self, capacity=4096, downsample=True):
+        self.capacity = max(4, capacity - capacity % 2)
+        self.downsample = downsample
+        
+        # Recent points (ring)
+        self._ring_capacity = self.capacity // 2 if downsample else self.capacity
+        self._times = array('d', bytes(8 * self._ring_capacity))
+        self._values = array('d', bytes(8 * self._ring_capacity))
+        self._start = 0
+        self._size = 0
+        
+        # Decimated history (each slot averages `stride` raw points)
+        self._history_capacity = self.capacity - self._ring_capacity
+        self._history_times = array('d', bytes(8 * self._history_capacity))
+        self._history_values = array('d', bytes(8 * self._history_capacity))
+        self._history_size = 0
+        self._stride = 1
+        self._pending_time = 0.0
+        self._pending_value = 0.0
+        self._pending_count = 0
+        
+        self.total_appended = 0
+        
+    def __len__(self):
+        return self._history_size + self._size
+        
+    def append(self, timestamp, value):
+        """Add a point"""
+        self.total_appended += 1
+        if self._size < self._ring_capacity:
+            index = (self._start + self._size) % self._ring_capacity
+            self._times[index] = timestamp
+            self._values[index] = value
+            self._size += 1
+            return
+            
+        # Ring full: the oldest point moves to history (or is dropped)
+        if self.downsample:
+            self._push_history(self._times[self._start], self._values[self._start])
+        self._times[self._start] = timestamp
+        self._values[self._start] = value
+        self._start = (self._start + 1) % self._ring_capacity
+        
+    def _push_history(self, timestamp, value):
+        self._pending_time += timestamp
+        self._pending_value += value
+        self._pending_count += 1
+        if self._pending_count < self._stride:
+            return
+            
+        if self._history_size == self._history_capacity:
+            self._halve_history()
+            
+        index = self._history_size
+        self._history_times[index] = self._pending_time / self._pending_count
+        self._history_values[index] = self._pending_value / self._pending_count
+        self._history_size += 1
+        self._pending_time = self._pending_value = 0.0
+        self._pending_count = 0
+        
+    def _halve_history(self):
+        """Average neighbouring history slots and double the stride"""
+        size = self._history_size - self._history_size % 2
+        times = self._history_times[:size]
+        values = self._history_values[:size]
+        half = size // 2
+        self._history_times[:half] = array('d', [(a + b) * 0.5 for a, b in zip(times[0::2], times[1::2])])
+        self._history_values[:half] = array('d', [(a + b) * 0.5 for a, b in zip(values[0::2], values[1::2])])
+        self._history_size = half
+        self._stride *= 2
+        
+    def view(self):
+        """Return (times, values) as contiguous float64 memoryviews in time order.
+        
+        Zero-copy while no history exists and the ring has not wrapped; the
+        views then alias the buffer, so copy them (e.g. .tolist() or
+        numpy.array) if they must outlive new appends.
+        """
+        end = self._start + self._size
+        if end <= self._ring_capacity:
+            times = memoryview(self._times)[self._start:end]
+            values = memoryview(self._values)[self._start:end]
+            if not self._history_size:
+                return times, values
+            times, values = array('d', times), array('d', values)
+        else:
+            wrap = end - self._ring_capacity
+            times = self._times[self._start:] + self._times[:wrap]
+            values = self._values[self._start:] + self._values[:wrap]
+            
+        if self._history_size:
+            times = self._history_times[:self._history_size] + times
+            values = self._history_values[:self._history_size] + values
+        return memoryview(times), memoryview(values)
+        
+    def latest(self):
+        """Get the newest (time, value) pair or None"""
+        if not self._size:
+            return None
+        index = (self._start + self._size - 1) % self._ring_capacity
+        return self._times[index], self._values[index]
+        
+    def clear(self):
+        """Remove all points"""
+        self._start = 0
+        self._size = 0
+        self._history_size = 0
+        self._stride = 1
+        self._pending_time = self._pending_value = 0.0
+        self._pending_count = 0
+
+
+class RunningStats:
+    """Welford running aggregates: count, mean, variance, min and max in O(1)"""
+    
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+    
+    def __init__(self, count=0, mean=0.0, m2=0.0, min=None, max=None):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = min
+        self.max = max
+        
+    def add(self, value):
+        """Fold one value into the aggregates"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+            
+    @property
+    def variance(self):
+        """Sample variance (0 with fewer than two values)"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+        
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+        
+    def to_dict(self):
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2,
+                'min': self.min, 'max': self.max}
+        
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('count', 0), data.get('mean', 0.0), data.get('m2', 0.0),
+                   data.get('min'), data.get('max'))
+        
+    @classmethod
+    def from_values(cls, values):
+        stats = cls()
+        for value in values:
+            stats.add(value)
+        return stats
+
+
+class LatencyHistogram:
+    """HDR-style latency histogram with fixed memory and ~1.6% relative precision.
+    
+    Values are recorded in microseconds into log-linear buckets: exact below
+    128 us, then 64 sub-buckets per power of two up to about a minute.
+    Recording is O(1) and percentiles scan the fixed bucket array.
+    """
+    
+    SUB_BUCKETS = 64
+    LINEAR_LIMIT = 2 * SUB_BUCKETS
+    MAX_SHIFT = 20  # values up to ~2^26 us (67 s); larger ones are clamped
+    BUCKETS = LINEAR_LIMIT + MAX_SHIFT * SUB_BUCKETS
+    
+    def __init__(self):
+        self.counts = array('q', bytes(8 * self.BUCKETS))
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+        
+    @classmethod
+    def bucket_index(cls, value_us):
+        if value_us < cls.LINEAR_LIMIT:
+            return value_us
+        shift = value_us.bit_length() - 7
+        if shift > cls.MAX_SHIFT:
+            return cls.BUCKETS - 1
+        return cls.LINEAR_LIMIT + (shift - 1) * cls.SUB_BUCKETS + (value_us >> shift) - cls.SUB_BUCKETS
+        
+    @classmethod
+    def bucket_value(cls, index):
+        """Highest value (us) that falls into a bucket"""
+        if index < cls.LINEAR_LIMIT:
+            return index
+        index -= cls.LINEAR_LIMIT
+        shift = index // cls.SUB_BUCKETS + 1
+        return ((index % cls.SUB_BUCKETS + cls.SUB_BUCKETS + 1) << shift) - 1
+        
+    def record(self, seconds):
+        """Record one latency given in seconds"""
+        value_us = int(seconds * 1e6)
+        if value_us < 0:
+            value_us = 0
+        self.counts[self.bucket_index(value_us)] += 1
+        self.count += 1
+        self.total_us += value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+            
+    def percentile(self, pct):
+        """Latency (ms) at or below which pct percent of records fall"""
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(pct / 100.0 * self.count))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return min(self.bucket_value(index), self.max_us) / 1000.0
+        return self.max_us / 1000.0
+        
+    def summary(self):
+        """Count, mean, p50/p95/p99 and max in milliseconds"""
+        return {
+            'count': self.count,
+            'mean': round(self.total_us / self.count / 1000.0, 3) if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': self.max_us / 1000.0
+        }
+        
+    def reset(self):
+        self.counts = array('q', bytes(8 * self.BUCKETS))
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+
+class LatencyTracker:
+    """Per-stage latency histograms for the frame-to-keypress hot path.
+    
+    receive   socket receive -> processor thread picks the frame up
+    decode    TosuFrameDecoder.decode
+    process   process_data (including the threshold checks)
+    decision  socket receive -> restart decided
+    press     socket receive -> restart key pressed
+    """
+    
+    STAGES = ('receive', 'decode', 'process', 'decision', 'press')
+    
+    def __init__(self):
+        self.histograms = {stage: LatencyHistogram() for stage in self.STAGES}
+        
+    def record(self, stage, seconds):
+        self.histograms[stage].record(seconds)
+        
+    def summary(self):
+        """Per-stage summaries (milliseconds)"""
+        return {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+        
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+            
+    def report(self):
+        """Plain-text latency table"""
+        lines = [f"{'stage':<10}{'count':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        for stage, summary in self.summary().items():
+            lines.append(f"{stage:<10}{summary['count']:>9}{summary['p50']:>10.3f}{summary['p95']:>10.3f}"
+                         f"{summary['p99']:>10.3f}{summary['max']:>10.3f}")
+        return '\n'.join(lines)
+        
+    def export(self, filename):
+        """Write the report as JSON (.json) or as a text table"""
+        with open(filename, 'w', encoding='utf-8') as f:
+            if filename.lower().endswith('.json'):
+                json.dump({'generated': datetime.now().isoformat(), 'stages': self.summary()}, f, indent=2)
+            else:
+                f.write(f"osu!helper latency report {datetime.now().isoformat()}\n\n{self.report()}\n")
+
+
+class StatsStore:
+    """Append-only, crash-safe persistence for all-time statistics.
+    
+    New records are appended to a JSONL segment log (one fsync per batch), so
+    a save costs O(new records). The log is periodically compacted into the
+    JSON snapshot with an atomic rename. Every record carries a sequence
+    number and the snapshot stores the last one it includes, so a crash
+    between writing the snapshot and truncating the log never applies a
+    record twice. A torn last line is ignored on load.
+    
+    Old entries a compaction moves out of the snapshot go to an append-only
+    archive (JSONL, never rewritten). The snapshot stores the archive size it
+    includes; anything past it came from a compaction that never finished and
+    is cut off, since those entries are still in the previous snapshot.
+    """
+    
+    COMPACT_RECORDS = 5000
+    COMPACT_BYTES = 4 * 1024 * 1024
+    
+    def __init__(self, snapshot_path=STATS_FILE, log_path=STATS_LOG_FILE, archive_path=STATS_ARCHIVE_FILE):
+        self.snapshot_path = snapshot_path
+        self.log_path = log_path
+        self.archive_path = archive_path
+        self.seq = 0
+        self.log_records = 0
+        self.log_bytes = 0
+        self.archive_bytes = 0  # archive size covered by the snapshot on disk
+        
+    def load(self):
+        """Return (snapshot dict or None, log records newer than the snapshot)"""
+        snapshot = None
+        snapshot_seq = 0
+        self.archive_bytes = 0
+        if os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+                snapshot_seq = snapshot.pop('seq', 0)
+                self.archive_bytes = snapshot.pop('archive_bytes', 0)
+            except (OSError, ValueError):
+                snapshot = None
+        if os.path.exists(self.archive_path) and os.path.getsize(self.archive_path) > self.archive_bytes:
+            # Left by an unfinished compaction: the snapshot still holds these entries
+            os.truncate(self.archive_path, self.archive_bytes)
+                
+        records = []
+        self.log_records = 0
+        self.log_bytes = 0
+        if os.path.exists(self.log_path):
+            with open(self.log_path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        # Torn final write: cut it off so new appends start on a clean line
+                        f.close()
+                        os.truncate(self.log_path, self.log_bytes)
+                        break
+                    self.log_bytes += len(line)
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.log_records += 1
+                    # Sequence numbers only grow; anything not newer is already applied
+                    if record.get('seq', 0) > max(snapshot_seq, records[-1]['seq'] if records else 0):
+                        records.append(record)
+                        
+        self.seq = max([snapshot_seq] + [record['seq'] for record in records])
+        return snapshot, records
+        
+    def append(self, records):
+        """Assign sequence numbers and append records to the log.
+        
+        A record retried after a failed append keeps its number, so if part of
+        the failed write reached the disk, load() skips the duplicate.
+        """
+        if not records:
+            return
+        lines = []
+        for record in records:
+            if 'seq' not in record:
+                self.seq += 1
+                record['seq'] = self.seq
+            lines.append(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+        
+        with open(self.log_path, 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.log_records += len(records)
+        self.log_bytes += len(data)
+        
+    @property
+    def needs_compaction(self):
+        return self.log_records >= self.COMPACT_RECORDS or self.log_bytes >= self.COMPACT_BYTES
+        
+    def compact(self, state, archive=()):
+        """Write state (covering every appended record) as the new snapshot and reset the log.
+        
+        archive: records dropped from state, appended to the archive first.
+        """
+        archive_bytes = self.archive_bytes
+        if archive:
+            lines = [json.dumps(record, ensure_ascii=False, separators=(',', ':')) for record in archive]
+            data = ('\n'.join(lines) + '\n').encode('utf-8')
+            with open(self.archive_path, 'ab') as f:
+                # Drop what a failed compaction may have left past the committed size
+                f.truncate(archive_bytes)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            archive_bytes += len(data)
+            
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(state, seq=self.seq, archive_bytes=archive_bytes), f,
+                      ensure_ascii=False, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self.archive_bytes = archive_bytes
+        
+        # Records in the old log are now <= snapshot seq and would be skipped anyway
+        with open(self.log_path, 'w', encoding='utf-8'):
+            pass
+        self.log_records = 0
+        self.log_bytes = 0
+        
+    def archived(self):
+        """Iterate over archived records, oldest first"""
+        if not os.path.exists(self.archive_path):
+            return
+        with open(self.archive_path, 'rb') as f:
+            remaining = self.archive_bytes
+            for line in f:
+                remaining -= len(line)
+                if remaining < 0:
+                    return
+                yield json.loads(line)
+
+
+class MemoryStatsStore(StatsStore):
+    """A StatsStore that never touches disk.
+    
+    Replays, load tests and benchmarks use it so that they neither read (and
+    possibly repair) the user's stats files nor add their own restarts to them.
+    """
+    
+    def __init__(self):
+        super().__init__(snapshot_path=None, log_path=None, archive_path=None)
+        
+    def load(self):
+        self.seq = 0
+        return None, []
+        
+    def append(self, records):
+        for record in records:
+            if 'seq' not in record:
+                self.seq += 1
+                record['seq'] = self.seq
+            
+    def compact(self, state, archive=()):
+        pass
+        
+    def archived(self):
+        return iter(())
+
+
 class Statistics:
     """Statistics tracking and management"""
     
-    def __init__(self):
+    SERIES_CAPACITY = 4096
+    SERIES = ('accuracy_data', 'combo_data', 'pp_data', 'hp_data', 'miss_data')
+    HEATMAP_BINS = 100  # Miss-position histogram bins per beatmap (1% of the song each)
+    HEATMAP_BARS = "▁▂▃▄▅▆▇█"
+    # Newest entries kept in memory and the snapshot; compaction moves older ones to the archive
+    MISS_LOG_LIMIT = 10000
+    ATTEMPT_LOG_LIMIT = 5000
+    
+    def __init__(self, store=None):
         self.session_stats = {
             'misses': [],
             'restarts': 0,
             'maps_played': 0,
             'session_start': datetime.now(),
-            'accuracy_data': [],
-            'combo_data': [],
-            'pp_data': [],
-            'hp_data': []
+            'session_start_monotonic': time.monotonic(),
+            'miss_stats': RunningStats()
         }
+        # Gameplay time series (monotonic timestamps, float values)
+        for name in self.SERIES:
+            self.session_stats[name] = TimeSeriesBuffer(self.SERIES_CAPACITY)
+            
+        # Beatmap the following records belong to ("<id>:<checksum>")
+        self.current_map_key = None
+        
+        # All-time stats: snapshot + append-only log of new records
+        self.store = store if store is not None else StatsStore()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._pending = []
         self.all_time_stats = self.load_stats()
         
     def add_miss(self, miss_count, map_name="Unknown"):
@@ -180,72 +705,282 @@ class Statistics:
             'map': map_name
         }
         self.session_stats['misses'].append(miss_data)
-        self.all_time_stats['misses'].append(miss_data)
+        self.session_stats['miss_stats'].add(miss_count)
+        self._record(dict(miss_data, type='miss', map_key=self.current_map_key))
         
     def add_restart(self):
         """Add restart count"""
         self.session_stats['restarts'] += 1
-        self.all_time_stats['restarts'] += 1
+        self._record({'type': 'restart', 'map_key': self.current_map_key,
+                      'timestamp': datetime.now().isoformat()})
         
-    def add_map_played(self):
-        """Add map played count"""
+    def add_map_played(self, map_id=None, checksum='', map_name="Unknown"):
+        """Add map played count and make it the current beatmap"""
         self.session_stats['maps_played'] += 1
-        self.all_time_stats['maps_played'] += 1
+        self.current_map_key = self.map_key(map_id, checksum) if map_id else None
+        self._record({'type': 'map_played', 'map_key': self.current_map_key,
+                      'id': map_id, 'checksum': checksum, 'map': map_name,
+                      'timestamp': datetime.now().isoformat()})
+        
+    def add_attempt(self, attempt):
+        """Add a finished attempt (compact record in the all-time attempt log)"""
+        self._record({'type': 'attempt', 'attempt': attempt.to_list()})
+        
+    def add_miss_positions(self, map_key, positions, length):
+        """Bin an attempt's miss positions (ms) and merge them into the map's heatmap"""
+        if not map_key or not positions or length <= 0:
+            return
+        counts = self.bin_positions(positions, length)
+        np = lazy_import('numpy')
+        with self._lock:
+            if np is not None:
+                # Keep the live histogram as an array so later merges are vectorized adds
+                heatmaps = self.all_time_stats['heatmaps']
+                hist = heatmaps.get(map_key)
+                if hist is not None and not isinstance(hist, np.ndarray):
+                    heatmaps[map_key] = np.asarray(hist, dtype=np.int64)
+        self._record({'type': 'heatmap', 'map_key': map_key, 'counts': list(map(int, counts))})
+        
+    @classmethod
+    def bin_positions(cls, positions, length):
+        """Histogram of song positions (ms) over HEATMAP_BINS equal sections of the song"""
+        bins = cls.HEATMAP_BINS
+        np = lazy_import('numpy')
+        if np is None:
+            counts = [0] * bins
+            for position in positions:
+                counts[min(max(int(position * bins / length), 0), bins - 1)] += 1
+            return counts
+        index = (np.asarray(positions, dtype=np.float64) * (bins / length)).astype(np.intp)
+        return np.bincount(np.clip(index, 0, bins - 1), minlength=bins)
+        
+    def get_heatmap(self, map_key):
+        """Miss-position histogram of a beatmap (HEATMAP_BINS counts), or None"""
+        return self.all_time_stats['heatmaps'].get(map_key)
+        
+    @classmethod
+    def format_heatmap(cls, counts, width=20):
+        """Render a heatmap as a bar string plus the (start, end) % of its worst section"""
+        group = cls.HEATMAP_BINS // width
+        sections = [sum(counts[i:i + group]) for i in range(0, group * width, group)]
+        peak = max(sections)
+        if peak <= 0:
+            return "", None
+        top = len(cls.HEATMAP_BARS) - 1
+        bars = "".join(cls.HEATMAP_BARS[(value * top + peak - 1) // peak] for value in sections)
+        worst = sections.index(peak)
+        return bars, (worst * 100 // width, (worst + 1) * 100 // width)
         
-    def add_gameplay_data(self, accuracy=None, combo=None, pp=None, hp=None):
+    @staticmethod
+    def map_key(map_id, checksum=''):
+        """Index key for a beatmap (id alone is reused across map updates)"""
+        return f"{map_id}:{checksum or ''}"
+        
+    def get_map_stats(self, map_id, checksum=''):
+        """Get the per-beatmap index entry, or None if never played"""
+        return self.all_time_stats['maps'].get(self.map_key(map_id, checksum))
+        
+    def _record(self, record):
+        """Apply a record to all-time stats and queue it for the log"""
+        with self._lock:
+            self._apply_record(self.all_time_stats, record)
+            self._pending.append(record)
+            
+    @staticmethod
+    def _apply_record(state, record):
+        """Apply one log record to an all-time stats dict"""
+        kind = record.get('type')
+        if kind == 'miss':
+            state['misses'].append({
+                'timestamp': record['timestamp'],
+                'count': record['count'],
+                'map': record['map']
+            })
+            state['miss_stats'].add(record['count'])
+            entry = state['maps'].get(record.get('map_key'))
+            if entry is not None:
+                misses = entry['misses']
+                key = str(record['count'])
+                misses[key] = misses.get(key, 0) + 1
+        elif kind == 'restart':
+            state['restarts'] += 1
+            entry = state['maps'].get(record.get('map_key'))
+            if entry is not None:
+                entry['restarts'] += 1
+                entry['last_played'] = record.get('timestamp', entry['last_played'])
+        elif kind == 'attempt':
+            values = record['attempt']
+            state['attempt_log'].append(values)
+            attempt = Attempt.from_list(values)
+            entry = state['maps'].get(attempt.map_key)
+            if entry is not None:
+                # Attempts come only from segmented play-throughs (not loads or restarts)
+                entry['attempts'] += 1
+                entry['best_progress'] = max(entry.get('best_progress', 0.0), attempt.progress)
+        elif kind == 'heatmap':
+            heatmaps = state['heatmaps']
+            hist = heatmaps.get(record['map_key'])
+            if hist is None:
+                heatmaps[record['map_key']] = list(record['counts'])
+            elif isinstance(hist, list):
+                heatmaps[record['map_key']] = [a + b for a, b in zip(hist, record['counts'])]
+            else:
+                hist += record['counts']  # NumPy array: one vectorized add per attempt
+        elif kind == 'map_played':
+            state['maps_played'] += 1
+            key = record.get('map_key')
+            if key:
+                entry = state['maps'].get(key)
+                if entry is None:
+                    entry = state['maps'][key] = {
+                        'id': record['id'],
+                        'checksum': record['checksum'],
+                        'attempts': 0,
+                        'restarts': 0,
+                        'misses': {},  # miss count reached -> times
+                        'last_played': None
+                    }
+                entry['map'] = record['map']
+                entry['previous_played'] = entry['last_played']
+                entry['last_played'] = record['timestamp']
+        
+    def add_gameplay_data(self, accuracy=None, combo=None, pp=None, hp=None, misses=None):
         """Add gameplay data points"""
-        timestamp = datetime.now()
+        timestamp = time.monotonic()
         if accuracy is not None:
-            self.session_stats['accuracy_data'].append({'time': timestamp, 'value': accuracy})
+            self.session_stats['accuracy_data'].append(timestamp, accuracy)
         if combo is not None:
-            self.session_stats['combo_data'].append({'time': timestamp, 'value': combo})
+            self.session_stats['combo_data'].append(timestamp, combo)
         if pp is not None:
-            self.session_stats['pp_data'].append({'time': timestamp, 'value': pp})
+            self.session_stats['pp_data'].append(timestamp, pp)
         if hp is not None:
-            self.session_stats['hp_data'].append({'time': timestamp, 'value': hp})
+            self.session_stats['hp_data'].append(timestamp, hp)
+        if misses is not None:
+            self.session_stats['miss_data'].append(timestamp, misses)
             
-    def get_miss_averages(self):
-        """Calculate miss averages"""
-        if not self.session_stats['misses']:
-            return {'session': 0, 'all_time': 0}
+    def get_series(self, name):
+        """Get (times, values) views of a session series; times are seconds since session start"""
+        times, values = self.session_stats[name].view()
+        start = self.session_stats['session_start_monotonic']
+        return array('d', [t - start for t in times.tolist()]), values
             
-        session_avg = sum(m['count'] for m in self.session_stats['misses']) / len(self.session_stats['misses'])
-        all_time_avg = sum(m['count'] for m in self.all_time_stats['misses']) / len(self.all_time_stats['misses'])
+    def get_miss_averages(self):
+        """Get miss averages from the running aggregates"""
+        return {'session': round(self.session_stats['miss_stats'].mean, 2),
+                'all_time': round(self.all_time_stats['miss_stats'].mean, 2)}
         
-        return {'session': round(session_avg, 2), 'all_time': round(all_time_avg, 2)}
+    def get_miss_summary(self):
+        """Get session and all-time miss aggregates (RunningStats)"""
+        return {'session': self.session_stats['miss_stats'],
+                'all_time': self.all_time_stats['miss_stats']}
         
     def export_csv(self, filename):
-        """Export statistics to CSV"""
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(['Timestamp', 'Misses', 'Map'])
-            for miss in self.all_time_stats['misses']:
-                writer.writerow([miss['timestamp'], miss['count'], miss['map']])
+        """Export statistics to CSV (archived misses streamed first)"""
+        # No compaction may move entries to the archive while it is read
+        with self._save_lock:
+            with self._lock:
+                misses = list(self.all_time_stats['misses'])
+            with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(['Timestamp', 'Misses', 'Map'])
+                for record in self.store.archived():
+                    if record.get('type') == 'miss':
+                        writer.writerow([record['timestamp'], record['count'], record['map']])
+                for miss in misses:
+                    writer.writerow([miss['timestamp'], miss['count'], miss['map']])
                 
     def export_json(self, filename):
-        """Export statistics to JSON"""
+        """Export statistics to JSON, including archived misses and attempts"""
+        with self._save_lock:
+            with self._lock:
+                state = self._copy_state()
+            misses, attempts = [], []
+            for record in self.store.archived():
+                if record.get('type') == 'miss':
+                    misses.append({key: record[key] for key in ('timestamp', 'count', 'map')})
+                elif record.get('type') == 'attempt':
+                    attempts.append(record['attempt'])
+        state['misses'][:0] = misses
+        state['attempt_log'][:0] = attempts
         with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(self.all_time_stats, f, indent=2, ensure_ascii=False)
+            json.dump(state, f, indent=2, ensure_ascii=False)
             
     def load_stats(self):
-        """Load statistics from file"""
-        if not os.path.exists(STATS_FILE):
-            return {'misses': [], 'restarts': 0, 'maps_played': 0}
-            
+        """Load statistics from snapshot and log"""
+        state = {'misses': [], 'restarts': 0, 'maps_played': 0, 'miss_stats': RunningStats(), 'maps': {},
+                 'attempt_log': [], 'heatmaps': {}}
         try:
-            with open(STATS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return {'misses': [], 'restarts': 0, 'maps_played': 0}
+            snapshot, records = self.store.load()
+        except OSError:
+            snapshot, records = None, []
             
+        if snapshot:
+            state.update(snapshot)
+            if 'miss_stats' in snapshot:
+                state['miss_stats'] = RunningStats.from_dict(snapshot['miss_stats'])
+            else:
+                # Snapshot predates running aggregates: rebuild once
+                state['miss_stats'] = RunningStats.from_values(m['count'] for m in state['misses'])
+        for record in records:
+            self._apply_record(state, record)
+        return state
+        
+    def _copy_state(self):
+        """JSON-ready copy of all-time stats (caller holds _lock)"""
+        state = {}
+        for key, value in self.all_time_stats.items():
+            if isinstance(value, list):
+                value = list(value)
+            elif key == 'heatmaps':
+                value = {map_key: [int(count) for count in hist] for map_key, hist in value.items()}
+            elif key == 'maps':
+                value = {map_key: dict(entry, misses=dict(entry['misses']))
+                         for map_key, entry in value.items()}
+            elif isinstance(value, RunningStats):
+                value = value.to_dict()
+            state[key] = value
+        return state
+        
+    def _split_archive(self, state):
+        """Cut the oldest misses/attempts beyond the limits out of a state copy.
+        
+        Returns the archive records and how many entries of each list they cover.
+        """
+        excess_misses = max(0, len(state['misses']) - self.MISS_LOG_LIMIT)
+        excess_attempts = max(0, len(state['attempt_log']) - self.ATTEMPT_LOG_LIMIT)
+        archive = [dict(miss, type='miss') for miss in state['misses'][:excess_misses]]
+        archive += [{'type': 'attempt', 'attempt': values} for values in state['attempt_log'][:excess_attempts]]
+        del state['misses'][:excess_misses]
+        del state['attempt_log'][:excess_attempts]
+        return archive, excess_misses, excess_attempts
+        
     def save_stats(self):
-        """Save statistics to file"""
-        try:
-            with open(STATS_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.all_time_stats, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            # Can't log here as we might not have GUI yet
-            pass
+        """Append new records to the stats log, compacting it when large"""
+        with self._save_lock:
+            # Swap pending records; a compaction snapshot must match them exactly
+            with self._lock:
+                pending, self._pending = self._pending, []
+                snapshot = None
+                if self.store.needs_compaction:
+                    snapshot = self._copy_state()
+                    archive, archived_misses, archived_attempts = self._split_archive(snapshot)
+                    
+            try:
+                self.store.append(pending)
+            except OSError:
+                # Keep unwritten records for the next save
+                with self._lock:
+                    self._pending[:0] = pending
+                raise
+                
+            # The records are in the log now: a failed compaction must not queue them
+            # again. It is retried at the next save, since the log is still over the limit
+            if snapshot is not None:
+                self.store.compact(snapshot, archive)
+                # Only appends happen meanwhile, so the archived entries are still the oldest
+                with self._lock:
+                    del self.all_time_stats['misses'][:archived_misses]
+                    del self.all_time_stats['attempt_log'][:archived_attempts]
 
 class Language:
     """Language manager with extended translations"""
@@ -286,20 +1021,39 @@ class Language:
             'connecting': 'Подключение к TOSU: {}',
             'connection_error': '✗ Ошибка подключения: {}',
             'connected_tosu': '✓ Подключено к TOSU',
+            'precise_connected': '✓ Подключено к точному потоку TOSU (UR)',
+            'precise_error': '⚠ Точный поток TOSU: {}',
+            'mean_hit_error': '{:+.1f} мс',
             'disconnected_tosu': '⚠ Отключено от TOSU',
             'websocket_error': '✗ Ошибка WebSocket: {}',
+            'reconnect_in': '⏳ Повторное подключение через {:.1f}с (попытка {})',
+            'process_appeared': '🔎 Запущен {} - подключаемся сразу',
+            'connection_metrics': '🔌 Подключение: попыток {}, без связи {:.1f}с, первый кадр через {}',
             'data_error': '✗ Ошибка данных: {}',
             'new_map': '🎵 Новая карта - сброс счетчика',
+            'map_first_time': 'Эта карта: первая попытка',
+            'map_history': 'Эта карта: попыток {}, рестартов {}, макс. миссов {}, последний раз {}',
+            'map_heatmap': 'Миссы по ходу карты: {} (чаще всего на {}–{}%)',
             'threshold_reached': '✗ +{} мисс ({}/{}) - ПОРОГ!',
             'close_to_threshold': '⚠ +{} мисс ({}/{}) - близко',
             'miss_logged': '✗ +{} мисс ({}/{})',
             'cooldown_active': '⏳ Кулдаун {:.1f}с',
+            'miss_logged_rule': '✗ +{} мисс ({})',
+            'rule_met': '🎯 Условие рестарта выполнено: {} (миссы {}, 100: {}, 50: {}, прогресс {:.1f}%, итог. точность ≤{:.2f}%)',
+            'rule_invalid': '✗ Ошибка в правиле "{}": {}',
+            'rule_fallback': 'Вместо него используются пороги: {}',
+            'rule_failed': '✗ Правило "{}" не проверено: {}',
+            'restart_rule_label': 'Правило (вместо порогов):',
+            'rule_applied': 'Правило рестарта: {}',
             'restarting': '🔄 Перезагрузка...',
             'pressing_key': '⏳ Нажатие {}...',
             'key_released': '✓ Клавиша отпущена',
             'counter_reset': '✓ Счетчик сброшен',
-            'waiting': '⏳ Ожидание 3с...',
+            'waiting': '⏳ Ожидание нового захода (до {:.1f}с)...',
             'ready': '✓ Готово',
+            'retry_confirmed': '✓ Новый заход подтвержден через {:.0f} мс',
+            'ready_timeout': '✓ Готово (TOSU не подтвердил новый заход)',
+            'actuator_error': '✗ Шаг рестарта {} завершился ошибкой: {}',
             'key_error': '✗ Ошибка: {}',
             'osu_focused': '✅ osu! в фокусе',
             'osu_not_focused': '⚠ osu! не в фокусе',
@@ -330,8 +1084,16 @@ class Language:
             'hit50_threshold_disabled': 'Порог 50 очков выключен',
             'hit100_threshold_applied': 'Порог 100 очков: {}',
             'hit50_threshold_applied': 'Порог 50 очков: {}',
-            'hit100_threshold_reached': 'Достигнут порог 100 очков: {} (≥{})',
-            'hit50_threshold_reached': 'Достигнут порог 50 очков: {} (≥{})',
+            'enable_accuracy_threshold': 'Рестарт, если итоговая точность не дотянет до порога',
+            'accuracy_threshold_label': 'Мин. итоговая точность (%):',
+            'accuracy_threshold_enabled': 'Порог итоговой точности включен',
+            'accuracy_threshold_disabled': 'Порог итоговой точности выключен',
+            'accuracy_threshold_applied': 'Порог итоговой точности: {}%',
+            'enable_ur_threshold': 'Рестарт при высоком UR (точный поток TOSU)',
+            'ur_threshold_label': 'Макс. UR:',
+            'ur_threshold_enabled': 'Порог UR включен',
+            'ur_threshold_disabled': 'Порог UR выключен',
+            'ur_threshold_applied': 'Порог UR: {}',
             'current_hit100': 'Hit 100',
             'current_hit50': 'Hit 50',
             # New translations
@@ -341,6 +1103,13 @@ class Language:
             'alltime_avg': 'Всего: {}',
             'export_csv': 'Экспорт CSV',
             'export_json': 'Экспорт JSON',
+            'export_latency': '⏱ Задержки',
+            'latency_summary': '⏱ Задержки p50/p95/p99, мс: {}',
+            'latency_none': 'нет данных',
+            'live_graph': '📈 Живой график',
+            'attempt_summary': '🏁 Попытка: {:.1f}%, миссы {}, 100: {}, 50: {}, {:.0f} с{}',
+            'attempt_by_helper': ' (перезапуск помощником)',
+            'graph_unavailable': '⚠ График недоступен: установите matplotlib и numpy',
             'hotkeys': '⌨️ Горячие клавиши',
             'mini_mode': '📱 Мини режим',
             'always_on_top': '📌 Поверх всех окон',
@@ -370,7 +1139,9 @@ class Language:
             'normal_mode_active': 'Обычный режим активен',
             'click_through_enabled': '👻 Режим прозрачности (клики проходят сквозь)',
             'click_through_disabled': '👆 Интерактивный режим (можно кликать)',
-            'resize_hint': '💡 Подсказка: Измените размер окна, потянув за края'
+            'resize_hint': '💡 Подсказка: Измените размер окна, потянув за края',
+            'ui_update_counters': '🖼 Обновления UI: применено {}, объединено {}, пропущено {}',
+            'ingest_metrics': '📥 Кадры: обработано {}, отброшено {}, макс. очередь {}'
         },
         'en': {
             'title': 'osu!helper v2.0',
@@ -397,20 +1168,39 @@ class Language:
             'connecting': 'Connecting to TOSU: {}',
             'connection_error': '✗ Connection error: {}',
             'connected_tosu': '✓ Connected to TOSU',
+            'precise_connected': '✓ Connected to TOSU precise feed (UR)',
+            'precise_error': '⚠ TOSU precise feed: {}',
+            'mean_hit_error': '{:+.1f} ms',
             'disconnected_tosu': '⚠ Disconnected from TOSU',
             'websocket_error': '✗ WebSocket error: {}',
+            'reconnect_in': '⏳ Reconnecting in {:.1f}s (attempt {})',
+            'process_appeared': '🔎 {} started - connecting now',
+            'connection_metrics': '🔌 Connection: {} attempts, {:.1f}s disconnected, first frame after {}',
             'data_error': '✗ Data error: {}',
             'new_map': '🎵 New map - counters reset',
+            'map_first_time': 'This map: first attempt',
+            'map_history': 'This map: {} attempts, {} restarts, most misses {}, last played {}',
+            'map_heatmap': 'Misses along the map: {} (most at {}–{}%)',
             'threshold_reached': '✗ +{} miss ({}/{}) - THRESHOLD REACHED!',
             'close_to_threshold': '⚠ +{} miss ({}/{}) - close to threshold',
             'miss_logged': '✗ +{} miss ({}/{})',
             'cooldown_active': '⏳ Cooldown {:.1f}s',
+            'miss_logged_rule': '✗ +{} miss ({})',
+            'rule_met': '🎯 Restart rule met: {} (misses {}, 100: {}, 50: {}, progress {:.1f}%, final acc ≤{:.2f}%)',
+            'rule_invalid': '✗ Invalid rule "{}": {}',
+            'rule_fallback': 'Using the thresholds instead: {}',
+            'rule_failed': '✗ Rule "{}" could not be checked: {}',
+            'restart_rule_label': 'Rule (overrides thresholds):',
+            'rule_applied': 'Restart rule: {}',
             'restarting': '🔄 Restarting...',
             'pressing_key': '⏳ Pressing {}...',
             'key_released': '✓ Key released',
             'counter_reset': '✓ Counter reset',
-            'waiting': '⏳ Waiting 3s...',
+            'waiting': '⏳ Waiting for the retry (up to {:.1f}s)...',
             'ready': '✓ Ready',
+            'retry_confirmed': '✓ Retry confirmed after {:.0f} ms',
+            'ready_timeout': '✓ Ready (TOSU did not confirm the retry)',
+            'actuator_error': '✗ Restart step {} failed: {}',
             'key_error': '✗ Error: {}',
             'osu_focused': '✅ osu! focused',
             'osu_not_focused': '⚠ osu! not focused',
@@ -441,8 +1231,16 @@ class Language:
             'hit50_threshold_disabled': '50-hit threshold disabled',
             'hit100_threshold_applied': '100-hit threshold: {}',
             'hit50_threshold_applied': '50-hit threshold: {}',
-            'hit100_threshold_reached': '100-hit threshold reached: {} (≥{})',
-            'hit50_threshold_reached': '50-hit threshold reached: {} (≥{})',
+            'enable_accuracy_threshold': 'Restart when the reachable final accuracy drops below',
+            'accuracy_threshold_label': 'Min. final accuracy (%):',
+            'accuracy_threshold_enabled': 'Final accuracy threshold enabled',
+            'accuracy_threshold_disabled': 'Final accuracy threshold disabled',
+            'accuracy_threshold_applied': 'Final accuracy threshold: {}%',
+            'enable_ur_threshold': 'Restart when UR is too high (TOSU precise feed)',
+            'ur_threshold_label': 'Max. UR:',
+            'ur_threshold_enabled': 'UR threshold enabled',
+            'ur_threshold_disabled': 'UR threshold disabled',
+            'ur_threshold_applied': 'UR threshold: {}',
             'current_hit100': 'Hit 100',
             'current_hit50': 'Hit 50',
             # New translations
@@ -452,6 +1250,13 @@ class Language:
             'alltime_avg': 'All-time: {}',
             'export_csv': 'Export CSV',
             'export_json': 'Export JSON',
+            'export_latency': '⏱ Latency',
+            'latency_summary': '⏱ Latency p50/p95/p99, ms: {}',
+            'latency_none': 'no data yet',
+            'live_graph': '📈 Live graph',
+            'attempt_summary': '🏁 Attempt: {:.1f}%, misses {}, 100s {}, 50s {}, {:.0f}s{}',
+            'attempt_by_helper': ' (restarted by helper)',
+            'graph_unavailable': '⚠ Graph unavailable: install matplotlib and numpy',
             'hotkeys': '⌨️ Hotkeys',
             'mini_mode': '📱 Mini Mode',
             'always_on_top': '📌 Always on Top',
@@ -481,7 +1286,9 @@ class Language:
             'normal_mode_active': 'Normal mode activated',
             'click_through_enabled': '👻 Click-through mode (clicks pass through)',
             'click_through_disabled': '👆 Interactive mode (can click)',
-            'resize_hint': '💡 Tip: Resize window by dragging edges'
+            'resize_hint': '💡 Tip: Resize window by dragging edges',
+            'ui_update_counters': '🖼 UI updates: applied {}, coalesced {}, skipped {}',
+            'ingest_metrics': '📥 Frames: processed {}, dropped {}, max queue depth {}'
         }
     }
     
@@ -489,56 +1296,1090 @@ class Language:
         return self.TEXTS[self.current].get(key, key)
 
 
-class OsuHelper:
-    def __init__(self, root):
+class LogBuffer:
+    """Thread-safe ring buffer of log lines.
+    
+    Any thread appends; the Tk thread drains new lines in batches. Both the
+    history and the not-yet-drained backlog are bounded by capacity, so a
+    flood of messages costs memory and render time proportional to the
+    capacity, not to the flood.
+    """
+    
+    def __init__(self, capacity=1000):
+        self._lock = threading.Lock()
+        self.capacity = max(10, int(capacity))
+        self._lines = deque(maxlen=self.capacity)
+        self._pending = deque(maxlen=self.capacity)
+        self._new = 0
+        
+    def append(self, text, color=None):
+        """Add a line with its colour (safe from any thread)"""
+        entry = (text, color)
+        with self._lock:
+            self._lines.append(entry)
+            self._pending.append(entry)
+            self._new += 1
+            
+    def drain(self):
+        """Return (entries added since the last drain, how many of them were lost)"""
+        with self._lock:
+            entries = list(self._pending)
+            dropped = self._new - len(entries)
+            self._pending.clear()
+            self._new = 0
+        return entries, dropped
+        
+    def tail(self, count):
+        """Last count entries, oldest first"""
+        with self._lock:
+            if count >= len(self._lines):
+                return list(self._lines)
+            return list(self._lines)[-count:]
+            
+    def set_capacity(self, capacity):
+        with self._lock:
+            self.capacity = max(10, int(capacity))
+            self._lines = deque(self._lines, maxlen=self.capacity)
+            self._pending = deque(self._pending, maxlen=self.capacity)
+            
+    def clear(self):
+        with self._lock:
+            self._lines.clear()
+            self._pending.clear()
+            self._new = 0
+            
+    def __len__(self):
+        return len(self._lines)
+
+
+class UiUpdateScheduler:
+    """Coalesces label updates from worker threads into a fixed-rate Tk flush"""
+
+    def __init__(self, root, resolver, rate_hz=30):
         self.root = root
-        self.root.title("osu!helper v2.0 Enhanced")
-        self.root.geometry("1000x800")
-        self.root.minsize(700, 600)
+        self.resolver = resolver  # name -> widget (or None if not built)
+        self.rate_hz = 30
+        self.set_rate(rate_hz)
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._applied = {}
+        self._after_id = None
+        self._hooks = []  # extra work run on every tick (Tk thread)
+
+        # Counters
+        self.submitted = 0
+        self.coalesced = 0
+        self.skipped = 0
+        self.applied = 0
+        self.flushes = 0
+
+    def set_text(self, name, text):
+        """Record the latest text for a widget (safe from any thread)"""
+        with self._lock:
+            self.submitted += 1
+            if name in self._pending:
+                self.coalesced += 1
+            self._pending[name] = text
+
+    def add_hook(self, func):
+        """Run func on the Tk thread after every flush"""
+        self._hooks.append(func)
         
-        # Make window resizable
-        self.root.resizable(True, True)
+    def set_rate(self, rate_hz):
+        """Change flush rate (Hz)"""
+        self.rate_hz = max(1, min(120, int(rate_hz)))
+
+    def start(self):
+        """Start the periodic flush on the Tk thread"""
+        if self._after_id is None:
+            self._after_id = self.root.after(self._interval_ms(), self._tick)
+
+    def stop(self):
+        """Stop the periodic flush"""
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def _interval_ms(self):
+        return max(1, int(1000 / max(1, self.rate_hz)))
+
+    def _tick(self):
+        try:
+            self.flush()
+            for hook in self._hooks:
+                hook()
+        finally:
+            self._after_id = self.root.after(self._interval_ms(), self._tick)
+
+    def flush(self):
+        """Apply pending texts that differ from what the widget already shows"""
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+        self.flushes += 1
+
+        for name, text in pending.items():
+            widget = self.resolver(name)
+            if widget is None:
+                self.skipped += 1
+                continue
+
+            # Skip if this exact widget already shows this text
+            last = self._applied.get(name)
+            if last is not None and last[0] is widget and last[1] == text:
+                self.skipped += 1
+                continue
+
+            try:
+                widget.configure(text=text)
+            except Exception:
+                # Widget was destroyed by a GUI rebuild
+                self.skipped += 1
+                continue
+            self._applied[name] = (widget, text)
+            self.applied += 1
+
+    def invalidate(self):
+        """Forget what widgets show (after something else configured them)"""
+        with self._lock:
+            self._applied.clear()
+
+    def get_counters(self):
+        """Get update counters"""
+        return {
+            'submitted': self.submitted,
+            'coalesced': self.coalesced,
+            'skipped': self.skipped,
+            'applied': self.applied,
+            'flushes': self.flushes
+        }
+
+
+class WidgetRegistry:
+    """Remembers each widget's text key, colour role and font role so language,
+    colour scheme and font size changes are applied in place with configure()"""
+
+    # Font role -> (family, offset from the base font size, weight)
+    FONTS = {
+        'body': ("Segoe UI", 0, None),
+        'body_bold': ("Segoe UI", 0, "bold"),
+        'caption': ("Segoe UI", -1, None),
+        'small': ("Segoe UI", -2, None),
+        'heading': ("Segoe UI", 2, "bold"),
+        'section': ("Segoe UI", 4, "bold"),
+        'mono': ("Consolas", -1, None)
+    }
+
+    def __init__(self, lang, scheme='blue', font_size=12):
+        self.lang = lang
+        self.scheme = scheme
+        self.font_size = font_size
+        self._entries = []  # [widget, roles, last applied options]
+
+        # Counters
+        self.restyles = 0
+        self.configured = 0
+
+    def font(self, role):
+        """Font tuple for a role at the current base size"""
+        family, offset, weight = self.FONTS[role]
+        size = self.font_size + offset
+        return (family, size, weight) if weight else (family, size)
+
+    def create(self, factory, parent, text_key=None, color_role=None, fill_role=None,
+               font_role=None, **kwargs):
+        """Build a widget and register its roles.
+
+        text_key is a Language key or a callable returning the text; color_role
+        is the scheme key for text_color and fill_role the one for fg_color
+        (buttons also get the scheme's hover colour)."""
+        roles = (text_key, color_role, fill_role, font_role)
+        options = self._resolve(roles)
+        widget = factory(parent, **kwargs, **options)
+        self._entries.append([widget, roles, options])
+        return widget
+
+    def _resolve(self, roles):
+        text_key, color_role, fill_role, font_role = roles
+        scheme = ColorSchemes.SCHEMES[self.scheme]
+        options = {}
+        if text_key is not None:
+            options['text'] = text_key() if callable(text_key) else self.lang.get(text_key)
+        if color_role:
+            options['text_color'] = scheme[color_role]
+        if fill_role:
+            options['fg_color'] = scheme[fill_role]
+            options['hover_color'] = scheme['button']
+        if font_role:
+            options['font'] = self.font(font_role)
+        return options
+
+    def restyle(self, scheme=None, font_size=None):
+        """Reconfigure registered widgets whose resolved options changed"""
+        if scheme is not None:
+            self.scheme = scheme
+        if font_size is not None:
+            self.font_size = font_size
+        self.restyles += 1
+
+        alive = []
+        for entry in self._entries:
+            widget, roles, applied = entry
+            options = self._resolve(roles)
+            changed = {k: v for k, v in options.items() if applied.get(k) != v}
+            if callable(roles[0]):
+                # Live text may have been replaced by UI updates since
+                changed['text'] = options['text']
+            if changed:
+                try:
+                    widget.configure(**changed)
+                except Exception:
+                    continue  # Destroyed with its view; forget it
+                self.configured += 1
+                entry[2] = options
+            alive.append(entry)
+        self._entries = alive
+
+    def clear(self):
+        """Forget all widgets (their view is being rebuilt)"""
+        self._entries = []
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class LiveChart:
+    """Live session chart of misses, accuracy, PP and HP.
+    
+    matplotlib is imported when the first chart is built. Lines are animated
+    artists blitted over a cached background at no more than `fps` frames per
+    second; axes are redrawn in full only when the data outgrows their limits,
+    which grow with headroom so that happens rarely. Each series is reduced to
+    the min and max of every horizontal pixel before drawing, so a redraw costs
+    the same for a one-minute and a multi-hour session.
+    """
+    
+    # Series name, axis title, colour scheme key, fixed y limits (None = grow)
+    PANELS = (
+        ('miss_data', 'Misses', 'danger', None),
+        ('accuracy_data', 'Accuracy %', 'info', (0, 100)),
+        ('pp_data', 'PP', 'primary', None),
+        ('hp_data', 'HP %', 'success', (0, 100))
+    )
+    
+    @staticmethod
+    def available():
+        """matplotlib and numpy can be imported"""
+        return (lazy_import('numpy') is not None
+                and lazy_import('matplotlib.backends.backend_tkagg') is not None)
+        
+    def __init__(self, parent, stats, scheme='blue', fps=10):
+        np = lazy_import('numpy')
+        figure_module = lazy_import('matplotlib.figure')
+        backend = lazy_import('matplotlib.backends.backend_tkagg')
+        self.np = np
+        self.stats = stats
+        self.set_fps(fps)
+        
+        self.figure = figure_module.Figure(figsize=(6, 3.2), dpi=100)
+        self.figure.patch.set_alpha(0)
+        self.canvas = backend.FigureCanvasTkAgg(self.figure, master=parent)
+        self.widget = self.canvas.get_tk_widget()
+        
+        self.axes = []
+        self.lines = []
+        for index, (_, title, _, ylim) in enumerate(self.PANELS):
+            ax = self.figure.add_subplot(2, 2, index + 1)
+            ax.set_title(title, fontsize=8)
+            ax.tick_params(labelsize=7)
+            ax.set_xlim(0, 60)
+            ax.set_ylim(*(ylim or (0, 5)))
+            line, = ax.plot([], [], linewidth=1, animated=True)
+            self.axes.append(ax)
+            self.lines.append(line)
+        self.figure.tight_layout()
+        self.set_scheme(scheme)
+        
+        self._background = None
+        self._last_draw = 0.0
+        self._version = None
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+        
+        # Counters
+        self.blits = 0
+        self.full_draws = 0
+        self.points_drawn = 0
+        
+    def set_fps(self, fps):
+        """Cap redraws per second"""
+        self.fps = max(1, min(60, int(fps)))
+        self.interval = 1.0 / self.fps
+        
+    def set_scheme(self, scheme):
+        """Recolour the lines for a colour scheme"""
+        colors = ColorSchemes.SCHEMES[scheme]
+        for line, (_, _, color_key, _) in zip(self.lines, self.PANELS):
+            line.set_color(colors[color_key])
+        self._version = None  # Redraw on the next update
+        
+    def _on_draw(self, event):
+        """A full draw happened: cache the static background and put the lines back"""
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_lines()
+        
+    def _draw_lines(self):
+        for ax, line in zip(self.axes, self.lines):
+            ax.draw_artist(line)
+            
+    def downsample(self, times, values, buckets):
+        """Min and max of each of `buckets` equal time slices, in time order"""
+        np = self.np
+        if len(times) <= 2 * buckets:
+            return times, values
+        edges = np.linspace(times[0], times[-1], buckets + 1)[:-1]
+        starts = np.unique(np.searchsorted(times, edges))  # Empty slices share a start
+        lows = np.minimum.reduceat(values, starts)
+        highs = np.maximum.reduceat(values, starts)
+        return np.repeat(times[starts], 2), np.column_stack((lows, highs)).ravel()
+        
+    def update(self, force=False):
+        """Redraw if new points arrived and the frame budget allows (Tk thread)"""
+        now = time.monotonic()
+        if not force and now - self._last_draw < self.interval:
+            return False
+        series = self.stats.session_stats
+        version = tuple(series[name].total_appended for name, _, _, _ in self.PANELS)
+        if not force and version == self._version:
+            return False
+        self._version = version
+        self._last_draw = now
+        
+        np = self.np
+        start = series['session_start_monotonic']
+        rescale = self._background is None
+        points = 0
+        for ax, line, (name, _, _, ylim) in zip(self.axes, self.lines, self.PANELS):
+            times, values = series[name].view()
+            times = np.array(times, dtype=float) - start
+            values = np.array(values, dtype=float)
+            times, values = self.downsample(times, values, max(2, int(ax.bbox.width)))
+            line.set_data(times, values)
+            points += len(times)
+            if not len(times):
+                continue
+                
+            # Grow limits with headroom instead of tracking the data exactly
+            if times[-1] > ax.get_xlim()[1]:
+                ax.set_xlim(0, times[-1] * 1.5)
+                rescale = True
+            if ylim is None and values.max() > ax.get_ylim()[1]:
+                ax.set_ylim(0, values.max() * 1.5)
+                rescale = True
+        self.points_drawn = points
         
-        # Language and theme
-        self.lang = Language()
-        self.current_theme = "dark"
-        self.color_scheme = "blue"
-        self.font_size = 12
+        try:
+            if rescale:
+                self.full_draws += 1
+                self.canvas.draw()  # Recaches the background via draw_event
+            else:
+                self.blits += 1
+                self.canvas.restore_region(self._background)
+                self._draw_lines()
+            self.canvas.blit(self.figure.bbox)
+        except Exception:
+            return False  # Canvas destroyed by a GUI rebuild
+        return True
+        
+    def get_counters(self):
+        """Get drawing counters"""
+        return {'blits': self.blits, 'full_draws': self.full_draws, 'points_drawn': self.points_drawn}
+        
+    def destroy(self):
+        """Remove the canvas widget"""
+        try:
+            self.widget.destroy()
+        except Exception:
+            pass
+
+
+class PersistenceWorker:
+    """Writes config and stats on a background thread.
+    
+    Callers only mark state dirty; notifications arriving within `delay`
+    seconds of the first one are coalesced into a single write.
+    """
+
+    def __init__(self, save_func, delay=1.0):
+        self.save_func = save_func
+        self.delay = delay
+        self._cond = threading.Condition()
+        self._dirty = False
+        self._dirty_since = 0.0
+        self._running = False
+        self._thread = None
+
+        # Counters
+        self.requests = 0
+        self.writes = 0
+
+    def set_delay(self, delay):
+        """Change the coalescing window (seconds)"""
+        self.delay = max(0.0, min(30.0, float(delay)))
+
+    def mark_dirty(self):
+        """Request a write (safe from any thread, never blocks on I/O)"""
+        with self._cond:
+            self.requests += 1
+            if not self._dirty:
+                self._dirty = True
+                self._dirty_since = time.monotonic()
+                self._cond.notify()
+
+    def start(self):
+        """Start the writer thread"""
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the writer thread and flush anything still dirty"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self.flush()
+
+    def flush(self):
+        """Write now if dirty (runs on the calling thread)"""
+        with self._cond:
+            if not self._dirty:
+                return
+            self._dirty = False
+        self._write()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._dirty:
+                    self._cond.wait()
+                if not self._running:
+                    return  # stop() flushes
+                # Let further notifications pile up until the window closes
+                deadline = self._dirty_since + self.delay
+                while self._running:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if not self._running:
+                    return
+                self._dirty = False
+            self._write()
+
+    def _write(self):
+        self.save_func()
+        self.writes += 1
+
+
+class RestartActuator:
+    """One long-lived thread running a timeline of actions on the monotonic clock.
+    
+    Restarts schedule their steps (press, release, ready timeout) at absolute
+    monotonic times instead of sleeping in a fresh thread per restart. The
+    thread waits exactly until the next due step and records how late each
+    step ran. A step that raises is reported to on_error(func, exception) and
+    the timeline keeps running.
+    """
+
+    def __init__(self, on_error=None):
+        self.on_error = on_error
+        self._cond = threading.Condition()
+        self._timeline = []  # heap of (due, seq, func, args)
+        self._seq = 0
+        self._running = False
+        self._thread = None
+
+        # Counters
+        self.executed = 0
+        self.max_lateness = 0.0
+        self.errors = 0
+
+    def schedule_at(self, due, func, *args):
+        """Run func(*args) on the actuator thread at monotonic time due"""
+        with self._cond:
+            self._seq += 1
+            heapq.heappush(self._timeline, (due, self._seq, func, args))
+            self._cond.notify()
+
+    def schedule(self, delay, func, *args):
+        """Run func(*args) on the actuator thread after delay seconds"""
+        self.schedule_at(time.monotonic() + delay, func, *args)
+
+    def start(self):
+        """Start the actuator thread"""
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the thread, dropping steps that are not due yet"""
+        with self._cond:
+            self._running = False
+            self._timeline.clear()
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    if not self._timeline:
+                        self._cond.wait()
+                        continue
+                    remaining = self._timeline[0][0] - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if not self._running:
+                    return
+                due, _, func, args = heapq.heappop(self._timeline)
+            self.max_lateness = max(self.max_lateness, time.monotonic() - due)
+            self.executed += 1
+            try:
+                func(*args)
+            except Exception as e:
+                # The only actuator thread must survive: later restarts depend on it
+                self.errors += 1
+                if self.on_error is not None:
+                    try:
+                        self.on_error(func, e)
+                    except Exception:
+                        pass
+
+
+class TosuFrameDecoder:
+    """Decodes only the parts of a TOSU v2 frame that process_data reads.
+    
+    A full /websocket/v2 frame carries settings, profile, leaderboard, folders
+    and more. The top-level object is walked key by key (nested objects such as
+    folders also have a 'beatmap' key) until 'beatmap' and 'play' are found;
+    the keys after them are never looked at. A value whose raw text is
+    identical to the previous frame is skipped without decoding it, and when
+    both fields are unchanged the frame is reported as unchanged.
+    """
+    
+    FIELDS = ('beatmap', 'play')
+    
+    _OPEN = re.compile(r'\s*\{')
+    _KEY = re.compile(r'\s*,?\s*"((?:[^"\\]|\\.)*)"\s*:\s*')
+    
+    def __init__(self):
+        self._json = json.JSONDecoder()
+        self._last_raw = {}
+        self._last_value = {}
+        
+        # Counters
+        self.decoded = 0
+        self.unchanged = 0
+        self.fallbacks = 0
+        
+    def reset(self):
+        """Forget the previous frame"""
+        self._last_raw = {}
+        self._last_value = {}
+        
+    def decode(self, raw):
+        """Return {'beatmap': ..., 'play': ...}, or None if nothing changed"""
+        data = {}
+        changed = False
+        
+        match = self._OPEN.match(raw)
+        if match is None:
+            return self._fallback(raw)
+        pos = match.end()
         
-        # Window properties
-        self.always_on_top = False
-        self.transparency = 1.0
-        self.mini_mode = False
+        try:
+            while len(data) < len(self.FIELDS):
+                field, start = self.skip_to(raw, self.FIELDS, pos)
+                if field is None:
+                    # A field only exists nested, or the frame is malformed
+                    return self._fallback(raw)
+                    
+                value, pos = self.value_at(raw, start, field)
+                if value is None:
+                    # Same text as last frame - reuse the decoded value
+                    data[field] = self._last_value[field]
+                    continue
+                if not isinstance(value, dict):
+                    return self._fallback(raw)
+                self._last_value[field] = value
+                data[field] = value
+                changed = True
+        except ValueError:
+            return self._fallback(raw)
+            
+        if not changed:
+            self.unchanged += 1
+            return None
+            
+        self.decoded += 1
+        return data
+        
+    def value_at(self, raw, start, key):
+        """Return (value, end) for the value of key at start; value is None when
+        its text is identical to the last object or array seen for that key"""
+        previous = self._last_raw.get(key)
+        if previous is not None and raw.startswith(previous, start):
+            return None, start + len(previous)
+        value, end = self._json.raw_decode(raw, start)
+        # Only objects and arrays end where the previous text ends; "12" is a prefix of "123"
+        if isinstance(value, (dict, list)):
+            self._last_raw[key] = raw[start:end]
+        return value, end
+        
+    def skip_to(self, raw, keys, pos):
+        """Walk one object level from pos (just inside its '{' or just after a value)
+        to the next key in keys, skipping the other values.
+        
+        Returns (key, value start), or (None, pos) at the end of the object.
+        Raises ValueError on malformed JSON.
+        """
+        while True:
+            match = self._KEY.match(raw, pos)
+            if match is None:
+                return None, pos
+            key, start = match.group(1), match.end()
+            if key in keys:
+                return key, start
+            pos = self.value_at(raw, start, key)[1]
+            
+    def find_value(self, raw, path):
+        """Start of the value at a key path such as ('play', 'hits'), or -1"""
+        pos = 0
+        try:
+            for key in path:
+                match = self._OPEN.match(raw, pos)
+                if match is None:
+                    return -1
+                found, pos = self.skip_to(raw, (key,), match.end())
+                if found is None:
+                    return -1
+        except ValueError:
+            return -1
+        return pos
         
-        # Statistics
-        self.stats = Statistics()
+    def _fallback(self, raw):
+        """Decode the whole frame when the fast path cannot be used"""
+        self.fallbacks += 1
+        self.reset()
+        return json.loads(raw)
         
-        # TOSU connection
-        self.ws = None
-        self.ws_thread = None
-        self.running = False
-        self.connected = False
+    def get_counters(self):
+        """Get decoder counters"""
+        return {
+            'decoded': self.decoded,
+            'unchanged': self.unchanged,
+            'fallbacks': self.fallbacks
+        }
+
+
+class Attempt:
+    """One play-through of a beatmap.
+    
+    Stored as a compact list in FIELDS order: start and end are engine clock
+    times, play_time the last song position (ms), progress the furthest
+    percentage reached and by_helper whether the helper's restart ended it.
+    """
+    
+    FIELDS = ('map_key', 'start', 'end', 'play_time', 'progress', 'misses', 'hit100', 'hit50', 'by_helper')
+    __slots__ = FIELDS
+    
+    def __init__(self, map_key=None, start=0.0):
+        self.map_key = map_key
+        self.start = start
+        self.end = start
+        self.play_time = 0
+        self.progress = 0.0
+        self.misses = 0
+        self.hit100 = 0
+        self.hit50 = 0
+        self.by_helper = False
         
-        # Miss tracking
-        self.current_misses = 0
-        self.our_miss_count = 0
-        self.last_tosu_misses = 0
-        self.miss_threshold = 5
-        self.total_restarts = 0
-        self.current_map_id = None
-        self.current_map_name = "Unknown"
-        self.threshold_triggered = False
+    @property
+    def duration(self):
+        return self.end - self.start
         
-        # Hit value threshold settings (100-hit and 50-hit notes)
-        self.hit100_threshold_enabled = False
-        self.hit100_threshold = 10  # Threshold for 100-hit notes count
-        self.current_hit100 = 0
-        self.last_hit100 = 0
+    @property
+    def empty(self):
+        """Nothing was played (menus, lead-in)"""
+        return self.progress <= 0 and not (self.misses or self.hit100 or self.hit50)
+        
+    def to_list(self):
+        """Compact JSON-ready form"""
+        values = [getattr(self, name) for name in self.FIELDS]
+        values[1], values[2] = round(self.start, 3), round(self.end, 3)
+        values[4] = round(self.progress, 1)
+        return values
+        
+    @classmethod
+    def from_list(cls, values):
+        attempt = cls()
+        for name, value in zip(cls.FIELDS, values):
+            setattr(attempt, name, value)
+        return attempt
+
+
+class AttemptSegmenter:
+    """Cuts the gameplay frame stream into attempts.
+    
+    The current attempt ends when the beatmap changes, when play time jumps
+    back (a retry) or when any hit count goes down (counts zeroed by a new
+    attempt). Each frame is O(1); finished attempts that played anything are
+    returned by feed() and kept in a bounded list of recent attempts.
+    """
+    
+    # Play time may wobble slightly backwards between frames (ms)
+    REWIND_MS = 500
+    
+    def __init__(self, capacity=200):
+        self.current = None
+        self.recent = deque(maxlen=capacity)
+        self.finished = 0
+        
+    def feed(self, now, map_key, play_time, progress, misses, hit100, hit50):
+        """Track one gameplay frame; returns the attempt it closed, or None"""
+        attempt = self.current
+        closed = None
+        if attempt is not None and (
+                map_key != attempt.map_key
+                or play_time < attempt.play_time - self.REWIND_MS
+                or misses < attempt.misses or hit100 < attempt.hit100 or hit50 < attempt.hit50):
+            closed = self.close()
+            attempt = None
+            
+        if attempt is None:
+            attempt = self.current = Attempt(map_key, now)
+        attempt.end = now
+        attempt.play_time = play_time
+        if progress > attempt.progress:
+            attempt.progress = progress
+        attempt.misses = misses
+        attempt.hit100 = hit100
+        attempt.hit50 = hit50
+        return closed
+        
+    def mark_restart(self):
+        """The helper is restarting the current attempt"""
+        if self.current is not None:
+            self.current.by_helper = True
+            
+    def close(self):
+        """Finish the current attempt; returns it unless nothing was played"""
+        attempt, self.current = self.current, None
+        if attempt is None or attempt.empty:
+            return None
+        self.finished += 1
+        self.recent.append(attempt)
+        return attempt
+
+
+class HitErrorWindow:
+    """Unstable rate and mean hit error over the last `size` hits of a play.
+    
+    TOSU's precise feed repeats the whole hitErrors list of the play in every
+    message, so only the tail past the last seen length is read. A sliding
+    Welford update keeps the mean and the sum of squared deviations, so each
+    hit costs O(1) whatever the window size.
+    """
+    
+    def __init__(self, size=200):
+        self.size = max(2, int(size))
+        self.plays = 0
+        self.hits = 0  # hit errors consumed since start
+        self.reset()
+        
+    def reset(self):
+        """Forget the current play"""
+        self._ring = array('d', [0.0]) * self.size
+        self._next = 0
+        self._m2 = 0.0
+        self._first = None
+        self.count = 0
+        self.mean = 0.0
+        self.seen = 0  # length of the play's hitErrors list already consumed
+        
+    def set_size(self, size):
+        """Change the window length (starts a fresh window)"""
+        size = max(2, int(size))
+        if size != self.size:
+            self.size = size
+            self.reset()
+            
+    def add(self, value):
+        """Add one hit error (ms)"""
+        if self.count < self.size:
+            self.count += 1
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self._m2 += delta * (value - self.mean)
+        else:
+            # Slide: the oldest hit leaves as the new one enters
+            old = self._ring[self._next]
+            old_mean = self.mean
+            self.mean += (value - old) / self.size
+            self._m2 = max(0.0, self._m2 + (value - old) * (value - self.mean + old - old_mean))
+        self._ring[self._next] = value
+        self._next = (self._next + 1) % self.size
+        self.hits += 1
+        
+    def feed(self, errors):
+        """Consume a play's cumulative hitErrors list; returns the number of new hits"""
+        if not errors:
+            if self.seen:
+                self.reset()
+            return 0
+        if len(errors) < self.seen or errors[0] != self._first:
+            # A retry or a new map started a new list
+            self.reset()
+            self._first = errors[0]
+            self.plays += 1
+        new = len(errors) - self.seen
+        for index in range(self.seen, len(errors)):
+            self.add(errors[index])
+        self.seen = len(errors)
+        return new
         
-        self.hit50_threshold_enabled = False
-        self.hit50_threshold = 5  # Threshold for 50-hit notes count
-        self.current_hit50 = 0
-        self.last_hit50 = 0
+    @property
+    def variance(self):
+        return self._m2 / self.count if self.count else 0.0
+        
+    @property
+    def unstable_rate(self):
+        """osu! unstable rate: 10 x standard deviation of the hit errors"""
+        return 10.0 * math.sqrt(self.variance)
+
+
+class AccuracyProjection:
+    """Best final accuracy still reachable in the current play.
+    
+    Every object not judged yet is assumed to become a 300, so the value only
+    drops as points are lost: 200 per 100, 250 per 50 and 300 per miss out of
+    300 per object of the map. O(1) per frame from the hit counts.
+    """
+    
+    def __init__(self):
+        self.total = 0  # hit objects in the map
+        self.hits = 0   # judged objects that were hit (300/100/50)
+        self.judged = 0
+        self.value = 100.0
+        
+    def set_total(self, total):
+        """Set the map's total object count"""
+        self.total = max(0, int(total or 0))
+        
+    def update(self, hit300, hit100, hit50, misses):
+        """Recompute from the current hit counts; returns the projected accuracy (%)"""
+        self.hits = hit300 + hit100 + hit50
+        self.judged = self.hits + misses
+        total = max(self.total, self.judged)
+        if total <= 0:
+            self.value = 100.0
+        else:
+            # lost points / (300 * total) * 100
+            self.value = 100.0 - (200 * hit100 + 250 * hit50 + 300 * misses) / (3.0 * total)
+        return self.value
+
+
+class _SafeDivision(ast.NodeTransformer):
+    """Rewrites a / b in a rule into _div(a, b)"""
+    
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if not isinstance(node.op, ast.Div):
+            return node
+        call = ast.Call(func=ast.Name(id='_div', ctx=ast.Load()), args=[node.left, node.right], keywords=[])
+        return ast.copy_location(call, node)
+
+
+class RestartRule:
+    """A restart condition written in a small expression language.
+    
+    Example: "misses >= 5 or (n100 >= 10 and progress < 30%)". Names are the
+    per-frame values in VARIABLES; a number followed by % is just the number,
+    since progress and accuracies are already percentages. Comparisons,
+    and/or/not, + - * / and numbers are allowed and nothing else: the source
+    is parsed with ast, checked node by node, and compiled once into a
+    lambda taking VARIABLES as positional arguments. Checking a frame is a
+    single call with no lookups beyond its own locals.
+    """
+    
+    VARIABLES = ('misses', 'n300', 'n100', 'n50', 'progress', 'accuracy', 'final_accuracy',
+                 'ur', 'combo', 'hp')
+    
+    # A % only ends a number ("30%)", "30% and"); "5%5" is left for validation to reject
+    _PERCENT = re.compile(r'(\d+(?:\.\d*)?|\.\d+)\s*%(?![\w.(])')
+    _NODES = (ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+              ast.Compare, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq,
+              ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Name, ast.Load, ast.Constant)
+    
+    def __init__(self, source):
+        self.source = " ".join(str(source).split())
+        if not self.source:
+            raise ValueError("empty rule")
+        text = self._PERCENT.sub(r'\1', self.source)
+        try:
+            tree = ast.parse(text, mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"syntax error ({e.msg})") from None
+            
+        for node in ast.walk(tree):
+            if not isinstance(node, self._NODES):
+                raise ValueError(f"'{ast.get_source_segment(text, node) or type(node).__name__}' is not allowed")
+            if isinstance(node, ast.Name) and node.id not in self.VARIABLES:
+                raise ValueError(f"unknown name '{node.id}' (known: {', '.join(self.VARIABLES)})")
+            if isinstance(node, ast.Constant) and type(node.value) not in (int, float):
+                raise ValueError(f"{node.value!r} is not a number")
+        self._check_condition(tree.body, text)
+        self.names = frozenset(node.id for node in ast.walk(tree) if isinstance(node, ast.Name))
+        
+        # Compile "lambda misses, n300, ...: <rule>" once; divisions go through divide()
+        body = _SafeDivision().visit(tree.body)
+        args = ast.arguments(posonlyargs=[], args=[ast.arg(arg=name) for name in self.VARIABLES],
+                             kwonlyargs=[], kw_defaults=[], defaults=[])
+        expression = ast.fix_missing_locations(ast.Expression(ast.Lambda(args=args, body=body)))
+        self.check = eval(compile(expression, '<restart rule>', 'eval'),
+                          {'__builtins__': {}, '_div': self.divide})
+        
+    @staticmethod
+    def divide(numerator, denominator):
+        """Rule division: a zero divisor means no ratio yet (0) instead of an error"""
+        return numerator / denominator if denominator else 0.0
+        
+    @classmethod
+    def _check_condition(cls, node, text):
+        """Only comparisons may be combined with and/or/not"""
+        if isinstance(node, ast.BoolOp):
+            for value in node.values:
+                cls._check_condition(value, text)
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            cls._check_condition(node.operand, text)
+        elif not isinstance(node, ast.Compare):
+            raise ValueError(f"'{ast.get_source_segment(text, node)}' is not a comparison")
+            
+    def __str__(self):
+        return self.source
+
+
+def _rule_setting(name):
+    """RestartEngine setting that the restart rule is built from (recompiled on change)"""
+    attribute = '_' + name
+    
+    def set_value(self, value):
+        setattr(self, attribute, value)
+        self._rule_stale = True
+        
+    return property(lambda self: getattr(self, attribute), set_value)
+
+
+class RestartEngine:
+    """GUI-free restart decision core.
+    
+    Consumes TOSU frames, tracks misses and hit counts for the current attempt
+    and decides when to restart. Results are published to subscribers as
+    callback(event, data):
+    
+        'log'          message, color
+        'map'          name, stats_text (None when unchanged)
+        'new_map'      map_id, checksum
+        'map_history'  text
+        'gameplay'     accuracy, combo, pp, hp, progress
+        'counts'       misses, hit100, hit50
+        'miss'         count
+        'restart'      decision, dry_run, restart_id, received_at
+        'reset'        total_restarts
+        'attempt'      attempt (a finished Attempt)
+        'hit_errors'   unstable_rate, mean_error, hits (precise feed)
+    
+    Unless dry_run is set, a 'restart' event leaves the engine restarting: the
+    subscriber that actuates it calls complete_restart() once the key was
+    released. The engine then waits for a frame confirming the retry (play
+    time jumping back or all hit counts back at zero) and resumes tracking by
+    itself; end_restart() is the fallback when that frame never comes.
+    """
+    
+    # Settings the restart rule is built from
+    miss_threshold = _rule_setting('miss_threshold')
+    hit100_threshold_enabled = _rule_setting('hit100_threshold_enabled')
+    hit100_threshold = _rule_setting('hit100_threshold')
+    hit50_threshold_enabled = _rule_setting('hit50_threshold_enabled')
+    hit50_threshold = _rule_setting('hit50_threshold')
+    accuracy_threshold_enabled = _rule_setting('accuracy_threshold_enabled')
+    accuracy_threshold = _rule_setting('accuracy_threshold')
+    ur_threshold_enabled = _rule_setting('ur_threshold_enabled')
+    ur_threshold = _rule_setting('ur_threshold')
+    restart_rule = _rule_setting('restart_rule')
+    
+    # Hits a UR window needs before the UR rule trusts it
+    UR_MIN_HITS = 30
+    # How far the precise feed may run ahead of the main feed's hit count
+    UR_LEAD = 20
+    
+    def __init__(self, stats=None, lang=None):
+        self.lang = lang if lang is not None else Language()
+        self.stats = stats if stats is not None else Statistics()
+        self.decoder = TosuFrameDecoder()
+        self.latency = LatencyTracker()
+        self.segmenter = AttemptSegmenter()
+        self.miss_positions = array('d')  # Song positions (ms) of this attempt's misses
+        self.hit_errors = HitErrorWindow()
+        self.frame_received_at = 0.0
+        self._subscribers = []
+        
+        # Miss tracking
+        self.our_miss_count = 0
+        self.last_tosu_misses = 0
+        self.miss_threshold = 5
+        self.total_restarts = 0
+        self.current_map_id = None
+        self.current_map_name = "Unknown"
+        self.threshold_triggered = False
+        
+        # Hit value threshold settings (100-hit and 50-hit notes)
+        self.hit100_threshold_enabled = False
+        self.hit100_threshold = 10  # Threshold for 100-hit notes count
+        self.current_hit100 = 0
+        
+        self.hit50_threshold_enabled = False
+        self.hit50_threshold = 5  # Threshold for 50-hit notes count
+        self.current_hit50 = 0
+        self.current_hit300 = 0
+        
+        # Accuracy-grinding rules: best reachable accuracy and rolling UR
+        self.accuracy = AccuracyProjection()
+        self.accuracy_threshold_enabled = False
+        self.accuracy_threshold = 98.0  # Restart once the final accuracy cannot reach this (%)
+        self.ur_threshold_enabled = False
+        self.ur_threshold = 120.0  # Restart when the rolling UR goes above this
+        
+        # Custom rule source; empty means the rule is built from the thresholds above
+        self.restart_rule = ""
+        self.rule = None
+        self._rule_uses_ur = False
+        self._rule_failed = None
+        self._cooldown_logged = None
+        self._cooldown_counts = None  # (misses, 100s, 50s) when the cooldown last blocked the rule
         
         # Additional TOSU data
         self.current_accuracy = 0.0
@@ -546,6 +2387,1525 @@ class OsuHelper:
         self.current_pp = 0.0
         self.current_hp = 0.0
         self.current_progress = 0.0
+        self.current_play_time = 0
+        self.song_length = 0
+        
+        # Protection
+        self.cooldown_duration = 10.0
+        self.is_restarting = False
+        self.awaiting_retry = False
+        self.last_restart_time = 0
+        self.restart_id = 0
+        self._restart_lock = threading.Lock()
+        self._restart_play_time = 0
+        self._released_at = 0
+        self._logged_beatmap = False
+        
+        # Clock for cooldowns (replay substitutes capture time)
+        self.clock = time.time
+        
+        # Dry run: record restart decisions instead of asking for key presses
+        self.dry_run = False
+        self.restart_decisions = []
+        
+    def subscribe(self, callback):
+        """Register callback(event, data) for engine events"""
+        self._subscribers.append(callback)
+        
+    def emit(self, event, **data):
+        for callback in self._subscribers:
+            callback(event, data)
+            
+    def log(self, message, color=None):
+        self.emit('log', message=message, color=color)
+        
+    def handle_frame(self, message, received_at=None):
+        """Decode and process one raw TOSU frame.
+        
+        received_at is the perf_counter time the frame came off the socket;
+        decision and press latencies are measured from it.
+        """
+        try:
+            start = time.perf_counter()
+            self.frame_received_at = received_at if received_at is not None else start
+            data = self.decoder.decode(message)
+            decoded = time.perf_counter()
+            self.latency.record('decode', decoded - start)
+            if data is None:
+                return  # beatmap and play unchanged since last frame
+            self.process_data(data)
+            self.latency.record('process', time.perf_counter() - decoded)
+        except Exception as e:
+            self.log(f"✗ Error: {str(e)}", "red")
+            
+    def handle_precise_frame(self, message):
+        """Feed one /websocket/v2/precise message into the hit error window.
+        
+        Runs on the precise socket thread; it shares no state with the frame
+        path except the window's read-only results.
+        """
+        try:
+            data = json.loads(message)
+        except ValueError:
+            return
+        errors = data.get('hitErrors') if isinstance(data, dict) else None
+        if not isinstance(errors, list):
+            return
+        if self.hit_errors.feed(errors):
+            window = self.hit_errors
+            self.emit('hit_errors', unstable_rate=window.unstable_rate, mean_error=window.mean,
+                      hits=window.count)
+            
+    def process_data(self, data):
+        """Process decoded TOSU data"""
+        try:
+            # Get current map ID and info from beatmap data
+            bm_data = data.get('beatmap', {})
+            if not bm_data:
+                return
+            
+            # Debug: log beatmap structure once
+            if not self._logged_beatmap:
+                self._logged_beatmap = True
+                self.log(f"🗺️ Beatmap keys: {list(bm_data.keys())}", "blue")
+                if 'metadata' in bm_data:
+                    meta = bm_data['metadata']
+                    self.log(f"✓ Metadata: {meta.get('artist')} - {meta.get('title')}", "green")
+                
+            map_id = bm_data.get('id', 0)
+            
+            # Update map info
+            if map_id and map_id != 0:
+                # Artist and title are directly in beatmap, not in metadata
+                artist = bm_data.get('artist', '').strip()
+                title = bm_data.get('title', '').strip()
+                difficulty = bm_data.get('version', '').strip()  # 'version' is difficulty name
+                
+                # Get map stats
+                stats = bm_data.get('stats', {})
+                cs = stats.get('CS', 0)
+                ar = stats.get('AR', 0)
+                od = stats.get('OD', 0)
+                hp = stats.get('HP', 0)
+                objects = stats.get('objects')
+                if isinstance(objects, dict):
+                    self.accuracy.set_total(objects.get('total', 0))
+                
+                # Only update if we have valid data
+                if artist and title:
+                    map_name = f"{artist} - {title}"
+                    if difficulty:
+                        map_name += f" [{difficulty}]"
+                    self.current_map_name = map_name
+                    
+                    stats_text = None
+                    if cs or ar or od or hp:  # Only show if we have stats
+                        stats_text = f"CS: {cs:.1f}  AR: {ar:.1f}  OD: {od:.1f}  HP: {hp:.1f}"
+                    self.emit('map', name=map_name, stats_text=stats_text)
+                elif self.current_map_name != "Unknown":
+                    # No metadata but have map ID - show loading
+                    self.current_map_name = "Loading..."
+                    self.emit('map', name="Loading...", stats_text=None)
+            else:
+                # No map or invalid map ID - show "not playing"
+                if self.current_map_name != self.lang.get('not_playing'):
+                    self.current_map_name = self.lang.get('not_playing')
+                    self.emit('map', name=self.current_map_name, stats_text="")
+            
+            # Check for new map
+            if map_id != self.current_map_id and map_id is not None:
+                self.current_map_id = map_id
+                self.our_miss_count = 0
+                self.last_tosu_misses = 0
+                self.threshold_triggered = False
+                self.current_hit100 = 0  # Reset hit100 tracking
+                self.current_hit50 = 0  # Reset hit50 tracking
+                self.emit('counts', misses=0, hit100=0, hit50=0)
+                
+                checksum = bm_data.get('checksum', '')
+                self.stats.add_map_played(map_id, checksum, self.current_map_name)
+                self.emit('new_map', map_id=map_id, checksum=checksum)
+                self.log(self.lang.get('new_map'), "blue")
+                self.report_map_history(map_id, checksum)
+                return
+                
+            # Get gameplay data (use 'play' key)
+            gameplay_data = data.get('play', {})
+            
+            if not gameplay_data:
+                return  # No gameplay data available
+            
+            hits_data = gameplay_data.get('hits', {})
+            if not hits_data:
+                return  # No hits data available
+            
+            # Try both integer and string keys for compatibility
+            current_tosu_misses = hits_data.get(0, 0) if 0 in hits_data else hits_data.get('0', 0)
+            
+            # Get 100-hit data (try both int and string keys)
+            current_hit100 = hits_data.get(100, 0) if 100 in hits_data else hits_data.get('100', 0)
+            
+            # Get 50-hit data (try both int and string keys)
+            current_hit50 = hits_data.get(50, 0) if 50 in hits_data else hits_data.get('50', 0)
+            
+            self.current_hit300 = hits_data.get(300, 0) if 300 in hits_data else hits_data.get('300', 0)
+            self.accuracy.update(self.current_hit300, current_hit100, current_hit50, current_tosu_misses)
+            
+            # Additional TOSU data
+            self.current_accuracy = gameplay_data.get('accuracy', 0.0)
+            self.current_combo = gameplay_data.get('combo', {}).get('current', 0) if isinstance(gameplay_data.get('combo'), dict) else gameplay_data.get('combo', 0)
+            self.current_pp = gameplay_data.get('pp', {}).get('current', 0.0) if isinstance(gameplay_data.get('pp'), dict) else gameplay_data.get('pp', 0.0)
+            self.current_hp = gameplay_data.get('hp', {}).get('normal', 0.0) * 100 if isinstance(gameplay_data.get('hp'), dict) else gameplay_data.get('hp', 0.0) * 100
+            
+            # Progress calculation (simplified)
+            time_data = gameplay_data.get('time', {})
+            current_time = time_data.get('current', 0)
+            total_time = time_data.get('full', 1)
+            self.current_play_time = current_time
+            self.current_progress = (current_time / total_time * 100) if total_time > 0 else 0
+            
+            self.emit('gameplay', accuracy=self.current_accuracy, combo=self.current_combo,
+                      pp=self.current_pp, hp=self.current_hp, progress=self.current_progress)
+            
+            # Attempt boundaries come from the frame itself, not from our own restarts
+            finished = self.segmenter.feed(self.clock(), self.stats.current_map_key, current_time,
+                                           self.current_progress, current_tosu_misses,
+                                           current_hit100, current_hit50)
+            if finished is not None:
+                self.finish_attempt(finished)
+            self.song_length = total_time
+            
+            # Add gameplay data to statistics
+            self.stats.add_gameplay_data(
+                accuracy=self.current_accuracy,
+                combo=self.current_combo,
+                pp=self.current_pp,
+                hp=self.current_hp,
+                misses=current_tosu_misses
+            )
+            
+            # Update miss count, hit100 and hit50 counts
+            self.update_miss_count(current_tosu_misses, current_hit100, current_hit50)
+            
+        except Exception as e:
+            self.log(self.lang.get('data_error').format(str(e)), "red")
+            
+    def finish_attempt(self, attempt):
+        """Record and publish a finished attempt"""
+        self.stats.add_attempt(attempt)
+        self.emit('attempt', attempt=attempt)
+        self.log(self.lang.get('attempt_summary').format(
+            attempt.progress, attempt.misses, attempt.hit100, attempt.hit50, attempt.duration,
+            self.lang.get('attempt_by_helper') if attempt.by_helper else ''), "blue")
+        if self.miss_positions:
+            # One binning pass per attempt; positions are in ms of the attempt's own song
+            self.stats.add_miss_positions(attempt.map_key, self.miss_positions, self.song_length)
+            del self.miss_positions[:]
+        if attempt.map_key and attempt.map_key == self.stats.current_map_key:
+            self.emit('map_history', text=self.map_history_text(attempt.map_key))
+            
+    def map_history_text(self, map_key):
+        """History and miss heatmap of a beatmap (O(1) index lookups)"""
+        entry = self.stats.all_time_stats['maps'].get(map_key) if map_key else None
+        if entry is None:
+            return ""
+        if not entry['attempts']:
+            text = self.lang.get('map_first_time')
+        else:
+            # Finished attempts only; the one being played is not counted yet
+            reached = entry['misses']
+            worst = max((int(count) for count in reached), default=0)
+            text = self.lang.get('map_history').format(
+                entry['attempts'], entry['restarts'], worst,
+                (entry.get('previous_played') or '')[:16].replace('T', ' '))
+        heatmap = self.stats.get_heatmap(map_key)
+        if heatmap is not None:
+            bars, section = self.stats.format_heatmap(heatmap)
+            if section is not None:
+                text += "\n" + self.lang.get('map_heatmap').format(bars, *section)
+        return text
+            
+    def report_map_history(self, map_id, checksum=''):
+        """Publish and log the current beatmap's history"""
+        text = self.map_history_text(self.stats.map_key(map_id, checksum) if map_id else None)
+        self.emit('map_history', text=text)
+        if text:
+            self.log(f"📚 {text}", "blue")
+            
+    def threshold_rule(self):
+        """Rule source built from the threshold settings"""
+        parts = [f"misses >= {self.miss_threshold}"]
+        if self.hit100_threshold_enabled:
+            parts.append(f"n100 >= {self.hit100_threshold}")
+        if self.hit50_threshold_enabled:
+            parts.append(f"n50 >= {self.hit50_threshold}")
+        if self.accuracy_threshold_enabled:
+            parts.append(f"final_accuracy < {self.accuracy_threshold}%")
+        if self.ur_threshold_enabled:
+            parts.append(f"ur > {self.ur_threshold}")
+        return " or ".join(parts)
+        
+    def compile_rule(self):
+        """Compile the custom rule, or the threshold rule; returns the RestartRule"""
+        self._rule_stale = False
+        rule = None
+        if self.restart_rule:
+            try:
+                rule = RestartRule(self.restart_rule)
+            except ValueError as e:
+                self.log(self.lang.get('rule_invalid').format(self.restart_rule, e), "red")
+        if rule is None:
+            rule = RestartRule(self.threshold_rule())
+            if self.restart_rule:
+                self.log(self.lang.get('rule_fallback').format(rule), "orange")
+        self.rule = rule
+        self._rule_uses_ur = 'ur' in rule.names
+        return rule
+        
+    def current_ur(self):
+        """Rolling UR for the rules, 0 until the window belongs to this play"""
+        window = self.hit_errors
+        # A window still holding the previous play has more hits than this play judged
+        if window.count < self.UR_MIN_HITS or window.seen > self.accuracy.hits + self.UR_LEAD:
+            return 0.0
+        return window.unstable_rate
+        
+    def update_miss_count(self, current_tosu_misses, current_hit100, current_hit50):
+        """Update miss count and check the restart rule"""
+        # Block during restart until a frame shows the new attempt
+        if self.is_restarting:
+            if not (self.awaiting_retry and
+                    self._is_retry_frame(current_tosu_misses, current_hit100, current_hit50)):
+                return
+            if self.end_restart(self.restart_id):
+                self.log(self.lang.get('retry_confirmed').format(
+                    (self.clock() - self._released_at) * 1000), "green")
+            
+        # TOSU's misses went down: a retry the helper did not make. The rule is
+        # checked on every frame, so the last attempt's count must not linger
+        if current_tosu_misses < self.last_tosu_misses:
+            self.our_miss_count = 0
+            self.last_tosu_misses = 0
+            self.threshold_triggered = False
+            
+        # Calculate new misses
+        miss_diff = current_tosu_misses - self.last_tosu_misses
+        
+        # Progress logs follow the threshold settings; a custom rule has none
+        by_thresholds = not self.restart_rule
+        
+        # Update hit100 count
+        hit100_diff = current_hit100 - self.current_hit100
+        self.current_hit100 = current_hit100
+        
+        # Log hit100 changes if threshold is enabled
+        if by_thresholds and self.hit100_threshold_enabled and hit100_diff > 0:
+            if self.current_hit100 >= self.hit100_threshold:
+                # The rule below restarts
+                pass
+            elif self.current_hit100 == self.hit100_threshold - 1:
+                self.log(f"⚠️ Hit 100: {self.current_hit100}/{self.hit100_threshold} (близко к порогу!)", "orange")
+            else:
+                self.log(f"📊 Hit 100: +{hit100_diff} (всего: {self.current_hit100}/{self.hit100_threshold})", "blue")
+        
+        # Update hit50 count
+        hit50_diff = current_hit50 - self.current_hit50
+        self.current_hit50 = current_hit50
+        
+        # Log hit50 changes if threshold is enabled
+        if by_thresholds and self.hit50_threshold_enabled and hit50_diff > 0:
+            if self.current_hit50 >= self.hit50_threshold:
+                # The rule below restarts
+                pass
+            elif self.current_hit50 == self.hit50_threshold - 1:
+                self.log(f"⚠️ Hit 50: {self.current_hit50}/{self.hit50_threshold} (близко к порогу!)", "orange")
+            else:
+                self.log(f"📊 Hit 50: +{hit50_diff} (всего: {self.current_hit50}/{self.hit50_threshold})", "blue")
+        
+        if miss_diff > 0:
+            self.our_miss_count += miss_diff
+            self.last_tosu_misses = current_tosu_misses
+            # Tag each miss with its song position for the per-map heatmap
+            self.miss_positions.extend([self.current_play_time] * miss_diff)
+            
+            # Add to statistics
+            self.stats.add_miss(self.our_miss_count, self.current_map_name)
+            self.emit('miss', count=self.our_miss_count)
+            
+            if not by_thresholds:
+                self.log(self.lang.get('miss_logged_rule').format(miss_diff, self.our_miss_count))
+            elif self.our_miss_count >= self.miss_threshold:
+                self.log(self.lang.get('threshold_reached').format(
+                    miss_diff, self.our_miss_count, self.miss_threshold
+                ), "red")
+            elif self.our_miss_count == self.miss_threshold - 1:
+                self.log(self.lang.get('close_to_threshold').format(
+                    miss_diff, self.our_miss_count, self.miss_threshold
+                ), "orange")
+            else:
+                self.log(self.lang.get('miss_logged').format(
+                    miss_diff, self.our_miss_count, self.miss_threshold
+                ))
+                
+        self.emit('counts', misses=self.our_miss_count, hit100=self.current_hit100, hit50=self.current_hit50)
+        
+        if self.threshold_triggered:
+            return
+            
+        # A restart the cooldown blocked waits for the next miss/100/50, as it
+        # did before rules were checked on every frame; it never fires just
+        # because the cooldown ran out
+        counts = (self.our_miss_count, self.current_hit100, self.current_hit50)
+        if self._cooldown_counts is not None:
+            if counts == self._cooldown_counts:
+                return
+            self._cooldown_counts = None
+            
+        rule = self.rule
+        if rule is None or self._rule_stale:
+            rule = self.compile_rule()
+            
+        # One call of the compiled rule per frame
+        try:
+            met = rule.check(self.our_miss_count, self.current_hit300, self.current_hit100, self.current_hit50,
+                             self.current_progress, self.current_accuracy, self.accuracy.value,
+                             self.current_ur() if self._rule_uses_ur else 0.0,
+                             self.current_combo, self.current_hp)
+        except Exception as e:
+            # Treat as not met; one log line per rule, not one per frame
+            if self._rule_failed is not rule:
+                self._rule_failed = rule
+                self.log(self.lang.get('rule_failed').format(rule, e), "red")
+            return
+        if not met:
+            return
+            
+        # Check cooldown (logged once per cooldown; a blocked rule is held until the counts change)
+        time_since_restart = self.clock() - self.last_restart_time
+        if time_since_restart < self.cooldown_duration:
+            self._cooldown_counts = counts
+            if self._cooldown_logged != self.last_restart_time:
+                self._cooldown_logged = self.last_restart_time
+                remaining = self.cooldown_duration - time_since_restart
+                self.log(self.lang.get('cooldown_active').format(remaining), "orange")
+            return
+            
+        self.log(self.lang.get('rule_met').format(
+            rule, self.our_miss_count, self.current_hit100, self.current_hit50, self.current_progress,
+            self.accuracy.value), "red")
+        self.threshold_triggered = True
+        self.request_restart()
+            
+    def _is_retry_frame(self, misses, hit100, hit50):
+        """Whether a frame belongs to the attempt started by the restart"""
+        if self.current_play_time < self._restart_play_time:
+            return True  # Play time jumped back to the start
+        return misses == 0 and hit100 == 0 and hit50 == 0
+        
+    def request_restart(self):
+        """Decide on a restart and publish it to subscribers"""
+        if self.is_restarting:
+            return
+        received_at = self.frame_received_at
+        self.latency.record('decision', time.perf_counter() - received_at)
+            
+        self.last_restart_time = self.clock()
+        self._restart_play_time = self.current_play_time
+        self.segmenter.mark_restart()
+        decision = {
+            'time': self.last_restart_time,
+            'map': self.current_map_name,
+            'misses': self.our_miss_count,
+            'hit100': self.current_hit100,
+            'hit50': self.current_hit50,
+            'progress': round(self.current_progress, 1),
+            'projected_accuracy': round(self.accuracy.value, 2),
+            'ur': round(self.current_ur(), 1),
+            'rule': str(self.rule)
+        }
+        
+        # Dry run: record the decision and reset immediately
+        if self.dry_run:
+            self.restart_decisions.append(decision)
+            self.emit('restart', decision=decision, dry_run=True, restart_id=None, received_at=received_at)
+            self.log(self.lang.get('restarting'), "orange")
+            self.complete_restart()
+            return
+            
+        with self._restart_lock:
+            self.restart_id += 1
+            self.is_restarting = True
+            self.awaiting_retry = False
+        self.emit('restart', decision=decision, dry_run=False, restart_id=self.restart_id,
+                  received_at=received_at)
+        
+    def complete_restart(self):
+        """Reset per-attempt counters after the restart key was pressed"""
+        self.our_miss_count = 0
+        self.last_tosu_misses = 0
+        self.threshold_triggered = False
+        self.total_restarts += 1
+        
+        # Add to statistics
+        self.stats.add_restart()
+        
+        self.emit('counts', misses=0, hit100=0, hit50=0)
+        self.emit('reset', total_restarts=self.total_restarts)
+        self.log(self.lang.get('counter_reset'), "green")
+        
+        # Frames still showing the old attempt are ignored until the retry shows up
+        self._released_at = self.clock()
+        self.awaiting_retry = self.is_restarting
+        
+    def end_restart(self, restart_id=None):
+        """Resume tracking after a restart; returns False if it already ended.
+        
+        restart_id guards against a stale timeout ending a newer restart.
+        """
+        with self._restart_lock:
+            if not self.is_restarting:
+                return False
+            if restart_id is not None and restart_id != self.restart_id:
+                return False
+            self.is_restarting = False
+            self.awaiting_retry = False
+            return True
+
+
+class ReconnectBackoff:
+    """Capped exponential backoff with jitter for reconnect attempts.
+    
+    The n-th consecutive failure waits a random time between half and all of
+    min(cap, base * factor**n), so several clients never retry in lockstep.
+    """
+    
+    def __init__(self, base=0.5, factor=2.0, cap=30.0, rng=None):
+        self.base = base
+        self.factor = factor
+        self.cap = cap
+        self.failures = 0
+        self._rng = rng or random.Random()
+        
+    def next_delay(self):
+        """Delay before the next attempt; counts one more failure"""
+        ceiling = min(self.cap, self.base * self.factor ** self.failures)
+        self.failures += 1
+        return self._rng.uniform(ceiling / 2, ceiling)
+        
+    def reset(self):
+        """Forget failures after a successful connection"""
+        self.failures = 0
+
+
+class ProcessWatcher:
+    """Notices when a TOSU or osu! process starts.
+    
+    Only processes that appeared since the last check are inspected, so
+    polling it during a backoff wait stays cheap.
+    """
+    
+    NAMES = ('tosu.exe', 'tosu', 'osu!.exe', 'osu!')
+    
+    def __init__(self, names=NAMES):
+        self.names = {name.lower() for name in names}
+        self._known = set()
+        
+    def reset(self):
+        """Take the current process list as the baseline"""
+        try:
+            self._known = set(psutil.pids())
+        except Exception:
+            self._known = set()
+            
+    def appeared(self):
+        """Name of a watched process started since the last call, or None"""
+        try:
+            pids = set(psutil.pids())
+        except Exception:
+            return None
+        new_pids, self._known = pids - self._known, pids
+        for pid in new_pids:
+            try:
+                name = psutil.Process(pid).name()
+            except Exception:
+                continue  # Exited already or not accessible
+            if name.lower() in self.names:
+                return name
+        return None
+
+
+class FocusBackend:
+    """Source of foreground-window changes.
+    
+    Backends call notify(hwnd, pid) whenever the foreground window changes;
+    FocusTracker decides whether that window belongs to osu!.
+    """
+    
+    def __init__(self):
+        self.notify = None
+        
+    def start(self, notify):
+        self.notify = notify
+        
+    def stop(self):
+        self.notify = None
+        
+    @staticmethod
+    def window_pid(hwnd):
+        """Process id owning a window (0 if unknown)"""
+        try:
+            return win32process.GetWindowThreadProcessId(hwnd)[1]
+        except Exception:
+            return 0
+
+
+class Win32EventFocusBackend(FocusBackend):
+    """Foreground changes pushed by a SetWinEventHook(EVENT_SYSTEM_FOREGROUND) hook"""
+    
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WM_QUIT = 0x0012
+    
+    def __init__(self):
+        super().__init__()
+        self._thread = None
+        self._thread_id = None
+        self._callback = None  # Keep the ctypes callback alive
+        
+    @staticmethod
+    def available():
+        return sys.platform == 'win32' and win32process is not None
+        
+    def start(self, notify):
+        super().start(notify)
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), daemon=True)
+        self._thread.start()
+        ready.wait(timeout=2)
+        
+    def _run(self, ready):
+        import ctypes
+        from ctypes import wintypes
+        
+        user32 = ctypes.windll.user32
+        self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        
+        WinEventProc = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+        )
+        
+        def on_event(hook, event, hwnd, id_object, id_child, thread, event_time):
+            if self.notify and hwnd:
+                self.notify(hwnd, self.window_pid(hwnd))
+                
+        self._callback = WinEventProc(on_event)
+        hook = user32.SetWinEventHook(
+            self.EVENT_SYSTEM_FOREGROUND, self.EVENT_SYSTEM_FOREGROUND,
+            0, self._callback, 0, 0, self.WINEVENT_OUTOFCONTEXT
+        )
+        
+        # Report the window that is in front right now
+        hwnd = user32.GetForegroundWindow()
+        if self.notify and hwnd:
+            self.notify(hwnd, self.window_pid(hwnd))
+        ready.set()
+        
+        # The hook is delivered through this thread's message loop
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+        if hook:
+            user32.UnhookWinEvent(hook)
+            
+    def stop(self):
+        super().stop()
+        if self._thread_id is not None:
+            import ctypes
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, self.WM_QUIT, 0, 0)
+            self._thread_id = None
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+
+class PollFocusBackend(FocusBackend):
+    """Fallback: poll GetForegroundWindow and report only changes"""
+    
+    def __init__(self, interval=0.25):
+        super().__init__()
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        
+    @staticmethod
+    def available():
+        return win32gui is not None and win32process is not None
+        
+    def start(self, notify):
+        super().start(notify)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        
+    def _run(self):
+        last = None
+        while not self._stop.is_set():
+            try:
+                hwnd = win32gui.GetForegroundWindow()
+            except Exception:
+                hwnd = None
+            if hwnd != last:
+                last = hwnd
+                if self.notify and hwnd:
+                    self.notify(hwnd, self.window_pid(hwnd))
+            self._stop.wait(self.interval)
+            
+    def stop(self):
+        super().stop()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+
+class FakeFocusBackend(FocusBackend):
+    """Focus provider driven by hand, for runs without a desktop session"""
+    
+    def __init__(self, names=None):
+        super().__init__()
+        self.names = names if names is not None else {}  # pid -> process name
+        
+    def set_foreground(self, hwnd, pid, name=None):
+        """Pretend the window hwnd of process pid came to the front"""
+        if name is not None:
+            self.names[pid] = name
+        if self.notify:
+            self.notify(hwnd, pid)
+            
+    def process_name(self, pid):
+        return self.names.get(pid)
+
+
+class FocusTracker:
+    """Answers "is osu! in front?" from memory.
+    
+    The backend reports foreground changes. The process name is looked up only
+    when the foreground switches to a process other than the cached osu! PID,
+    so the restart path never touches psutil.
+    """
+    
+    OSU_NAMES = ('osu!.exe',)
+    
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.osu_pid = None
+        self.osu_hwnd = None
+        self.foreground_hwnd = None
+        self.focused = False
+        self._lock = threading.Lock()
+        
+        # Counters
+        self.changes = 0
+        self.lookups = 0
+        
+    @classmethod
+    def default_backend(cls):
+        """Event hook on Windows, polling if only pywin32 is usable, else None"""
+        if Win32EventFocusBackend.available():
+            return Win32EventFocusBackend()
+        if PollFocusBackend.available():
+            return PollFocusBackend()
+        return None
+        
+    def start(self):
+        if self.backend is None:
+            self.backend = self.default_backend()
+        if self.backend is not None:
+            self.backend.start(self.on_foreground)
+            
+    def stop(self):
+        if self.backend is not None:
+            self.backend.stop()
+            
+    def process_name(self, pid):
+        lookup = getattr(self.backend, 'process_name', None)
+        if lookup is not None:
+            return lookup(pid)
+        try:
+            return psutil.Process(pid).name()
+        except Exception:
+            return None
+            
+    def on_foreground(self, hwnd, pid):
+        """Foreground window changed (called on the backend thread)"""
+        with self._lock:
+            self.changes += 1
+            self.foreground_hwnd = hwnd
+            if pid and pid == self.osu_pid:
+                self.osu_hwnd = hwnd
+                self.focused = True
+                return
+                
+        self.lookups += 1
+        name = self.process_name(pid) if pid else None
+        with self._lock:
+            if self.foreground_hwnd != hwnd:
+                return  # A newer change arrived meanwhile
+            if name in self.OSU_NAMES:
+                self.osu_pid = pid
+                self.osu_hwnd = hwnd
+                self.focused = True
+            else:
+                self.focused = False
+                
+    def is_osu_focused(self):
+        return self.focused
+
+
+class FrameIngestor:
+    """Bounded hand-off between the websocket thread and frame processing.
+    
+    The socket thread only enqueues raw frames. A processor thread drains the
+    queue in batches and keeps only the newest frame, except that frames whose
+    miss/100/50 counts differ from the previous frame are always processed.
+    """
+    
+    def __init__(self, handler, maxsize=256):
+        self.handler = handler  # called with (raw frame text, perf_counter receive time)
+        self.maxsize = maxsize
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._running = False
+        self._last_hits = None
+        self._locator = TosuFrameDecoder()  # processor thread only
+        self._signature = None
+        
+        # Metrics
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.backpressure = 0
+        
+    def hits_signature(self, raw):
+        """Cheaply extract (misses, 100s, 50s) from play.hits of a raw TOSU frame"""
+        start = self._locator.find_value(raw, ('play', 'hits'))
+        if start < 0:
+            return None
+        try:
+            hits = self._locator.value_at(raw, start, 'hits')[0]
+        except ValueError:
+            return None
+        if hits is None:
+            return self._signature  # same text as the last hits object
+        if not isinstance(hits, dict):
+            return None
+        self._signature = (hits.get('0', 0), hits.get('100', 0), hits.get('50', 0))
+        return self._signature
+        
+    def start(self):
+        """Start the processor thread"""
+        if self._running:
+            return
+        # Frames left over from the previous connection are stale
+        self._drain()
+        self._running = True
+        self._last_hits = None
+        self._locator.reset()
+        if self._thread and self._thread.is_alive():
+            # Previous processor has not exited yet - keep using it
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        
+    def stop(self):
+        """Stop the processor thread"""
+        if not self._running:
+            return
+        self._running = False
+        # Unprocessed frames are discarded; this also leaves room for the wake-up sentinel
+        self._drain()
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass  # A racing submit refilled it; the processor still sees _running within its get timeout
+            
+    def _drain(self):
+        """Discard everything queued"""
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return
+                
+    def submit(self, raw, received_at=None):
+        """Enqueue a raw frame (called from the websocket thread)"""
+        self.received += 1
+        item = (raw, received_at if received_at is not None else time.perf_counter())
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # Block instead of losing frames that may carry hit deltas, but only while
+            # a processor is draining the queue - after stop() nobody will
+            self.backpressure += 1
+            while True:
+                if not self._running:
+                    self.dropped += 1
+                    return
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+        depth = self._queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+            
+    def _run(self):
+        while self._running:
+            try:
+                raw = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+                
+            batch = [raw]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+                    
+            self._process_batch([item for item in batch if item is not None])
+            
+    def _process_batch(self, batch):
+        last_index = len(batch) - 1
+        for index, (raw, received_at) in enumerate(batch):
+            hits = self.hits_signature(raw)
+            
+            # Superseded frame without miss/100/50 changes
+            if index < last_index and hits == self._last_hits:
+                self.dropped += 1
+                continue
+                
+            self._last_hits = hits
+            self.processed += 1
+            self.handler(raw, received_at)
+            
+    def get_metrics(self):
+        """Get ingestion metrics"""
+        return {
+            'depth': self._queue.qsize(),
+            'max_depth': self.max_depth,
+            'received': self.received,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'backpressure': self.backpressure
+        }
+
+
+class FrameRecorder:
+    """Tees raw TOSU frames into a gzip-compressed, timestamped capture file.
+    
+    Capture format: a '#' header line, then one '<seconds>\\t<raw frame>' line
+    per frame, where seconds is a monotonic offset from the start of recording.
+    Writing happens on a background thread so the socket thread only enqueues.
+    """
+    
+    HEADER = "# osu!helper capture v1"
+    
+    def __init__(self, path):
+        self.path = path
+        self.frames = 0
+        self._start = time.monotonic()
+        self._queue = queue.Queue()
+        self._file = gzip.open(path, 'wt', encoding='utf-8', compresslevel=6)
+        self._file.write(f"{self.HEADER} {datetime.now().isoformat()}\n")
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+        
+    def record(self, raw):
+        """Queue a raw frame for writing (safe from any thread)"""
+        self._queue.put((time.monotonic() - self._start, raw))
+        
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            offset, raw = item
+            # JSON never contains literal newlines inside strings
+            self._file.write(f"{offset:.6f}\t{raw.replace(chr(10), ' ')}\n")
+            self.frames += 1
+            
+    def close(self):
+        """Flush pending frames and close the capture"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._file.close()
+
+
+def read_capture(path):
+    """Yield (seconds, raw_frame) from a capture or a plain frames file.
+    
+    Plain files (one raw JSON frame per line, optionally gzipped) yield None
+    as the timestamp.
+    """
+    with open(path, 'rb') as f:
+        compressed = f.read(2) == b'\x1f\x8b'
+    opener = gzip.open if compressed else open
+    
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line or line.startswith('#'):
+                continue
+            if line[0] == '{':
+                yield None, line
+                continue
+            offset, _, raw = line.partition('\t')
+            try:
+                yield float(offset), raw
+            except ValueError:
+                continue
+
+
+class FrameReplayer:
+    """Feeds a capture back through a RestartEngine or a headless OsuHelper"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.frames = list(read_capture(path))
+        
+    def replay(self, app, realtime=False):
+        """Replay all frames into app; returns elapsed wall time in seconds.
+        
+        realtime=True sleeps between frames to match the capture timing and
+        goes through on_message (ingestion queue included), so app must be an
+        OsuHelper. Otherwise app may also be a bare RestartEngine; frames
+        are handled synchronously as fast as possible, and app.clock follows
+        the capture timestamps so cooldowns behave as they did live.
+        """
+        base = time.time()
+        started = time.perf_counter()
+        
+        if realtime:
+            app.ingestor.start()
+            for offset, raw in self.frames:
+                if offset is not None:
+                    delay = offset - (time.perf_counter() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+                app.on_message(None, raw)
+            # Let the processor thread drain the queue
+            while app.ingestor.get_metrics()['depth'] > 0:
+                time.sleep(0.01)
+            app.ingestor.stop()
+        else:
+            clock_now = [base]
+            app.clock = lambda: clock_now[0]
+            for index, (offset, raw) in enumerate(self.frames):
+                clock_now[0] = base + (offset if offset is not None else index / 60.0)
+                app.handle_frame(raw)
+                
+        return time.perf_counter() - started
+
+
+class SyntheticGameplay:
+    """Generates TOSU v2-shaped gameplay frames for the mock server.
+    
+    Plays through a small map pool with map changes, miss bursts, 100/50
+    streams and retries. Song time follows the frame rate, so one second of
+    frames covers one second of the map.
+    """
+    
+    MAPS = [
+        {'id': 129891, 'set': 39804, 'artist': 'xi', 'title': 'FREEDOM DiVE',
+         'version': 'FOUR DIMENSIONS', 'checksum': 'da8aae79c8f3306b5d65ec951874a7fb',
+         'cs': 4.0, 'ar': 9.0, 'od': 8.0, 'hp': 6.0, 'objects': 1983, 'length': 257000},
+        {'id': 2116202, 'set': 1010865, 'artist': 'Camellia', 'title': 'Exit This Earth\'s Atomosphere',
+         'version': 'Evolution', 'checksum': '3f1b2a9f4c0de5b64e5d0f1d7a4a8e21',
+         'cs': 4.2, 'ar': 9.6, 'od': 9.0, 'hp': 5.5, 'objects': 2140, 'length': 291000},
+        {'id': 1816113, 'set': 869222, 'artist': 'DragonForce', 'title': 'Through the Fire and Flames',
+         'version': 'Legend', 'checksum': '9b2c7a61f0e34d8c8a5b1f2e3d4c5b6a',
+         'cs': 4.0, 'ar': 9.3, 'od': 8.5, 'hp': 6.0, 'objects': 2563, 'length': 440000}
+    ]
+    
+    def __init__(self, rate_hz=60, seed=None):
+        self.rate_hz = rate_hz
+        self.random = random.Random(seed)
+        self.map_index = 0
+        self.attempts_on_map = 0
+        self._new_attempt()
+        
+    def _new_attempt(self):
+        self.time_ms = 0.0
+        self.hits = {'0': 0, '50': 0, '100': 0, '300': 0}
+        self.combo = 0
+        self.max_combo = 0
+        self.note_progress = 0.0
+        self.burst = 0   # remaining misses in a miss burst
+        self.stream = 0  # remaining notes in a 100/50 stream
+        self.retry_at = self.random.randint(6, 15)
+        self.attempts_on_map += 1
+        self.hit_errors = []  # ms, as in TOSU's precise feed
+        self.error_bias = self.random.uniform(-6, 6)
+        
+    def _next_map(self):
+        self.map_index = (self.map_index + 1) % len(self.MAPS)
+        self.attempts_on_map = 0
+        self._new_attempt()
+        
+    def _judge_note(self):
+        roll = self.random.random()
+        if self.burst > 0:
+            self.burst -= 1
+            result = '0'
+        elif self.stream > 0:
+            self.stream -= 1
+            result = '100' if roll < 0.8 else '50'
+        elif roll < 0.002:
+            self.burst = self.random.randint(2, 6)
+            result = '0'
+        elif roll < 0.004:
+            self.stream = self.random.randint(5, 20)
+            result = '100'
+        elif roll < 0.01:
+            result = '0'
+        elif roll < 0.05:
+            result = '100'
+        elif roll < 0.06:
+            result = '50'
+        else:
+            result = '300'
+            
+        self.hits[result] += 1
+        if result == '0':
+            self.combo = 0
+        else:
+            spread = 14 if result == '300' else 45
+            self.hit_errors.append(int(round(self.random.gauss(self.error_bias, spread))))
+            self.combo += 1
+            self.max_combo = max(self.max_combo, self.combo)
+            
+    def next_frame(self):
+        """Advance one frame and return it as a dict"""
+        beatmap = self.MAPS[self.map_index]
+        step_ms = 1000.0 / self.rate_hz
+        self.time_ms += step_ms
+        
+        # Judge the notes that passed during this frame
+        self.note_progress += beatmap['objects'] / beatmap['length'] * step_ms
+        while self.note_progress >= 1:
+            self.note_progress -= 1
+            self._judge_note()
+            
+        # Retry on too many misses, move on after a pass or a few attempts
+        if self.hits['0'] >= self.retry_at:
+            if self.attempts_on_map >= self.random.randint(3, 6):
+                self._next_map()
+            else:
+                self._new_attempt()
+        elif self.time_ms >= beatmap['length']:
+            self._next_map()
+            
+        return self.build_frame()
+        
+    def next_raw(self):
+        """Advance one frame and return it as compact JSON"""
+        return json.dumps(self.next_frame(), separators=(',', ':'))
+        
+    def next_precise_raw(self):
+        """Advance one frame and return the matching precise-feed message"""
+        self.next_frame()
+        pressed = sum(self.hits.values())
+        return json.dumps({
+            'currentTime': int(self.time_ms),
+            'keys': {'k1': {'isPressed': False, 'count': (pressed + 1) // 2},
+                     'k2': {'isPressed': False, 'count': pressed // 2},
+                     'm1': {'isPressed': False, 'count': 0},
+                     'm2': {'isPressed': False, 'count': 0}},
+            'hitErrors': self.hit_errors,
+            'tourney': []
+        }, separators=(',', ':'))
+        
+    def build_frame(self):
+        """Build a frame for the current state"""
+        beatmap = self.MAPS[self.map_index]
+        judged = sum(self.hits.values())
+        if judged:
+            accuracy = (300 * self.hits['300'] + 100 * self.hits['100'] + 50 * self.hits['50']) / (300 * judged) * 100
+        else:
+            accuracy = 100.0
+        health = max(0.0, 1.0 - 0.08 * self.hits['0'] + 0.0005 * self.combo)
+        
+        return {
+            'state': {'number': 2, 'name': 'play'},
+            'beatmap': {
+                'time': {'live': int(self.time_ms), 'firstObject': 0,
+                         'lastObject': beatmap['length'], 'mp3Length': beatmap['length']},
+                'status': {'number': 4, 'name': 'ranked'},
+                'checksum': beatmap['checksum'],
+                'id': beatmap['id'],
+                'set': beatmap['set'],
+                'artist': beatmap['artist'],
+                'title': beatmap['title'],
+                'mapper': 'mock',
+                'version': beatmap['version'],
+                'stats': {
+                    'CS': beatmap['cs'], 'AR': beatmap['ar'], 'OD': beatmap['od'], 'HP': beatmap['hp'],
+                    'objects': {'total': beatmap['objects']}
+                }
+            },
+            'play': {
+                'playerName': 'mock',
+                'accuracy': round(accuracy, 2),
+                'hp': {'normal': round(min(health, 1.0), 3), 'smooth': round(min(health, 1.0), 3)},
+                'hits': dict(self.hits, geki=0, katu=0, sliderBreaks=0),
+                'combo': {'current': self.combo, 'max': self.max_combo},
+                'pp': {'current': round(self.hits['300'] * 0.15, 2), 'fc': 400.0},
+                'time': {'current': int(self.time_ms), 'full': beatmap['length']}
+            },
+            'leaderboard': [],
+            'tourney': None
+        }
+
+
+class ScriptedFrames:
+    """Loops over the frames of a capture for the mock server"""
+    
+    def __init__(self, frames):
+        self.frames = frames
+        self.index = 0
+        
+    def next_raw(self):
+        raw = self.frames[self.index]
+        self.index = (self.index + 1) % len(self.frames)
+        return raw
+
+
+class MockTosuServer:
+    """Stand-in TOSU server for load and integration testing.
+    
+    Serves ws://host:port/websocket/v2 with a minimal RFC 6455 implementation
+    (no extra dependencies). Every connected client gets its own stream of
+    synthetic or scripted frames at rate_hz. Each frame starts with a
+    'mockSentAt' wall-clock timestamp for latency measurements. Synthetic
+    gameplay also serves /websocket/v2/precise (hit errors and key counts).
+    """
+    
+    WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+    MIN_RATE = 10
+    MAX_RATE = 1000
+    
+    def __init__(self, host='127.0.0.1', port=24050, rate_hz=60, script=None,
+                 seed=None, disconnect_every=0):
+        self.host = host
+        self.port = port
+        self.rate_hz = max(self.MIN_RATE, min(self.MAX_RATE, rate_hz))
+        self.script_frames = load_frames(script) if script else None
+        self.seed = seed
+        self.disconnect_every = disconnect_every
+        self._socket = None
+        self._running = False
+        self._accept_thread = None
+        
+        # Metrics
+        self.frames_sent = 0
+        self.precise_sent = 0
+        self.connections = 0
+        self.disconnects = 0
+        
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/websocket/v2"
+        
+    @staticmethod
+    def sent_at(raw):
+        """Extract the mockSentAt timestamp from a raw frame (0 if absent)"""
+        if not raw.startswith('{"mockSentAt":'):
+            return 0.0
+        try:
+            return float(raw[14:raw.index(',', 14)])
+        except ValueError:
+            return 0.0
+            
+    @staticmethod
+    def encode_frame(payload, opcode=0x1):
+        """Encode an unmasked server-to-client websocket frame"""
+        length = len(payload)
+        if length < 126:
+            header = struct.pack('!BB', 0x80 | opcode, length)
+        elif length < 65536:
+            header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+        return header + payload
+        
+    def start(self):
+        """Start listening in a background thread"""
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.host, self.port))
+        self.port = self._socket.getsockname()[1]
+        self._socket.listen(8)
+        self._socket.settimeout(0.5)
+        self._running = True
+        self._accept_thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._accept_thread.start()
+        
+    def stop(self):
+        """Stop accepting and close client streams"""
+        self._running = False
+        if self._socket:
+            self._socket.close()
+            self._socket = None
+            
+    def serve_forever(self):
+        """Run until interrupted, printing throughput every few seconds"""
+        self.start()
+        print(f"Mock TOSU serving {self.url} at {self.rate_hz} Hz "
+              f"({'script' if self.script_frames else 'synthetic'} frames)")
+        try:
+            last_sent = 0
+            while True:
+                time.sleep(5)
+                sent = self.frames_sent
+                print(f"{(sent - last_sent) / 5:.0f} frames/s, {self.connections} connections, "
+                      f"{self.disconnects} disconnects")
+                last_sent = sent
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+            
+    def _accept_loop(self):
+        while self._running:
+            try:
+                conn, _ = self._socket.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            threading.Thread(target=self._handle_client, args=(conn,), daemon=True).start()
+            
+    def _handshake(self, conn):
+        """Perform the HTTP upgrade; returns the served path, or None"""
+        request = b''
+        while b'\r\n\r\n' not in request:
+            chunk = conn.recv(4096)
+            if not chunk:
+                return None
+            request += chunk
+            
+        lines = request.decode('latin-1').split('\r\n')
+        path = lines[0].split(' ')[1] if len(lines[0].split(' ')) > 1 else ''
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+            
+        key = headers.get('sec-websocket-key')
+        path = path.rstrip('/')
+        paths = ('/websocket/v2',) if self.script_frames else ('/websocket/v2', '/websocket/v2/precise')
+        if not key or path not in paths:
+            conn.sendall(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+            return None
+            
+        accept = base64.b64encode(hashlib.sha1((key + self.WS_GUID).encode()).digest()).decode()
+        conn.sendall((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode())
+        return path
+        
+    def _client_closed(self, conn):
+        """Read pending client frames; returns True once the client closed"""
+        readable, _, _ = select.select([conn], [], [], 0)
+        if not readable:
+            return False
+        data = conn.recv(65536)
+        # Empty read or a close frame (opcode 0x8) ends the stream
+        return not data or (data[0] & 0x0F) == 0x8
+        
+    def _make_source(self):
+        if self.script_frames:
+            return ScriptedFrames(self.script_frames)
+        return SyntheticGameplay(self.rate_hz, self.seed)
+        
+    def _handle_client(self, conn):
+        try:
+            path = self._handshake(conn)
+            if not path:
+                return
+            source = self._make_source()
+            precise = path.endswith('/precise')
+            if not precise:
+                self.connections += 1
+            interval = 1.0 / self.rate_hz
+            started = time.perf_counter()
+            next_time = started
+            
+            while self._running:
+                if precise:
+                    conn.sendall(self.encode_frame(source.next_precise_raw().encode('utf-8')))
+                    self.precise_sent += 1
+                else:
+                    body = source.next_raw()
+                    stamped = '{"mockSentAt":%.6f,%s' % (time.time(), body[1:])
+                    conn.sendall(self.encode_frame(stamped.encode('utf-8')))
+                    self.frames_sent += 1
+                
+                if self._client_closed(conn):
+                    break
+                    
+                # Scripted disconnect
+                if self.disconnect_every and time.perf_counter() - started >= self.disconnect_every:
+                    conn.sendall(self.encode_frame(struct.pack('!H', 1001), opcode=0x8))
+                    self.disconnects += 1
+                    break
+                    
+                next_time += interval
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -1.0:
+                    # Fell far behind - don't try to catch up with a burst
+                    next_time = time.perf_counter()
+        except OSError:
+            pass
+        finally:
+            conn.close()
+
+
+def _engine_attribute(name):
+    """Property forwarding an OsuHelper attribute to its RestartEngine"""
+    return property(lambda self: getattr(self.engine, name),
+                    lambda self, value: setattr(self.engine, name, value))
+
+
+class OsuHelper:
+    # Decision state lives in the engine; the window reads and edits it in place
+    miss_threshold = _engine_attribute('miss_threshold')
+    hit100_threshold_enabled = _engine_attribute('hit100_threshold_enabled')
+    hit100_threshold = _engine_attribute('hit100_threshold')
+    hit50_threshold_enabled = _engine_attribute('hit50_threshold_enabled')
+    hit50_threshold = _engine_attribute('hit50_threshold')
+    accuracy_threshold_enabled = _engine_attribute('accuracy_threshold_enabled')
+    accuracy_threshold = _engine_attribute('accuracy_threshold')
+    ur_threshold_enabled = _engine_attribute('ur_threshold_enabled')
+    ur_threshold = _engine_attribute('ur_threshold')
+    restart_rule = _engine_attribute('restart_rule')
+    cooldown_duration = _engine_attribute('cooldown_duration')
+    our_miss_count = _engine_attribute('our_miss_count')
+    total_restarts = _engine_attribute('total_restarts')
+    current_map_id = _engine_attribute('current_map_id')
+    current_map_name = _engine_attribute('current_map_name')
+    current_hit100 = _engine_attribute('current_hit100')
+    current_hit50 = _engine_attribute('current_hit50')
+    current_accuracy = _engine_attribute('current_accuracy')
+    current_combo = _engine_attribute('current_combo')
+    current_pp = _engine_attribute('current_pp')
+    current_hp = _engine_attribute('current_hp')
+    current_progress = _engine_attribute('current_progress')
+    is_restarting = _engine_attribute('is_restarting')
+    last_restart_time = _engine_attribute('last_restart_time')
+    clock = _engine_attribute('clock')
+    dry_run = _engine_attribute('dry_run')
+    restart_decisions = _engine_attribute('restart_decisions')
+    
+    # Log colour argument -> colour scheme key
+    LOG_COLORS = {'green': 'success', 'red': 'danger', 'orange': 'warning', 'blue': 'primary'}
+    
+    # Lines kept in the log box; the rest stays in the log buffer
+    LOG_VISIBLE_LINES = 200
+    
+    # Shortest gap between parsed precise messages (each repeats the whole hitErrors list)
+    PRECISE_INTERVAL = 0.05
+    
+    # Seconds between latency label refreshes (percentile scans stay off the frame path)
+    LATENCY_REFRESH = 1.0
+    
+    def __init__(self, root, stats=None):
+        self.root = root
+        
+        # No window: used for capture replay and other headless runs
+        self.headless = root is None
+        
+        if not self.headless:
+            self.root.title("osu!helper v2.0 Enhanced")
+            self.root.geometry("1000x800")
+            self.root.minsize(700, 600)
+            
+            # Make window resizable
+            self.root.resizable(True, True)
+        
+        # Language and theme
+        self.lang = Language()
+        self.current_theme = "dark"
+        self.color_scheme = "blue"
+        self.font_size = 12
+        
+        # Widget roles for in-place restyling
+        self.widgets = WidgetRegistry(self.lang)
+        
+        # Window properties
+        self.always_on_top = False
+        self.transparency = 1.0
+        self.mini_mode = False
+        
+        # UI refresh rate for coalesced label updates (Hz)
+        self.ui_refresh_rate = 30
+        
+        # Window for coalescing config/stats writes (seconds)
+        self.save_debounce = 1.0
+        
+        # Decision core; the window subscribes to its events
+        self.engine = RestartEngine(stats=stats, lang=self.lang)
+        self.engine.subscribe(self._on_engine_event)
+        self.stats = self.engine.stats
+        self.decoder = self.engine.decoder
+        
+        # TOSU connection
+        self.tosu_url = TOSU_URL
+        self.ws = None
+        self.ws_thread = None
+        self.running = False
+        self.connected = False
+        
+        # Reconnect state machine: connecting -> connected -> backoff -> connecting
+        self.connection_state = 'disconnected'
+        self.reconnect = ReconnectBackoff()
+        self.process_watcher = ProcessWatcher()
+        self._wake_reconnect = threading.Event()
+        self._attempt_started = 0.0
+        self._disconnected_since = None
+        self._awaiting_first_frame = False
+        self.connection_metrics = {
+            'attempts': 0,
+            'connections': 0,
+            'disconnected_seconds': 0.0,
+            'time_to_first_frame': None  # seconds, last (re)connect
+        }
+        
+        # Frame ingestion (socket thread -> processor thread)
+        self.ingestor = FrameIngestor(self.handle_frame)
+        
+        # Optional second connection to /websocket/v2/precise for hit errors
+        self.precise_enabled = False
+        self.ur_window = 200
+        self.precise_ws = None
+        self.precise_thread = None
+        self._wake_precise = threading.Event()
+        self._precise_parsed_at = 0.0
+        self._latency_rendered_at = 0.0
+        self.precise_metrics = {'received': 0, 'parsed': 0, 'connections': 0}
         
         # Display toggles
         self.show_accuracy = True
@@ -555,23 +3915,66 @@ class OsuHelper:
         self.show_progress = True
         
         # Restart settings
-        self.restart_key = Key.f2  # Default to F2
+        self.restart_key = Key.f2 if Key else None  # Default to F2
         self.restart_key_name = "F2"
         self.hold_duration = 1.5
-        self.cooldown_duration = 10.0
         
-        # Protection
-        self.is_restarting = False
-        self.last_restart_time = 0
+        # Longest wait for TOSU to show the retry before tracking resumes anyway
+        self.retry_timeout = 3.0
+        
+        # Press/release timeline for restarts
+        self.actuator = RestartActuator(on_error=self._actuator_failed)
+        
+        # Foreground window tracking (started with the window or --headless)
+        self.focus = FocusTracker()
+        self.key_held = False
+        
+        # Live session chart (built on first use; matplotlib loads with it)
+        self.show_graph = False
+        self.graph_fps = 10
+        self.chart = None
+        
+        # Last map stats and history lines (kept across GUI rebuilds)
+        self.map_stats_text = ""
+        self.map_history_text = ""
+        
+        # Optional capture of raw frames
+        self.recorder = None
+        
+        # Optional extra consumer of log lines (headless runs print them)
+        self.log_listener = None
+        
+        # Activity log: bounded buffer, rendered in batches on the Tk thread
+        self.log_capacity = 1000
+        self.log_buffer = LogBuffer(self.log_capacity)
         
         # Keyboard
-        self.keyboard = Controller()
+        self.keyboard = Controller() if Controller else None
         self.key_listener = None
         self.capturing_key = False
         self.hotkeys = None
         
         # Load config
         self.load_config()
+        self.engine.hit_errors.set_size(self.ur_window)
+        self.engine.compile_rule()
+        
+        # Coalesced UI updates from worker threads
+        self.ui = UiUpdateScheduler(self.root, self._resolve_widget, self.ui_refresh_rate)
+        self.ui.add_hook(self.render_log)
+        self.ui.add_hook(self.render_chart)
+        self.ui.add_hook(self.render_latency)
+        self.log_buffer.set_capacity(self.log_capacity)
+        
+        # Debounced config/stats writes off the UI and socket threads
+        self.persistence = PersistenceWorker(self.write_config, self.save_debounce)
+        self.actuator.start()
+        
+        if self.headless:
+            return  # Replays and load tests never write the user's config/stats
+        
+        self.persistence.start()
+        self.focus.start()
         
         # Setup hotkeys
         self.setup_hotkeys()
@@ -579,6 +3982,9 @@ class OsuHelper:
         # Create GUI
         self.create_gui()
         
+        # Start fixed-rate UI flush
+        self.ui.start()
+        
         # Update connection status after GUI creation
         self.update_connection_status()
         
@@ -588,6 +3994,19 @@ class OsuHelper:
         # Apply window properties
         self.apply_window_properties()
         
+    def _resolve_widget(self, name):
+        """Resolve widget attribute name for the UI scheduler (None while its view is hidden)"""
+        if name.startswith('mini_') != self.mini_mode:
+            return None
+        return getattr(self, name, None)
+        
+    def call_on_ui(self, func):
+        """Run func on the Tk thread (directly when headless)"""
+        if self.headless:
+            func()
+        else:
+            self.root.after(0, func)
+        
     def setup_hotkeys(self):
         """Setup global hotkeys"""
         try:
@@ -692,17 +4111,100 @@ class OsuHelper:
         
     def create_gui(self):
         """Create the GUI"""
+        # A rebuild registers every widget again at the current style
+        self.widgets.clear()
+        self.widgets.scheme = self.color_scheme
+        self.widgets.font_size = self.font_size
+        
+        # Clear existing widgets
+        for widget in self.root.winfo_children():
+            widget.destroy()
+        self.chart = None  # Its canvas went with them
+            
+        # Both views live for the whole session; Ctrl+K only swaps them
+        self.create_full_gui()
+        self.create_mini_gui()
+        self.show_view()
+        
+    def show_view(self):
+        """Show the prepared view for the current mode and hide the other"""
         if self.mini_mode:
-            self.create_mini_gui()
+            self.main_frame.grid_remove()
+            self.apply_mini_window()
+            self.mini_frame.grid()
+            # Make window focusable for hotkeys
+            self.root.focus_force()
         else:
-            self.create_full_gui()
+            self.mini_frame.grid_remove()
+            self.apply_full_window()
+            self.main_frame.grid()
+        self.refresh_live_view()
+        
+    def apply_mini_window(self):
+        """Configure the window as a small transparent overlay"""
+        self.root.geometry("400x300")
+        self.root.overrideredirect(False)  # Keep window decorations for resizing
+        self.root.attributes('-topmost', True)
+        self.root.attributes('-alpha', 0.85)
+        self.root.resizable(True, True)  # Allow resizing
+        self.root.minsize(300, 200)      # Minimum size
+        self.root.maxsize(800, 600)      # Maximum size
+        
+        # Set background to a color that will be made transparent
+        self.root.configure(bg='#010101')
+        
+        # Make background transparent
+        try:
+            self.root.attributes('-transparentcolor', '#010101')
+        except:
+            pass
+            
+    def apply_full_window(self):
+        """Configure the window for the full view"""
+        # Remove click-through if enabled
+        try:
+            hwnd = self.root.winfo_id()
+            style = win32gui.GetWindowLong(hwnd, win32con.GWL_EXSTYLE)
+            style &= ~(win32con.WS_EX_LAYERED | win32con.WS_EX_TRANSPARENT)
+            win32gui.SetWindowLong(hwnd, win32con.GWL_EXSTYLE, style)
+        except:
+            pass
+            
+        # Reset window attributes
+        self.root.overrideredirect(False)
+        
+        # Remove transparent color
+        try:
+            self.root.attributes('-transparentcolor', '')
+        except:
+            pass
             
+        self.root.resizable(True, True)
+        self.root.minsize(700, 600)
+        self.root.maxsize(2000, 1500)
+        self.apply_window_properties()
+        
+    def refresh_live_view(self):
+        """Bring the shown view up to date (its labels are skipped while hidden)"""
+        misses = str(self.our_miss_count)
+        self.ui.set_text('miss_value', misses)
+        self.ui.set_text('mini_miss_value', misses)
+        self.ui.set_text('hit100_value', str(self.current_hit100))
+        self.ui.set_text('hit50_value', str(self.current_hit50))
+        self.ui.set_text('threshold_value', str(self.miss_threshold))
+        self.ui.set_text('mini_threshold_value', str(self.miss_threshold))
+        self.ui.set_text('restart_value', str(self.total_restarts))
+        self.ui.set_text('map_label', self.map_display_text())
+        self.ui.set_text('mini_map_label', self.map_display_text())
+        self.ui.set_text('map_stats_label', self.map_stats_text)
+        self.ui.set_text('map_history_label', self.map_history_text)
+        self.update_tosu_displays()
+        self.update_hit_error_displays()
+        self.refresh_stats_labels()
+        self.update_connection_status()
+        
     def create_full_gui(self):
         """Create the full GUI"""
-        # Clear existing widgets
-        for widget in self.root.winfo_children():
-            widget.destroy()
-            
         # Main scrollable frame
         self.main_frame = ctk.CTkScrollableFrame(self.root)
         self.main_frame.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
@@ -748,28 +4250,6 @@ class OsuHelper:
         
     def create_mini_gui(self):
         """Create mini mode GUI with transparent overlay"""
-        # Clear existing widgets
-        for widget in self.root.winfo_children():
-            widget.destroy()
-            
-        # Configure window for mini mode
-        self.root.geometry("400x300")
-        self.root.overrideredirect(False)  # Keep window decorations for resizing
-        self.root.attributes('-topmost', True)
-        self.root.attributes('-alpha', 0.85)
-        self.root.resizable(True, True)  # Allow resizing
-        self.root.minsize(300, 200)      # Minimum size
-        self.root.maxsize(800, 600)      # Maximum size
-        
-        # Set background to a color that will be made transparent
-        self.root.configure(bg='#010101')
-        
-        # Make background transparent
-        try:
-            self.root.attributes('-transparentcolor', '#010101')
-        except:
-            pass
-        
         # Variables for dragging
         self.drag_start_x = 0
         self.drag_start_y = 0
@@ -782,7 +4262,8 @@ class OsuHelper:
             border_width=1,
             border_color=("gray40", "gray60")
         )
-        bg_frame.pack(fill="both", expand=True, padx=5, pady=5)
+        bg_frame.grid(row=0, column=0, sticky="nsew", padx=5, pady=5)
+        self.mini_frame = bg_frame
         
         # Add drag functionality to bg_frame
         bg_frame.bind("<Button-1>", self.start_drag)
@@ -848,11 +4329,11 @@ class OsuHelper:
             text_color="gray"
         ).pack(anchor="w")
         
-        self.mini_miss_value = ctk.CTkLabel(
-            miss_container,
+        self.mini_miss_value = self.widgets.create(
+            ctk.CTkLabel, miss_container,
             text="0",
             font=("Segoe UI", 24, "bold"),
-            text_color=ColorSchemes.SCHEMES[self.color_scheme]['danger']
+            color_role='danger'
         )
         self.mini_miss_value.pack(anchor="w")
         
@@ -867,11 +4348,11 @@ class OsuHelper:
             text_color="gray"
         ).pack(anchor="e")
         
-        self.mini_threshold_value = ctk.CTkLabel(
-            threshold_container,
+        self.mini_threshold_value = self.widgets.create(
+            ctk.CTkLabel, threshold_container,
             text=str(self.miss_threshold),
             font=("Segoe UI", 24, "bold"),
-            text_color=ColorSchemes.SCHEMES[self.color_scheme]['warning']
+            color_role='warning'
         )
         self.mini_threshold_value.pack(anchor="e")
         
@@ -891,11 +4372,11 @@ class OsuHelper:
                     text_color="gray"
                 ).pack(anchor="w")
                 
-                self.mini_accuracy_label = ctk.CTkLabel(
-                    acc_container,
+                self.mini_accuracy_label = self.widgets.create(
+                    ctk.CTkLabel, acc_container,
                     text="0.00%",
                     font=("Segoe UI", 16, "bold"),
-                    text_color=ColorSchemes.SCHEMES[self.color_scheme]['info']
+                    color_role='info'
                 )
                 self.mini_accuracy_label.pack(anchor="w")
             
@@ -910,11 +4391,11 @@ class OsuHelper:
                     text_color="gray"
                 ).pack(anchor="e")
                 
-                self.mini_combo_label = ctk.CTkLabel(
-                    combo_container,
+                self.mini_combo_label = self.widgets.create(
+                    ctk.CTkLabel, combo_container,
                     text="0x",
                     font=("Segoe UI", 16, "bold"),
-                    text_color=ColorSchemes.SCHEMES[self.color_scheme]['success']
+                    color_role='success'
                 )
                 self.mini_combo_label.pack(anchor="e")
         
@@ -934,11 +4415,11 @@ class OsuHelper:
                     text_color="gray"
                 ).pack(anchor="w")
                 
-                self.mini_pp_label = ctk.CTkLabel(
-                    pp_container,
+                self.mini_pp_label = self.widgets.create(
+                    ctk.CTkLabel, pp_container,
                     text="0",
                     font=("Segoe UI", 16, "bold"),
-                    text_color=ColorSchemes.SCHEMES[self.color_scheme]['primary']
+                    color_role='primary'
                 )
                 self.mini_pp_label.pack(anchor="w")
             
@@ -953,11 +4434,11 @@ class OsuHelper:
                     text_color="gray"
                 ).pack(anchor="e")
                 
-                self.mini_hp_label = ctk.CTkLabel(
-                    hp_container,
+                self.mini_hp_label = self.widgets.create(
+                    ctk.CTkLabel, hp_container,
                     text="0.0%",
                     font=("Segoe UI", 16, "bold"),
-                    text_color=ColorSchemes.SCHEMES[self.color_scheme]['danger']
+                    color_role='danger'
                 )
                 self.mini_hp_label.pack(anchor="e")
         
@@ -973,14 +4454,34 @@ class OsuHelper:
                 text_color="gray"
             ).pack(anchor="w")
             
-            self.mini_progress_label = ctk.CTkLabel(
-                progress_frame,
+            self.mini_progress_label = self.widgets.create(
+                ctk.CTkLabel, progress_frame,
                 text="0.0%",
                 font=("Segoe UI", 14, "bold"),
-                text_color=ColorSchemes.SCHEMES[self.color_scheme]['info']
+                color_role='info'
             )
             self.mini_progress_label.pack(anchor="w")
         
+        # Unstable rate (precise feed)
+        if self.precise_enabled:
+            ur_container = ctk.CTkFrame(game_data_frame, fg_color="transparent")
+            ur_container.pack(fill="x", pady=2)
+            
+            ctk.CTkLabel(
+                ur_container,
+                text="UR:",
+                font=("Segoe UI", 9),
+                text_color="gray"
+            ).pack(side="left")
+            
+            self.mini_ur_label = self.widgets.create(
+                ctk.CTkLabel, ur_container,
+                text="-",
+                font=("Segoe UI", 12, "bold"),
+                color_role='warning'
+            )
+            self.mini_ur_label.pack(side="left", padx=(5, 0))
+        
         # Current map (compact)
         map_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
         map_frame.pack(fill="x", pady=(10, 0))
@@ -992,9 +4493,9 @@ class OsuHelper:
             text_color="gray"
         ).pack(anchor="w")
         
-        self.mini_map_label = ctk.CTkLabel(
-            map_frame,
-            text=self.lang.get('not_playing'),
+        self.mini_map_label = self.widgets.create(
+            ctk.CTkLabel, map_frame,
+            text_key=self.map_display_text,
             font=("Segoe UI", 9),
             text_color="white",
             wraplength=330
@@ -1006,34 +4507,29 @@ class OsuHelper:
         control_frame.pack(fill="x", pady=(5, 0))
         
         # Click-through toggle button
-        self.click_through_btn = ctk.CTkButton(
-            control_frame,
+        self.click_through_btn = self.widgets.create(
+            ctk.CTkButton, control_frame,
             text="👆 Interactive",
             command=self.toggle_click_through,
             width=110,
             height=25,
             font=("Segoe UI", 9),
-            fg_color=ColorSchemes.SCHEMES[self.color_scheme]['success'],
-            hover_color=ColorSchemes.SCHEMES[self.color_scheme]['button']
+            fill_role='success'
         )
         self.click_through_btn.pack(side="left", padx=2)
         
         # Exit mini mode button
-        exit_btn = ctk.CTkButton(
-            control_frame,
+        exit_btn = self.widgets.create(
+            ctk.CTkButton, control_frame,
             text="🖥️ Normal",
             command=self.toggle_mini_mode,
             width=80,
             height=25,
             font=("Segoe UI", 9),
-            fg_color=ColorSchemes.SCHEMES[self.color_scheme]['primary'],
-            hover_color=ColorSchemes.SCHEMES[self.color_scheme]['button']
+            fill_role='primary'
         )
         exit_btn.pack(side="right", padx=2)
         
-        # Make window focusable for hotkeys
-        self.root.focus_force()
-        
         # Add right-click context menu for easy access
         def show_context_menu(event):
             try:
@@ -1074,16 +4570,16 @@ class OsuHelper:
         title_frame = ctk.CTkFrame(header_frame, fg_color="transparent")
         title_frame.grid(row=0, column=0, sticky="w")
         
-        self.title_label = ctk.CTkLabel(
-            title_frame,
-            text=self.lang.get('title'),
+        self.title_label = self.widgets.create(
+            ctk.CTkLabel, title_frame,
+            text_key='title',
             font=("Segoe UI", 32, "bold")
         )
         self.title_label.pack(anchor="w")
         
-        self.credits_label = ctk.CTkLabel(
-            title_frame,
-            text=self.lang.get('credits'),
+        self.credits_label = self.widgets.create(
+            ctk.CTkLabel, title_frame,
+            text_key='credits',
             font=("Segoe UI", 12),
             text_color="gray"
         )
@@ -1106,39 +4602,35 @@ class OsuHelper:
         self.status_label.pack(pady=2)
         
         # Mini mode button
-        self.mini_mode_btn = ctk.CTkButton(
-            controls_frame,
+        self.mini_mode_btn = self.widgets.create(
+            ctk.CTkButton, controls_frame,
             text="📱 Mini",
             command=self.toggle_mini_mode,
             width=80,
             height=32,
-            fg_color=ColorSchemes.SCHEMES[self.color_scheme]['primary'],
-            hover_color=ColorSchemes.SCHEMES[self.color_scheme]['button']
+            fill_role='primary'
         )
         self.mini_mode_btn.pack(pady=2)
         
         # Language button
-        self.lang_button = ctk.CTkButton(
-            controls_frame,
-            text=self.lang.get('russian') if self.lang.is_russian else self.lang.get('english'),
+        self.lang_button = self.widgets.create(
+            ctk.CTkButton, controls_frame,
+            text_key=lambda: self.lang.get('russian') if self.lang.is_russian else self.lang.get('english'),
             command=self.toggle_language,
             width=80,
             height=32,
-            fg_color=ColorSchemes.SCHEMES[self.color_scheme]['info'],
-            hover_color=ColorSchemes.SCHEMES[self.color_scheme]['button']
+            fill_role='info'
         )
         self.lang_button.pack(pady=2)
         
         # Theme button
-        theme_text = self.lang.get('dark') if self.current_theme == "dark" else self.lang.get('light')
-        self.theme_button = ctk.CTkButton(
-            controls_frame,
-            text=theme_text,
+        self.theme_button = self.widgets.create(
+            ctk.CTkButton, controls_frame,
+            text_key=lambda: self.lang.get('dark') if self.current_theme == "dark" else self.lang.get('light'),
             command=self.toggle_theme,
             width=80,
             height=32,
-            fg_color=ColorSchemes.SCHEMES[self.color_scheme]['warning'],
-            hover_color=ColorSchemes.SCHEMES[self.color_scheme]['button']
+            fill_role='warning'
         )
         self.theme_button.pack(pady=2)
         
@@ -1152,18 +4644,18 @@ class OsuHelper:
         miss_card = ctk.CTkFrame(stats_frame)
         miss_card.grid(row=0, column=0, sticky="ew", padx=5)
         
-        self.miss_title = ctk.CTkLabel(
-            miss_card,
-            text=self.lang.get('current_misses'),
-            font=(f"Segoe UI", self.font_size)
+        self.miss_title = self.widgets.create(
+            ctk.CTkLabel, miss_card,
+            text_key='current_misses',
+            font_role='body'
         )
         self.miss_title.pack(pady=(15, 5))
         
-        self.miss_value = ctk.CTkLabel(
-            miss_card,
+        self.miss_value = self.widgets.create(
+            ctk.CTkLabel, miss_card,
             text="0",
             font=(f"Segoe UI", 48, "bold"),
-            text_color=ColorSchemes.SCHEMES[self.color_scheme]['primary']
+            color_role='primary'
         )
         self.miss_value.pack(pady=(0, 15))
         
@@ -1171,18 +4663,18 @@ class OsuHelper:
         hit100_card = ctk.CTkFrame(stats_frame)
         hit100_card.grid(row=0, column=1, sticky="ew", padx=5)
         
-        self.hit100_title = ctk.CTkLabel(
-            hit100_card,
-            text=self.lang.get('current_hit100'),
-            font=(f"Segoe UI", self.font_size)
+        self.hit100_title = self.widgets.create(
+            ctk.CTkLabel, hit100_card,
+            text_key='current_hit100',
+            font_role='body'
         )
         self.hit100_title.pack(pady=(15, 5))
         
-        self.hit100_value = ctk.CTkLabel(
-            hit100_card,
+        self.hit100_value = self.widgets.create(
+            ctk.CTkLabel, hit100_card,
             text="0",
             font=(f"Segoe UI", 48, "bold"),
-            text_color=ColorSchemes.SCHEMES[self.color_scheme]['info']
+            color_role='info'
         )
         self.hit100_value.pack(pady=(0, 15))
         
@@ -1190,18 +4682,18 @@ class OsuHelper:
         hit50_card = ctk.CTkFrame(stats_frame)
         hit50_card.grid(row=0, column=2, sticky="ew", padx=5)
         
-        self.hit50_title = ctk.CTkLabel(
-            hit50_card,
-            text=self.lang.get('current_hit50'),
-            font=(f"Segoe UI", self.font_size)
+        self.hit50_title = self.widgets.create(
+            ctk.CTkLabel, hit50_card,
+            text_key='current_hit50',
+            font_role='body'
         )
         self.hit50_title.pack(pady=(15, 5))
         
-        self.hit50_value = ctk.CTkLabel(
-            hit50_card,
+        self.hit50_value = self.widgets.create(
+            ctk.CTkLabel, hit50_card,
             text="0",
             font=(f"Segoe UI", 48, "bold"),
-            text_color=ColorSchemes.SCHEMES[self.color_scheme]['warning']
+            color_role='warning'
         )
         self.hit50_value.pack(pady=(0, 15))
         
@@ -1209,18 +4701,18 @@ class OsuHelper:
         threshold_card = ctk.CTkFrame(stats_frame)
         threshold_card.grid(row=0, column=2, sticky="ew", padx=5)
         
-        self.threshold_title = ctk.CTkLabel(
-            threshold_card,
-            text=self.lang.get('threshold'),
-            font=(f"Segoe UI", self.font_size)
+        self.threshold_title = self.widgets.create(
+            ctk.CTkLabel, threshold_card,
+            text_key='threshold',
+            font_role='body'
         )
         self.threshold_title.pack(pady=(15, 5))
         
-        self.threshold_value = ctk.CTkLabel(
-            threshold_card,
+        self.threshold_value = self.widgets.create(
+            ctk.CTkLabel, threshold_card,
             text=str(self.miss_threshold),
             font=(f"Segoe UI", 48, "bold"),
-            text_color=ColorSchemes.SCHEMES[self.color_scheme]['warning']
+            color_role='warning'
         )
         self.threshold_value.pack(pady=(0, 15))
         
@@ -1228,18 +4720,18 @@ class OsuHelper:
         restart_card = ctk.CTkFrame(stats_frame)
         restart_card.grid(row=0, column=3, sticky="ew", padx=5)
         
-        self.restart_title = ctk.CTkLabel(
-            restart_card,
-            text=self.lang.get('total_restarts'),
-            font=(f"Segoe UI", self.font_size)
+        self.restart_title = self.widgets.create(
+            ctk.CTkLabel, restart_card,
+            text_key='total_restarts',
+            font_role='body'
         )
         self.restart_title.pack(pady=(15, 5))
         
-        self.restart_value = ctk.CTkLabel(
-            restart_card,
+        self.restart_value = self.widgets.create(
+            ctk.CTkLabel, restart_card,
             text=str(self.total_restarts),
             font=(f"Segoe UI", 48, "bold"),
-            text_color=ColorSchemes.SCHEMES[self.color_scheme]['success']
+            color_role='success'
         )
         self.restart_value.pack(pady=(0, 15))
         
@@ -1247,26 +4739,26 @@ class OsuHelper:
         """Create additional TOSU data display"""
         tosu_frame = ctk.CTkFrame(self.main_frame)
         tosu_frame.grid(row=2, column=0, sticky="ew", pady=(0, 20))
-        tosu_frame.grid_columnconfigure((0, 1, 2, 3, 4), weight=1)
+        tosu_frame.grid_columnconfigure((0, 1, 2, 3, 4, 5), weight=1)
         
         # Title
-        title_label = ctk.CTkLabel(
-            tosu_frame,
+        title_label = self.widgets.create(
+            ctk.CTkLabel, tosu_frame,
             text="🎮 Live Game Data",
-            font=(f"Segoe UI", self.font_size + 2, "bold")
+            font_role='heading'
         )
-        title_label.grid(row=0, column=0, columnspan=5, pady=(10, 15))
+        title_label.grid(row=0, column=0, columnspan=6, pady=(10, 15))
         
         # Accuracy
         if self.show_accuracy:
             acc_frame = ctk.CTkFrame(tosu_frame)
             acc_frame.grid(row=1, column=0, sticky="ew", padx=2, pady=5)
-            ctk.CTkLabel(acc_frame, text="Accuracy", font=(f"Segoe UI", self.font_size-2)).pack(pady=2)
-            self.accuracy_label = ctk.CTkLabel(
-                acc_frame, 
+            self.widgets.create(ctk.CTkLabel, acc_frame, text="Accuracy", font_role='small').pack(pady=2)
+            self.accuracy_label = self.widgets.create(
+                ctk.CTkLabel, acc_frame,
                 text="0.00%", 
-                font=(f"Segoe UI", self.font_size+2, "bold"),
-                text_color=ColorSchemes.SCHEMES[self.color_scheme]['info']
+                font_role='heading',
+                color_role='info'
             )
             self.accuracy_label.pack(pady=2)
         
@@ -1274,12 +4766,12 @@ class OsuHelper:
         if self.show_combo:
             combo_frame = ctk.CTkFrame(tosu_frame)
             combo_frame.grid(row=1, column=1, sticky="ew", padx=2, pady=5)
-            ctk.CTkLabel(combo_frame, text="Combo", font=(f"Segoe UI", self.font_size-2)).pack(pady=2)
-            self.combo_label = ctk.CTkLabel(
-                combo_frame, 
+            self.widgets.create(ctk.CTkLabel, combo_frame, text="Combo", font_role='small').pack(pady=2)
+            self.combo_label = self.widgets.create(
+                ctk.CTkLabel, combo_frame,
                 text="0x", 
-                font=(f"Segoe UI", self.font_size+2, "bold"),
-                text_color=ColorSchemes.SCHEMES[self.color_scheme]['success']
+                font_role='heading',
+                color_role='success'
             )
             self.combo_label.pack(pady=2)
         
@@ -1287,12 +4779,12 @@ class OsuHelper:
         if self.show_pp:
             pp_frame = ctk.CTkFrame(tosu_frame)
             pp_frame.grid(row=1, column=2, sticky="ew", padx=2, pady=5)
-            ctk.CTkLabel(pp_frame, text="PP", font=(f"Segoe UI", self.font_size-2)).pack(pady=2)
-            self.pp_label = ctk.CTkLabel(
-                pp_frame, 
+            self.widgets.create(ctk.CTkLabel, pp_frame, text="PP", font_role='small').pack(pady=2)
+            self.pp_label = self.widgets.create(
+                ctk.CTkLabel, pp_frame,
                 text="0", 
-                font=(f"Segoe UI", self.font_size+2, "bold"),
-                text_color=ColorSchemes.SCHEMES[self.color_scheme]['primary']
+                font_role='heading',
+                color_role='primary'
             )
             self.pp_label.pack(pady=2)
         
@@ -1300,12 +4792,12 @@ class OsuHelper:
         if self.show_hp:
             hp_frame = ctk.CTkFrame(tosu_frame)
             hp_frame.grid(row=1, column=3, sticky="ew", padx=2, pady=5)
-            ctk.CTkLabel(hp_frame, text="HP", font=(f"Segoe UI", self.font_size-2)).pack(pady=2)
-            self.hp_label = ctk.CTkLabel(
-                hp_frame, 
+            self.widgets.create(ctk.CTkLabel, hp_frame, text="HP", font_role='small').pack(pady=2)
+            self.hp_label = self.widgets.create(
+                ctk.CTkLabel, hp_frame,
                 text="0.0%", 
-                font=(f"Segoe UI", self.font_size+2, "bold"),
-                text_color=ColorSchemes.SCHEMES[self.color_scheme]['danger']
+                font_role='heading',
+                color_role='danger'
             )
             self.hp_label.pack(pady=2)
         
@@ -1313,31 +4805,51 @@ class OsuHelper:
         if self.show_progress:
             progress_frame = ctk.CTkFrame(tosu_frame)
             progress_frame.grid(row=1, column=4, sticky="ew", padx=2, pady=5)
-            ctk.CTkLabel(progress_frame, text="Progress", font=(f"Segoe UI", self.font_size-2)).pack(pady=2)
-            self.progress_label = ctk.CTkLabel(
-                progress_frame, 
+            self.widgets.create(ctk.CTkLabel, progress_frame, text="Progress", font_role='small').pack(pady=2)
+            self.progress_label = self.widgets.create(
+                ctk.CTkLabel, progress_frame,
                 text="0.0%", 
-                font=(f"Segoe UI", self.font_size+2, "bold"),
-                text_color=ColorSchemes.SCHEMES[self.color_scheme]['info']
+                font_role='heading',
+                color_role='info'
             )
             self.progress_label.pack(pady=2)
         
+        # Unstable rate (precise feed)
+        if self.precise_enabled:
+            ur_frame = ctk.CTkFrame(tosu_frame)
+            ur_frame.grid(row=1, column=5, sticky="ew", padx=2, pady=5)
+            self.widgets.create(ctk.CTkLabel, ur_frame, text="UR", font_role='small').pack(pady=2)
+            self.ur_label = self.widgets.create(
+                ctk.CTkLabel, ur_frame,
+                text="-",
+                font_role='heading',
+                color_role='warning'
+            )
+            self.ur_label.pack(pady=2)
+            self.hit_error_label = self.widgets.create(
+                ctk.CTkLabel, ur_frame,
+                text="",
+                font_role='caption',
+                text_color="gray"
+            )
+            self.hit_error_label.pack(pady=(0, 2))
+        
     def create_map_display(self):
         """Create current map display"""
         map_frame = ctk.CTkFrame(self.main_frame)
         map_frame.grid(row=3, column=0, sticky="ew", pady=(0, 20))
         
-        self.map_title = ctk.CTkLabel(
-            map_frame,
-            text=self.lang.get('current_map'),
-            font=(f"Segoe UI", self.font_size + 2, "bold")
+        self.map_title = self.widgets.create(
+            ctk.CTkLabel, map_frame,
+            text_key='current_map',
+            font_role='heading'
         )
         self.map_title.pack(anchor="w", padx=15, pady=(10, 5))
         
-        self.map_label = ctk.CTkLabel(
-            map_frame,
-            text=self.lang.get('not_playing'),
-            font=(f"Segoe UI", self.font_size),
+        self.map_label = self.widgets.create(
+            ctk.CTkLabel, map_frame,
+            text_key=self.map_display_text,
+            font_role='body',
             text_color="gray"
         )
         self.map_label.pack(anchor="w", padx=15, pady=(0, 5))
@@ -1346,24 +4858,33 @@ class OsuHelper:
         stats_container = ctk.CTkFrame(map_frame, fg_color="transparent")
         stats_container.pack(fill="x", padx=15, pady=(0, 10))
         
-        self.map_stats_label = ctk.CTkLabel(
-            stats_container,
-            text="",
-            font=(f"Segoe UI", self.font_size - 2),
+        self.map_stats_label = self.widgets.create(
+            ctk.CTkLabel, stats_container,
+            text=self.map_stats_text,
+            font_role='small',
             text_color="gray"
         )
         self.map_stats_label.pack(anchor="w")
         
+        # History of the current beatmap from the per-map index
+        self.map_history_label = self.widgets.create(
+            ctk.CTkLabel, stats_container,
+            text=self.map_history_text,
+            font_role='small',
+            color_role='info'
+        )
+        self.map_history_label.pack(anchor="w")
+        
     def create_threshold_setting(self):
         """Create threshold setting"""
         threshold_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
         threshold_frame.grid(row=4, column=0, sticky="ew", pady=(0, 10))
         threshold_frame.grid_columnconfigure(1, weight=1)
         
-        self.threshold_label = ctk.CTkLabel(
-            threshold_frame,
-            text=self.lang.get('miss_threshold'),
-            font=(f"Segoe UI", self.font_size)
+        self.threshold_label = self.widgets.create(
+            ctk.CTkLabel, threshold_frame,
+            text_key='miss_threshold',
+            font_role='body'
         )
         self.threshold_label.grid(row=0, column=0, padx=(0, 10), sticky="w")
         
@@ -1375,40 +4896,39 @@ class OsuHelper:
         self.threshold_entry.grid(row=0, column=1, padx=5, sticky="w")
         self.threshold_entry.insert(0, str(self.miss_threshold))
         
-        self.threshold_apply_btn = ctk.CTkButton(
-            threshold_frame,
-            text=self.lang.get('apply'),
+        self.threshold_apply_btn = self.widgets.create(
+            ctk.CTkButton, threshold_frame,
+            text_key='apply',
             command=self.apply_threshold,
             width=100,
-            fg_color=ColorSchemes.SCHEMES[self.color_scheme]['primary'],
-            hover_color=ColorSchemes.SCHEMES[self.color_scheme]['button']
+            fill_role='primary'
         )
         self.threshold_apply_btn.grid(row=0, column=2, padx=5, sticky="w")
         
         # Hit thresholds section
-        hit_section_label = ctk.CTkLabel(
-            threshold_frame,
-            text=f"🎯 {self.lang.get('hit_thresholds_section')}",
-            font=(f"Segoe UI", self.font_size, "bold")
+        hit_section_label = self.widgets.create(
+            ctk.CTkLabel, threshold_frame,
+            text_key=lambda: f"🎯 {self.lang.get('hit_thresholds_section')}",
+            font_role='body_bold'
         )
         hit_section_label.grid(row=1, column=0, columnspan=3, sticky="w", pady=(15, 5))
         
         # Hit 100 threshold enable checkbox
         self.hit100_threshold_var = ctk.BooleanVar(value=self.hit100_threshold_enabled)
-        hit100_threshold_cb = ctk.CTkCheckBox(
-            threshold_frame,
-            text=self.lang.get('enable_hit100_threshold'),
+        hit100_threshold_cb = self.widgets.create(
+            ctk.CTkCheckBox, threshold_frame,
+            text_key='enable_hit100_threshold',
             variable=self.hit100_threshold_var,
             command=self.toggle_hit100_threshold,
-            font=(f"Segoe UI", self.font_size - 1)
+            font_role='caption'
         )
         hit100_threshold_cb.grid(row=2, column=0, columnspan=3, sticky="w", pady=(0, 10))
         
         # Hit 100 threshold field
-        hit100_label = ctk.CTkLabel(
-            threshold_frame,
-            text=self.lang.get('hit100_threshold_label'),
-            font=(f"Segoe UI", self.font_size - 1)
+        hit100_label = self.widgets.create(
+            ctk.CTkLabel, threshold_frame,
+            text_key='hit100_threshold_label',
+            font_role='caption'
         )
         hit100_label.grid(row=3, column=0, padx=(20, 10), sticky="w")
         
@@ -1421,32 +4941,31 @@ class OsuHelper:
         self.hit100_entry.insert(0, str(self.hit100_threshold))
         
         # Apply button for hit 100 threshold
-        self.hit100_apply_btn = ctk.CTkButton(
-            threshold_frame,
-            text=self.lang.get('apply'),
+        self.hit100_apply_btn = self.widgets.create(
+            ctk.CTkButton, threshold_frame,
+            text_key='apply',
             command=self.apply_hit100_threshold,
             width=100,
-            fg_color=ColorSchemes.SCHEMES[self.color_scheme]['warning'],
-            hover_color=ColorSchemes.SCHEMES[self.color_scheme]['button']
+            fill_role='warning'
         )
         self.hit100_apply_btn.grid(row=3, column=2, padx=5, sticky="w")
         
         # Hit 50 threshold enable checkbox
         self.hit50_threshold_var = ctk.BooleanVar(value=self.hit50_threshold_enabled)
-        hit50_threshold_cb = ctk.CTkCheckBox(
-            threshold_frame,
-            text=self.lang.get('enable_hit50_threshold'),
+        hit50_threshold_cb = self.widgets.create(
+            ctk.CTkCheckBox, threshold_frame,
+            text_key='enable_hit50_threshold',
             variable=self.hit50_threshold_var,
             command=self.toggle_hit50_threshold,
-            font=(f"Segoe UI", self.font_size - 1)
+            font_role='caption'
         )
         hit50_threshold_cb.grid(row=4, column=0, columnspan=3, sticky="w", pady=(10, 10))
         
         # Hit 50 threshold field
-        hit50_label = ctk.CTkLabel(
-            threshold_frame,
-            text=self.lang.get('hit50_threshold_label'),
-            font=(f"Segoe UI", self.font_size - 1)
+        hit50_label = self.widgets.create(
+            ctk.CTkLabel, threshold_frame,
+            text_key='hit50_threshold_label',
+            font_role='caption'
         )
         hit50_label.grid(row=5, column=0, padx=(20, 10), sticky="w")
         
@@ -1459,15 +4978,109 @@ class OsuHelper:
         self.hit50_entry.insert(0, str(self.hit50_threshold))
         
         # Apply button for hit 50 threshold
-        self.hit50_apply_btn = ctk.CTkButton(
-            threshold_frame,
-            text=self.lang.get('apply'),
+        self.hit50_apply_btn = self.widgets.create(
+            ctk.CTkButton, threshold_frame,
+            text_key='apply',
             command=self.apply_hit50_threshold,
             width=100,
-            fg_color=ColorSchemes.SCHEMES[self.color_scheme]['warning'],
-            hover_color=ColorSchemes.SCHEMES[self.color_scheme]['button']
+            fill_role='warning'
         )
-        self.hit50_apply_btn.grid(row=5, column=2, padx=5, pady=(0, 15), sticky="w")
+        self.hit50_apply_btn.grid(row=5, column=2, padx=5, sticky="w")
+        
+        # Projected accuracy rule
+        self.accuracy_threshold_var = ctk.BooleanVar(value=self.accuracy_threshold_enabled)
+        accuracy_threshold_cb = self.widgets.create(
+            ctk.CTkCheckBox, threshold_frame,
+            text_key='enable_accuracy_threshold',
+            variable=self.accuracy_threshold_var,
+            command=self.toggle_accuracy_threshold,
+            font_role='caption'
+        )
+        accuracy_threshold_cb.grid(row=6, column=0, columnspan=3, sticky="w", pady=(10, 10))
+        
+        accuracy_label = self.widgets.create(
+            ctk.CTkLabel, threshold_frame,
+            text_key='accuracy_threshold_label',
+            font_role='caption'
+        )
+        accuracy_label.grid(row=7, column=0, padx=(20, 10), sticky="w")
+        
+        self.accuracy_entry = ctk.CTkEntry(
+            threshold_frame,
+            width=80,
+            placeholder_text="98"
+        )
+        self.accuracy_entry.grid(row=7, column=1, padx=5, sticky="w")
+        self.accuracy_entry.insert(0, str(self.accuracy_threshold))
+        
+        self.accuracy_apply_btn = self.widgets.create(
+            ctk.CTkButton, threshold_frame,
+            text_key='apply',
+            command=self.apply_accuracy_threshold,
+            width=100,
+            fill_role='info'
+        )
+        self.accuracy_apply_btn.grid(row=7, column=2, padx=5, sticky="w")
+        
+        # Rolling UR rule
+        self.ur_threshold_var = ctk.BooleanVar(value=self.ur_threshold_enabled)
+        ur_threshold_cb = self.widgets.create(
+            ctk.CTkCheckBox, threshold_frame,
+            text_key='enable_ur_threshold',
+            variable=self.ur_threshold_var,
+            command=self.toggle_ur_threshold,
+            font_role='caption'
+        )
+        ur_threshold_cb.grid(row=8, column=0, columnspan=3, sticky="w", pady=(10, 10))
+        
+        ur_label = self.widgets.create(
+            ctk.CTkLabel, threshold_frame,
+            text_key='ur_threshold_label',
+            font_role='caption'
+        )
+        ur_label.grid(row=9, column=0, padx=(20, 10), sticky="w")
+        
+        self.ur_entry = ctk.CTkEntry(
+            threshold_frame,
+            width=80,
+            placeholder_text="120"
+        )
+        self.ur_entry.grid(row=9, column=1, padx=5, sticky="w")
+        self.ur_entry.insert(0, str(self.ur_threshold))
+        
+        self.ur_apply_btn = self.widgets.create(
+            ctk.CTkButton, threshold_frame,
+            text_key='apply',
+            command=self.apply_ur_threshold,
+            width=100,
+            fill_role='info'
+        )
+        self.ur_apply_btn.grid(row=9, column=2, padx=5, sticky="w")
+        
+        # Custom restart rule (empty: built from the thresholds above)
+        rule_label = self.widgets.create(
+            ctk.CTkLabel, threshold_frame,
+            text_key='restart_rule_label',
+            font_role='caption'
+        )
+        rule_label.grid(row=10, column=0, padx=(0, 10), pady=(15, 0), sticky="w")
+        
+        self.rule_entry = ctk.CTkEntry(
+            threshold_frame,
+            width=260,
+            placeholder_text="misses >= 5 or (n100 >= 10 and progress < 30%)"
+        )
+        self.rule_entry.grid(row=10, column=1, padx=5, pady=(15, 0), sticky="ew")
+        self.rule_entry.insert(0, self.restart_rule)
+        
+        self.rule_apply_btn = self.widgets.create(
+            ctk.CTkButton, threshold_frame,
+            text_key='apply',
+            command=self.apply_restart_rule,
+            width=100,
+            fill_role='primary'
+        )
+        self.rule_apply_btn.grid(row=10, column=2, padx=5, pady=(15, 15), sticky="w")
         
     def create_key_settings(self):
         """Create key settings section"""
@@ -1476,44 +5089,43 @@ class OsuHelper:
         key_frame.grid_columnconfigure(1, weight=1)
         
         # Title
-        self.key_settings_title = ctk.CTkLabel(
-            key_frame,
-            text=self.lang.get('key_settings'),
-            font=(f"Segoe UI", self.font_size + 4, "bold")
+        self.key_settings_title = self.widgets.create(
+            ctk.CTkLabel, key_frame,
+            text_key='key_settings',
+            font_role='section'
         )
         self.key_settings_title.grid(row=0, column=0, columnspan=4, sticky="w", padx=15, pady=(10, 15))
         
         # Restart key
-        self.restart_key_label = ctk.CTkLabel(
-            key_frame,
-            text=self.lang.get('restart_key'),
-            font=(f"Segoe UI", self.font_size)
+        self.restart_key_label = self.widgets.create(
+            ctk.CTkLabel, key_frame,
+            text_key='restart_key',
+            font_role='body'
         )
         self.restart_key_label.grid(row=1, column=0, padx=(15, 10), pady=5, sticky="w")
         
-        self.restart_key_display = ctk.CTkLabel(
-            key_frame,
+        self.restart_key_display = self.widgets.create(
+            ctk.CTkLabel, key_frame,
             text=self.restart_key_name,
-            font=(f"Segoe UI", self.font_size, "bold"),
-            text_color=ColorSchemes.SCHEMES[self.color_scheme]['primary']
+            font_role='body_bold',
+            color_role='primary'
         )
         self.restart_key_display.grid(row=1, column=1, padx=5, pady=5, sticky="w")
         
-        self.capture_key_btn = ctk.CTkButton(
-            key_frame,
-            text=self.lang.get('capture_key'),
+        self.capture_key_btn = self.widgets.create(
+            ctk.CTkButton, key_frame,
+            text_key='capture_key',
             command=self.start_key_capture,
             width=150,
-            fg_color=ColorSchemes.SCHEMES[self.color_scheme]['warning'],
-            hover_color=ColorSchemes.SCHEMES[self.color_scheme]['button']
+            fill_role='warning'
         )
         self.capture_key_btn.grid(row=1, column=2, padx=5, pady=5, sticky="w")
         
         # Hold duration
-        self.hold_duration_label = ctk.CTkLabel(
-            key_frame,
-            text=self.lang.get('hold_duration'),
-            font=(f"Segoe UI", self.font_size)
+        self.hold_duration_label = self.widgets.create(
+            ctk.CTkLabel, key_frame,
+            text_key='hold_duration',
+            font_role='body'
         )
         self.hold_duration_label.grid(row=2, column=0, padx=(15, 10), pady=5, sticky="w")
         
@@ -1525,13 +5137,12 @@ class OsuHelper:
         self.hold_duration_entry.grid(row=2, column=1, padx=5, pady=5, sticky="w")
         self.hold_duration_entry.insert(0, str(self.hold_duration))
         
-        self.hold_apply_btn = ctk.CTkButton(
-            key_frame,
-            text=self.lang.get('apply'),
+        self.hold_apply_btn = self.widgets.create(
+            ctk.CTkButton, key_frame,
+            text_key='apply',
             command=self.apply_key_settings,
             width=100,
-            fg_color=ColorSchemes.SCHEMES[self.color_scheme]['primary'],
-            hover_color=ColorSchemes.SCHEMES[self.color_scheme]['button']
+            fill_role='primary'
         )
         self.hold_apply_btn.grid(row=2, column=2, padx=5, pady=(5, 15), sticky="w")
         
@@ -1541,10 +5152,10 @@ class OsuHelper:
         cooldown_frame.grid(row=6, column=0, sticky="ew", pady=(0, 10))
         cooldown_frame.grid_columnconfigure(1, weight=1)
         
-        self.cooldown_label = ctk.CTkLabel(
-            cooldown_frame,
-            text=self.lang.get('cooldown_duration'),
-            font=(f"Segoe UI", self.font_size)
+        self.cooldown_label = self.widgets.create(
+            ctk.CTkLabel, cooldown_frame,
+            text_key='cooldown_duration',
+            font_role='body'
         )
         self.cooldown_label.grid(row=0, column=0, padx=(0, 10), sticky="w")
         
@@ -1556,13 +5167,12 @@ class OsuHelper:
         self.cooldown_entry.grid(row=0, column=1, padx=5, sticky="w")
         self.cooldown_entry.insert(0, str(self.cooldown_duration))
         
-        self.cooldown_apply_btn = ctk.CTkButton(
-            cooldown_frame,
-            text=self.lang.get('apply'),
+        self.cooldown_apply_btn = self.widgets.create(
+            ctk.CTkButton, cooldown_frame,
+            text_key='apply',
             command=self.apply_cooldown,
             width=100,
-            fg_color=ColorSchemes.SCHEMES[self.color_scheme]['primary'],
-            hover_color=ColorSchemes.SCHEMES[self.color_scheme]['button']
+            fill_role='primary'
         )
         self.cooldown_apply_btn.grid(row=0, column=2, padx=5, sticky="w")
         
@@ -1572,36 +5182,33 @@ class OsuHelper:
         button_frame.grid(row=7, column=0, sticky="ew", pady=(0, 20))
         button_frame.grid_columnconfigure((0, 1, 2), weight=1)
         
-        self.start_btn = ctk.CTkButton(
-            button_frame,
-            text=self.lang.get('start_monitoring'),
+        self.start_btn = self.widgets.create(
+            ctk.CTkButton, button_frame,
+            text_key='start_monitoring',
             command=self.start_monitoring,
-            fg_color=ColorSchemes.SCHEMES[self.color_scheme]['success'],
-            hover_color=ColorSchemes.SCHEMES[self.color_scheme]['button'],
+            fill_role='success',
             height=40,
-            font=(f"Segoe UI", self.font_size, "bold")
+            font_role='body_bold'
         )
         self.start_btn.grid(row=0, column=0, padx=5, sticky="ew")
         
-        self.stop_btn = ctk.CTkButton(
-            button_frame,
-            text=self.lang.get('stop_monitoring'),
+        self.stop_btn = self.widgets.create(
+            ctk.CTkButton, button_frame,
+            text_key='stop_monitoring',
             command=self.stop_monitoring,
-            fg_color=ColorSchemes.SCHEMES[self.color_scheme]['danger'],
-            hover_color=ColorSchemes.SCHEMES[self.color_scheme]['button'],
+            fill_role='danger',
             height=40,
-            font=(f"Segoe UI", self.font_size, "bold")
+            font_role='body_bold'
         )
         self.stop_btn.grid(row=0, column=1, padx=5, sticky="ew")
         
-        self.clear_btn = ctk.CTkButton(
-            button_frame,
-            text=self.lang.get('clear_log'),
+        self.clear_btn = self.widgets.create(
+            ctk.CTkButton, button_frame,
+            text_key='clear_log',
             command=self.clear_log,
-            fg_color=ColorSchemes.SCHEMES[self.color_scheme]['primary'],
-            hover_color=ColorSchemes.SCHEMES[self.color_scheme]['button'],
+            fill_role='primary',
             height=40,
-            font=(f"Segoe UI", self.font_size, "bold")
+            font_role='body_bold'
         )
         self.clear_btn.grid(row=0, column=2, padx=5, sticky="ew")
         
@@ -1612,10 +5219,10 @@ class OsuHelper:
         stats_section.grid_columnconfigure(1, weight=1)
         
         # Title
-        stats_title = ctk.CTkLabel(
-            stats_section,
-            text=self.lang.get('statistics'),
-            font=(f"Segoe UI", self.font_size + 4, "bold")
+        stats_title = self.widgets.create(
+            ctk.CTkLabel, stats_section,
+            text_key='statistics',
+            font_role='section'
         )
         stats_title.grid(row=0, column=0, columnspan=3, sticky="w", padx=15, pady=(10, 15))
         
@@ -1624,58 +5231,193 @@ class OsuHelper:
         avg_frame.grid(row=1, column=0, columnspan=3, sticky="ew", padx=15, pady=5)
         avg_frame.grid_columnconfigure((0, 1), weight=1)
         
-        averages = self.stats.get_miss_averages()
+        self.session_avg_label = self.widgets.create(
+            ctk.CTkLabel, avg_frame,
+            text_key=lambda: self.format_stats_text('session_avg'),
+            font_role='body',
+            color_role='info'
+        )
+        self.session_avg_label.grid(row=0, column=0, sticky="w")
+        
+        self.alltime_avg_label = self.widgets.create(
+            ctk.CTkLabel, avg_frame,
+            text_key=lambda: self.format_stats_text('alltime_avg'),
+            font_role='body',
+            color_role='warning'
+        )
+        self.alltime_avg_label.grid(row=0, column=1, sticky="w")
+        
+        # Hot path latency percentiles
+        self.latency_label = self.widgets.create(
+            ctk.CTkLabel, avg_frame,
+            text_key=self.format_latency_summary,
+            font_role='small',
+            text_color="gray",
+            justify="left"
+        )
+        self.latency_label.grid(row=1, column=0, columnspan=2, sticky="w", pady=(5, 0))
+        
+        # Export buttons
+        export_frame = ctk.CTkFrame(stats_section, fg_color="transparent")
+        export_frame.grid(row=2, column=0, columnspan=3, sticky="ew", padx=15, pady=5)
+        
+        csv_btn = self.widgets.create(
+            ctk.CTkButton, export_frame,
+            text_key='export_csv',
+            command=self.export_csv,
+            width=120,
+            fill_role='success'
+        )
+        csv_btn.pack(side="left", padx=5)
+        
+        json_btn = self.widgets.create(
+            ctk.CTkButton, export_frame,
+            text_key='export_json',
+            command=self.export_json,
+            width=120,
+            fill_role='info'
+        )
+        json_btn.pack(side="left", padx=5)
         
-        session_avg_label = ctk.CTkLabel(
-            avg_frame,
-            text=self.lang.get('session_avg').format(averages['session']),
-            font=(f"Segoe UI", self.font_size),
-            text_color=ColorSchemes.SCHEMES[self.color_scheme]['info']
+        latency_btn = self.widgets.create(
+            ctk.CTkButton, export_frame,
+            text_key='export_latency',
+            command=self.export_latency_report,
+            width=120,
+            fill_role='warning'
         )
-        session_avg_label.grid(row=0, column=0, sticky="w")
+        latency_btn.pack(side="left", padx=5)
+        
+        # Live graph (the chart is added below the label when enabled)
+        self.graph_frame = ctk.CTkFrame(stats_section)
+        self.graph_frame.grid(row=3, column=0, columnspan=3, sticky="ew", padx=15, pady=(5, 15))
         
-        alltime_avg_label = ctk.CTkLabel(
-            avg_frame,
-            text=self.lang.get('alltime_avg').format(averages['all_time']),
-            font=(f"Segoe UI", self.font_size),
-            text_color=ColorSchemes.SCHEMES[self.color_scheme]['warning']
+        graph_header = ctk.CTkFrame(self.graph_frame, fg_color="transparent")
+        graph_header.pack(fill="x", padx=10, pady=10)
+        
+        self.graph_label = self.widgets.create(
+            ctk.CTkLabel, graph_header,
+            text_key=lambda: self.format_stats_text('graph'),
+            font_role='body'
+        )
+        self.graph_label.pack(side="left")
+        
+        self.graph_var = ctk.BooleanVar(value=self.show_graph)
+        graph_cb = self.widgets.create(
+            ctk.CTkCheckBox, graph_header,
+            text_key='live_graph',
+            variable=self.graph_var,
+            command=self.toggle_graph,
+            font_role='caption'
         )
-        alltime_avg_label.grid(row=0, column=1, sticky="w")
+        graph_cb.pack(side="right")
+        
+        if self.show_graph:
+            # Let the window appear before matplotlib is imported
+            self.root.after(200, self.open_chart)
+            
+    def toggle_graph(self):
+        """Show or hide the live chart"""
+        self.show_graph = self.graph_var.get()
+        if self.show_graph:
+            self.open_chart()
+        else:
+            self.close_chart()
+        self.save_config()
+        
+    def open_chart(self):
+        """Build the live chart under the graph label (imports matplotlib)"""
+        if self.chart is not None or not self.show_graph:
+            return
+        if not LiveChart.available():
+            self.show_graph = False
+            self._with_widget('graph_var', lambda w: w.set(False))
+            self.log_message(self.lang.get('graph_unavailable'), "orange")
+            return
+        try:
+            self.chart = LiveChart(self.graph_frame, self.stats, self.color_scheme, self.graph_fps)
+            self.chart.widget.pack(fill="x", padx=5, pady=(0, 10))
+            self.chart.update(force=True)
+        except Exception as e:
+            self.chart = None
+            self.log_message(f"📈 Graph error: {e}", "red")
+            
+    def close_chart(self):
+        """Remove the live chart"""
+        if self.chart is not None:
+            self.chart.destroy()
+            self.chart = None
+            
+    def render_chart(self):
+        """Blit new series points into the live chart (Tk thread, capped fps)"""
+        if self.chart is not None and not self.mini_mode:
+            self.chart.update()
         
-        # Export buttons
-        export_frame = ctk.CTkFrame(stats_section, fg_color="transparent")
-        export_frame.grid(row=2, column=0, columnspan=3, sticky="ew", padx=15, pady=5)
+    def restyle_gui(self):
+        """Apply language, colour scheme and font size to the existing widgets"""
+        self.widgets.restyle(self.color_scheme, self.font_size)
         
-        csv_btn = ctk.CTkButton(
-            export_frame,
-            text=self.lang.get('export_csv'),
-            command=self.export_csv,
-            width=120,
-            fg_color=ColorSchemes.SCHEMES[self.color_scheme]['success'],
-            hover_color=ColorSchemes.SCHEMES[self.color_scheme]['button']
-        )
-        csv_btn.pack(side="left", padx=5)
+        # Log colour tags are not widgets
+        if hasattr(self, 'log_text'):
+            scheme = ColorSchemes.SCHEMES[self.color_scheme]
+            try:
+                for color, key in self.LOG_COLORS.items():
+                    self.log_text.tag_config(f"log_{color}", foreground=scheme[key])
+            except Exception:
+                pass
+                
+        if self.chart is not None:
+            self.chart.set_scheme(self.color_scheme)
+            
+        # Texts set by the restyle bypassed the UI scheduler
+        self.ui.invalidate()
+        self.update_connection_status()
         
-        json_btn = ctk.CTkButton(
-            export_frame,
-            text=self.lang.get('export_json'),
-            command=self.export_json,
-            width=120,
-            fg_color=ColorSchemes.SCHEMES[self.color_scheme]['info'],
-            hover_color=ColorSchemes.SCHEMES[self.color_scheme]['button']
-        )
-        json_btn.pack(side="left", padx=5)
+    def map_display_text(self):
+        """Current map line in the current language"""
+        name = self.current_map_name
+        if name == "Unknown" or name in (texts['not_playing'] for texts in Language.TEXTS.values()):
+            return self.lang.get('not_playing')
+        return name
         
-        # Graph placeholder (simplified for now)
-        graph_frame = ctk.CTkFrame(stats_section)
-        graph_frame.grid(row=3, column=0, columnspan=3, sticky="ew", padx=15, pady=(5, 15))
+    @staticmethod
+    def format_miss_summary(stats):
+        """Format running miss aggregates as 'mean ± std (min–max)'"""
+        if not stats.count:
+            return "0"
+        return f"{stats.mean:.2f} ± {stats.std:.2f} ({stats.min}–{stats.max})"
+        
+    def format_stats_text(self, label, summary=None):
+        """Text of a statistics label: 'session_avg', 'alltime_avg' or 'graph'"""
+        if summary is None:
+            summary = self.stats.get_miss_summary()
+        if label == 'graph':
+            return f"📊 {self.lang.get('miss_graph')} - {summary['session'].count} points"
+        scope = 'session' if label == 'session_avg' else 'all_time'
+        return self.lang.get(label).format(self.format_miss_summary(summary[scope]))
+        
+    def refresh_stats_labels(self):
+        """Push current miss aggregates to the statistics section (O(1))"""
+        summary = self.stats.get_miss_summary()
+        self.ui.set_text('session_avg_label', self.format_stats_text('session_avg', summary))
+        self.ui.set_text('alltime_avg_label', self.format_stats_text('alltime_avg', summary))
+        self.ui.set_text('graph_label', self.format_stats_text('graph', summary))
+        
+    def render_latency(self):
+        """Refresh the latency label at most once per LATENCY_REFRESH (Tk thread)"""
+        now = time.perf_counter()
+        if now - self._latency_rendered_at < self.LATENCY_REFRESH:
+            return
+        self._latency_rendered_at = now
+        self.ui.set_text('latency_label', self.format_latency_summary())
         
-        graph_label = ctk.CTkLabel(
-            graph_frame,
-            text=f"📊 {self.lang.get('miss_graph')} - {len(self.stats.session_stats['misses'])} points",
-            font=(f"Segoe UI", self.font_size)
-        )
-        graph_label.pack(pady=20)
+    def format_latency_summary(self):
+        """One-line p50/p95/p99 per stage that has samples"""
+        parts = []
+        for stage, summary in self.engine.latency.summary().items():
+            if summary['count']:
+                parts.append(f"{stage} {summary['p50']:.2f}/{summary['p95']:.2f}/{summary['p99']:.2f}")
+        return self.lang.get('latency_summary').format(' · '.join(parts) or self.lang.get('latency_none'))
         
     def create_customization_panel(self):
         """Create customization panel"""
@@ -1684,28 +5426,28 @@ class OsuHelper:
         custom_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
         
         # Title
-        custom_title = ctk.CTkLabel(
-            custom_frame,
-            text=self.lang.get('customize'),
-            font=(f"Segoe UI", self.font_size + 4, "bold")
+        custom_title = self.widgets.create(
+            ctk.CTkLabel, custom_frame,
+            text_key='customize',
+            font_role='section'
         )
         custom_title.grid(row=0, column=0, columnspan=4, sticky="w", padx=15, pady=(10, 15))
         
         # Always on top
         self.always_on_top_var = ctk.BooleanVar(value=self.always_on_top)
-        always_on_top_cb = ctk.CTkCheckBox(
-            custom_frame,
-            text=self.lang.get('always_on_top'),
+        always_on_top_cb = self.widgets.create(
+            ctk.CTkCheckBox, custom_frame,
+            text_key='always_on_top',
             variable=self.always_on_top_var,
             command=self.toggle_always_on_top
         )
         always_on_top_cb.grid(row=1, column=0, sticky="w", padx=15, pady=5)
         
         # Transparency slider
-        transparency_label = ctk.CTkLabel(
-            custom_frame,
-            text=self.lang.get('transparency'),
-            font=(f"Segoe UI", self.font_size)
+        transparency_label = self.widgets.create(
+            ctk.CTkLabel, custom_frame,
+            text_key='transparency',
+            font_role='body'
         )
         transparency_label.grid(row=1, column=1, sticky="w", padx=15, pady=5)
         
@@ -1720,10 +5462,10 @@ class OsuHelper:
         self.transparency_slider.grid(row=1, column=2, sticky="ew", padx=15, pady=5)
         
         # Color scheme
-        color_label = ctk.CTkLabel(
-            custom_frame,
-            text=self.lang.get('color_scheme'),
-            font=(f"Segoe UI", self.font_size)
+        color_label = self.widgets.create(
+            ctk.CTkLabel, custom_frame,
+            text_key='color_scheme',
+            font_role='body'
         )
         color_label.grid(row=2, column=0, sticky="w", padx=15, pady=5)
         
@@ -1758,10 +5500,10 @@ class OsuHelper:
                 color_btn.configure(border_width=3, border_color="white")
         
         # Font size
-        font_label = ctk.CTkLabel(
-            custom_frame,
-            text=self.lang.get('font_size'),
-            font=(f"Segoe UI", self.font_size)
+        font_label = self.widgets.create(
+            ctk.CTkLabel, custom_frame,
+            text_key='font_size',
+            font_role='body'
         )
         font_label.grid(row=2, column=2, sticky="w", padx=15, pady=5)
         
@@ -1775,31 +5517,29 @@ class OsuHelper:
         font_menu.grid(row=2, column=3, sticky="w", padx=15, pady=5)
         
         # Import/Export settings
-        import_btn = ctk.CTkButton(
-            custom_frame,
-            text=self.lang.get('import_settings'),
+        import_btn = self.widgets.create(
+            ctk.CTkButton, custom_frame,
+            text_key='import_settings',
             command=self.import_settings,
             width=120,
-            fg_color=ColorSchemes.SCHEMES[self.color_scheme]['info'],
-            hover_color=ColorSchemes.SCHEMES[self.color_scheme]['button']
+            fill_role='info'
         )
         import_btn.grid(row=3, column=0, sticky="w", padx=15, pady=(5, 15))
         
-        export_btn = ctk.CTkButton(
-            custom_frame,
-            text=self.lang.get('export_settings'),
+        export_btn = self.widgets.create(
+            ctk.CTkButton, custom_frame,
+            text_key='export_settings',
             command=self.export_settings,
             width=120,
-            fg_color=ColorSchemes.SCHEMES[self.color_scheme]['success'],
-            hover_color=ColorSchemes.SCHEMES[self.color_scheme]['button']
+            fill_role='success'
         )
         export_btn.grid(row=3, column=1, sticky="w", padx=15, pady=(5, 15))
         
         # Hotkeys info
-        hotkeys_info = ctk.CTkLabel(
-            custom_frame,
-            text=f"{self.lang.get('hotkeys')}: {self.lang.get('hotkey_mute')}, {self.lang.get('hotkey_log')}, {self.lang.get('hotkey_threshold')}, {self.lang.get('hotkey_mini')}",
-            font=(f"Segoe UI", self.font_size - 2),
+        hotkeys_info = self.widgets.create(
+            ctk.CTkLabel, custom_frame,
+            text_key=lambda: f"{self.lang.get('hotkeys')}: {self.lang.get('hotkey_mute')}, {self.lang.get('hotkey_log')}, {self.lang.get('hotkey_threshold')}, {self.lang.get('hotkey_mini')}",
+            font_role='small',
             text_color="gray"
         )
         hotkeys_info.grid(row=4, column=0, columnspan=4, sticky="w", padx=15, pady=(0, 15))
@@ -1811,25 +5551,34 @@ class OsuHelper:
         log_frame.grid_rowconfigure(1, weight=1)
         log_frame.grid_columnconfigure(0, weight=1)
         
-        self.log_title = ctk.CTkLabel(
-            log_frame,
-            text=self.lang.get('activity_log'),
-            font=(f"Segoe UI", self.font_size + 2, "bold")
+        self.log_title = self.widgets.create(
+            ctk.CTkLabel, log_frame,
+            text_key='activity_log',
+            font_role='heading'
         )
         self.log_title.grid(row=0, column=0, sticky="w", padx=15, pady=(10, 5))
         
-        self.log_text = ctk.CTkTextbox(
-            log_frame,
+        self.log_text = self.widgets.create(
+            ctk.CTkTextbox, log_frame,
             height=200,
-            font=("Consolas", self.font_size - 1)
+            font_role='mono'
         )
         self.log_text.grid(row=1, column=0, sticky="nsew", padx=15, pady=(0, 15))
         
+        # Colour tags for log levels
+        scheme = ColorSchemes.SCHEMES[self.color_scheme]
+        for color, key in self.LOG_COLORS.items():
+            self.log_text.tag_config(f"log_{color}", foreground=scheme[key])
+            
+        # Show the most recent history; anything pending is already in it
+        self.log_buffer.drain()
+        self._insert_log_lines(self.log_buffer.tail(self.LOG_VISIBLE_LINES))
+        
     def create_footer(self):
         """Create footer"""
-        self.footer_label = ctk.CTkLabel(
-            self.main_frame,
-            text=self.lang.get('footer'),
+        self.footer_label = self.widgets.create(
+            ctk.CTkLabel, self.main_frame,
+            text_key='footer',
             font=(f"Segoe UI", 10),
             text_color="gray"
         )
@@ -1847,71 +5596,18 @@ class OsuHelper:
             current_x = 100
             current_y = 100
         
-        if not self.mini_mode:
-            # Restore normal window
-            try:
-                # Remove click-through if enabled
-                try:
-                    import win32gui
-                    import win32con
-                    hwnd = self.root.winfo_id()
-                    style = win32gui.GetWindowLong(hwnd, win32con.GWL_EXSTYLE)
-                    style &= ~(win32con.WS_EX_LAYERED | win32con.WS_EX_TRANSPARENT)
-                    win32gui.SetWindowLong(hwnd, win32con.GWL_EXSTYLE, style)
-                except:
-                    pass
-                
-                # Destroy all widgets
-                for widget in self.root.winfo_children():
-                    widget.destroy()
-                
-                # Reset window attributes
-                self.root.overrideredirect(False)
-                
-                # Remove transparent color
-                try:
-                    self.root.attributes('-transparentcolor', '')
-                except:
-                    pass
-                
-                # Reset window size and position
-                self.root.geometry(f"1000x800+{current_x}+{current_y}")
-                self.root.resizable(True, True)
-                self.root.minsize(700, 600)
-                self.root.maxsize(2000, 1500)
-                
-                # Force update
-                self.root.update_idletasks()
-                self.root.update()
-                
-            except Exception as e:
-                print(f"Error restoring window: {e}")
-        else:
-            # Entering mini mode
-            try:
-                # Destroy all widgets
-                for widget in self.root.winfo_children():
-                    widget.destroy()
-                    
-            except Exception as e:
-                print(f"Error entering mini mode: {e}")
-        
-        # Recreate GUI
+        # Swap the prepared views; no widgets are created or destroyed
         try:
-            self.create_gui()
+            self.show_view()
             
-            # Apply window properties after GUI is created
             if not self.mini_mode:
-                self.root.after(100, self.apply_window_properties)
-                # Force window to front
-                self.root.after(200, lambda: self.root.lift())
-                self.root.after(200, lambda: self.root.focus_force())
-            
-            # Update connection status
-            self.root.after(300, self.update_connection_status)
-            
+                # Restore normal window size where the overlay was
+                self.root.geometry(f"1000x800+{current_x}+{current_y}")
+                self.root.lift()
+                self.root.focus_force()
+                
         except Exception as e:
-            print(f"Error creating GUI: {e}")
+            print(f"Error switching view: {e}")
         
         # Log message
         try:
@@ -1926,9 +5622,10 @@ class OsuHelper:
         
     def toggle_click_through(self):
         """Toggle click-through mode in mini mode"""
+        if win32gui is None:
+            self.log_message("🖱️ Click-through needs Windows (pywin32)", "orange")
+            return
         try:
-            import win32gui
-            import win32con
             hwnd = self.root.winfo_id()
             style = win32gui.GetWindowLong(hwnd, win32con.GWL_EXSTYLE)
             
@@ -2001,6 +5698,70 @@ class OsuHelper:
         except ValueError:
             self.log_message("✗ Invalid threshold value", "red")
         
+    def toggle_accuracy_threshold(self):
+        """Toggle projected accuracy rule"""
+        self.accuracy_threshold_enabled = self.accuracy_threshold_var.get()
+        if self.accuracy_threshold_enabled:
+            self.log_message(self.lang.get('accuracy_threshold_enabled'), "blue")
+        else:
+            self.log_message(self.lang.get('accuracy_threshold_disabled'), "blue")
+        self.save_config()
+        
+    def apply_accuracy_threshold(self):
+        """Apply projected accuracy rule setting"""
+        try:
+            threshold = float(self.accuracy_entry.get())
+            
+            if 1 <= threshold <= 100:
+                self.accuracy_threshold = threshold
+                self.log_message(self.lang.get('accuracy_threshold_applied').format(threshold), "green")
+                self.save_config()
+            else:
+                self.log_message("✗ Accuracy must be 1-100", "red")
+        except ValueError:
+            self.log_message("✗ Invalid accuracy value", "red")
+            
+    def toggle_ur_threshold(self):
+        """Toggle rolling UR rule (opens the precise feed while monitoring)"""
+        self.ur_threshold_enabled = self.ur_threshold_var.get()
+        self.engine.compile_rule()
+        if self.ur_threshold_enabled:
+            self.log_message(self.lang.get('ur_threshold_enabled'), "blue")
+            self.start_precise()
+        else:
+            self.log_message(self.lang.get('ur_threshold_disabled'), "blue")
+            if not self.precise_wanted():
+                self.stop_precise()
+        self.save_config()
+        
+    def apply_ur_threshold(self):
+        """Apply rolling UR rule setting"""
+        try:
+            threshold = float(self.ur_entry.get())
+            
+            if 10 <= threshold <= 1000:
+                self.ur_threshold = threshold
+                self.log_message(self.lang.get('ur_threshold_applied').format(threshold), "green")
+                self.save_config()
+            else:
+                self.log_message("✗ UR must be 10-1000", "red")
+        except ValueError:
+            self.log_message("✗ Invalid UR value", "red")
+        
+    def apply_restart_rule(self):
+        """Apply a custom restart rule (empty restores the thresholds)"""
+        source = self.rule_entry.get().strip()
+        if source:
+            try:
+                RestartRule(source)
+            except ValueError as e:
+                self.log_message(self.lang.get('rule_invalid').format(source, e), "red")
+                return
+        self.restart_rule = source
+        self.log_message(self.lang.get('rule_applied').format(self.engine.compile_rule()), "green")
+        self.start_precise()
+        self.save_config()
+        
     def toggle_always_on_top(self):
         """Toggle always on top"""
         self.always_on_top = self.always_on_top_var.get()
@@ -2017,23 +5778,63 @@ class OsuHelper:
         """Change color scheme"""
         self.color_scheme = scheme
         
-        # Update color button highlights
+        self.highlight_color_scheme()
+        self.restyle_gui()
+        self.save_config()
+        
+    def highlight_color_scheme(self):
+        """Outline the current scheme in the palette"""
         if hasattr(self, 'color_buttons'):
             for scheme_name, button in self.color_buttons.items():
                 if scheme_name == self.color_scheme:
                     button.configure(border_width=3, border_color="white")
                 else:
                     button.configure(border_width=0)
-        
-        self.create_gui()  # Recreate GUI with new colors
-        self.update_connection_status()
-        self.save_config()
-        
+                    
+    def sync_setting_widgets(self):
+        """Show current setting values in the existing entries and toggles"""
+        entries = {
+            'threshold_entry': self.miss_threshold,
+            'hit100_entry': self.hit100_threshold,
+            'hit50_entry': self.hit50_threshold,
+            'accuracy_entry': self.accuracy_threshold,
+            'ur_entry': self.ur_threshold,
+            'rule_entry': self.restart_rule,
+            'hold_duration_entry': self.hold_duration,
+            'cooldown_entry': self.cooldown_duration
+        }
+        values = {
+            'hit100_threshold_var': self.hit100_threshold_enabled,
+            'hit50_threshold_var': self.hit50_threshold_enabled,
+            'accuracy_threshold_var': self.accuracy_threshold_enabled,
+            'ur_threshold_var': self.ur_threshold_enabled,
+            'always_on_top_var': self.always_on_top,
+            'graph_var': self.show_graph,
+            'font_size_var': str(self.font_size),
+            'transparency_slider': self.transparency
+        }
+        for name, value in entries.items():
+            self._with_widget(name, lambda w: (w.delete(0, "end"), w.insert(0, str(value))))
+        for name, value in values.items():
+            self._with_widget(name, lambda w: w.set(value))
+        for name in ('threshold_value', 'mini_threshold_value'):
+            self._with_widget(name, lambda w: w.configure(text=str(self.miss_threshold)))
+        self._with_widget('color_buttons', lambda w: self.highlight_color_scheme())
+        
+    def _with_widget(self, name, func):
+        """Call func on a widget attribute if it is still alive"""
+        widget = getattr(self, name, None)
+        if widget is None:
+            return
+        try:
+            func(widget)
+        except Exception:
+            pass  # Destroyed with the other view
+            
     def change_font_size(self, size):
         """Change font size"""
         self.font_size = int(size)
-        self.create_gui()  # Recreate GUI with new font size
-        self.update_connection_status()
+        self.restyle_gui()
         self.save_config()
         
     def export_csv(self):
@@ -2056,6 +5857,16 @@ class OsuHelper:
             self.stats.export_json(filename)
             self.log_message(f"📊 JSON exported: {filename}", "green")
             
+    def export_latency_report(self):
+        """Export per-stage latency percentiles"""
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".txt",
+            filetypes=[("Text report", "*.txt"), ("JSON files", "*.json"), ("All files", "*.*")]
+        )
+        if filename:
+            self.engine.latency.export(filename)
+            self.log_message(f"⏱ Latency report exported: {filename}", "green")
+            
     def import_settings(self):
         """Import settings from file"""
         filename = filedialog.askopenfilename(
@@ -2087,6 +5898,7 @@ class OsuHelper:
 
     def apply_imported_config(self, config):
         """Apply imported configuration"""
+        layout = self.layout_options()
         self.miss_threshold = config.get('miss_threshold', self.miss_threshold)
         self.hold_duration = config.get('hold_duration', self.hold_duration)
         self.cooldown_duration = config.get('cooldown_duration', self.cooldown_duration)
@@ -2099,13 +5911,50 @@ class OsuHelper:
         self.show_pp = config.get('show_pp', self.show_pp)
         self.show_hp = config.get('show_hp', self.show_hp)
         self.show_progress = config.get('show_progress', self.show_progress)
+        self.ui_refresh_rate = config.get('ui_refresh_rate', self.ui_refresh_rate)
+        self.ui.set_rate(self.ui_refresh_rate)
+        self.save_debounce = config.get('save_debounce', self.save_debounce)
+        self.persistence.set_delay(self.save_debounce)
+        self.retry_timeout = config.get('retry_timeout', self.retry_timeout)
+        self.log_capacity = config.get('log_capacity', self.log_capacity)
+        self.log_buffer.set_capacity(self.log_capacity)
+        self.show_graph = config.get('show_graph', self.show_graph)
+        self.graph_fps = config.get('graph_fps', self.graph_fps)
+        self.precise_enabled = config.get('precise_enabled', self.precise_enabled)
+        self.ur_window = config.get('ur_window', self.ur_window)
+        self.engine.hit_errors.set_size(self.ur_window)
+        self.accuracy_threshold_enabled = config.get('accuracy_threshold_enabled', self.accuracy_threshold_enabled)
+        self.accuracy_threshold = config.get('accuracy_threshold', self.accuracy_threshold)
+        self.ur_threshold_enabled = config.get('ur_threshold_enabled', self.ur_threshold_enabled)
+        self.ur_threshold = config.get('ur_threshold', self.ur_threshold)
+        self.restart_rule = config.get('restart_rule', self.restart_rule)
+        self.engine.compile_rule()
+        if self.precise_wanted():
+            self.start_precise()
+        else:
+            self.stop_precise()
         
-        # Apply changes
-        self.create_gui()
-        self.update_connection_status()
+        # Apply changes; only the data cards shown change the layout
+        if self.layout_options() != layout:
+            self.create_gui()
+            self.update_connection_status()
+        else:
+            self.restyle_gui()
+            self.sync_setting_widgets()
+            if self.show_graph:
+                self.open_chart()
+            else:
+                self.close_chart()
+            if self.chart is not None:
+                self.chart.set_fps(self.graph_fps)
         self.apply_window_properties()
         self.save_config()
         
+    def layout_options(self):
+        """Settings that decide which widgets exist (changing them needs a rebuild)"""
+        return (self.show_accuracy, self.show_combo, self.show_pp, self.show_hp, self.show_progress,
+                self.precise_enabled)
+        
     def get_current_config(self):
         """Get current configuration for export"""
         return {
@@ -2129,15 +5978,25 @@ class OsuHelper:
             'hit100_threshold_enabled': self.hit100_threshold_enabled,
             'hit100_threshold': self.hit100_threshold,
             'hit50_threshold_enabled': self.hit50_threshold_enabled,
-            'hit50_threshold': self.hit50_threshold
+            'hit50_threshold': self.hit50_threshold,
+            'ui_refresh_rate': self.ui_refresh_rate,
+            'save_debounce': self.save_debounce,
+            'retry_timeout': self.retry_timeout,
+            'log_capacity': self.log_capacity,
+            'show_graph': self.show_graph,
+            'graph_fps': self.graph_fps,
+            'precise_enabled': self.precise_enabled,
+            'ur_window': self.ur_window,
+            'accuracy_threshold_enabled': self.accuracy_threshold_enabled,
+            'accuracy_threshold': self.accuracy_threshold,
+            'ur_threshold_enabled': self.ur_threshold_enabled,
+            'ur_threshold': self.ur_threshold,
+            'restart_rule': self.restart_rule
         }
         
     def update_language(self):
         """Update all text elements with current language"""
-        # Recreate GUI to update all text
-        self.create_gui()
-        # Force update connection status after GUI recreation
-        self.update_connection_status()
+        self.restyle_gui()
         
     def toggle_language(self):
         """Toggle language"""
@@ -2258,478 +6117,428 @@ class OsuHelper:
         if self.running:
             return
             
-        # Warn if restart key not set, but still allow monitoring
-        if not self.restart_key:
-            self.log_message("⚠ Restart key not set - auto-restart disabled", "orange")
-            
-        self.running = True
-        self.ws_thread = threading.Thread(target=self.websocket_worker, daemon=True)
-        self.ws_thread.start()
-        self.log_message(self.lang.get('monitoring_started'), "green")
-        
-    def stop_monitoring(self):
-        """Stop monitoring"""
-        self.running = False
-        if self.ws:
-            self.ws.close()
-        self.log_message(self.lang.get('monitoring_stopped'), "orange")
-        
-    def clear_log(self):
-        """Clear activity log"""
-        if hasattr(self, 'log_text'):
-            self.log_text.delete("1.0", "end")
-        self.log_message(self.lang.get('log_cleared'))
-        
-    def log_message(self, message, color=None):
-        """Add message to log"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        log_entry = f"[{timestamp}] {message}\n"
-        
-        if hasattr(self, 'log_text'):
-            self.log_text.insert("end", log_entry)
-            self.log_text.see("end")
-        else:
-            # Store in memory for mini mode display
-            if not hasattr(self, 'mini_log_messages'):
-                self.mini_log_messages = []
-            self.mini_log_messages.append(log_entry.strip())
-            # Keep only last 50 messages
-            if len(self.mini_log_messages) > 50:
-                self.mini_log_messages.pop(0)
-        
-    def is_osu_focused(self):
-        """Check if osu! is the active window"""
-        try:
-            hwnd = win32gui.GetForegroundWindow()
-            _, pid = win32process.GetWindowThreadProcessId(hwnd)
-            process = psutil.Process(pid)
-            return process.name() == "osu!.exe"
-        except:
-            return False
-            
-    def websocket_worker(self):
-        """WebSocket worker thread"""
-        while self.running:
-            try:
-                self.log_message(self.lang.get('connecting').format("ws://127.0.0.1:24050/websocket/v2"))
-                self.ws = websocket.WebSocketApp(
-                    "ws://127.0.0.1:24050/websocket/v2",
-                    on_message=self.on_message,
-                    on_error=self.on_error,
-                    on_close=self.on_close,
-                    on_open=self.on_open
-                )
-                self.ws.run_forever()
-            except Exception as e:
-                self.log_message(self.lang.get('connection_error').format(str(e)), "red")
-                time.sleep(5)
-                
-    def on_open(self, ws):
-        """WebSocket opened"""
-        self.connected = True
-        self.root.after(0, self.update_connection_status)
-        self.log_message(self.lang.get('connected_tosu'), "green")
-        
-    def on_close(self, ws, close_status_code, close_msg):
-        """WebSocket closed"""
-        self.connected = False
-        self.root.after(0, self.update_connection_status)
-        self.log_message(self.lang.get('disconnected_tosu'), "orange")
-        
-    def on_error(self, ws, error):
-        """WebSocket error"""
-        self.log_message(self.lang.get('websocket_error').format(str(error)), "red")
-        
-    def on_message(self, ws, message):
-        """Handle WebSocket message"""
-        try:
-            data = json.loads(message)
-            # Log first message to confirm data is received
-            if not hasattr(self, '_first_message_logged'):
-                self._first_message_logged = True
-                self.log_message("✓ Receiving data from TOSU", "green")
-            self.process_data(data)
-        except Exception as e:
-            self.log_message(f"✗ Error: {str(e)}", "red")
-            
-    def process_data(self, data):
-        """Process TOSU data"""
-        try:
-            # Silently process data (no debug logs)
-            
-            # Get current map ID and info from beatmap data
-            bm_data = data.get('beatmap', {})
-            if not bm_data:
-                return
-            
-            # Debug: log beatmap structure once
-            if not hasattr(self, '_logged_beatmap'):
-                self._logged_beatmap = True
-                self.log_message(f"🗺️ Beatmap keys: {list(bm_data.keys())}", "blue")
-                if 'metadata' in bm_data:
-                    meta = bm_data['metadata']
-                    self.log_message(f"✓ Metadata: {meta.get('artist')} - {meta.get('title')}", "green")
-                
-            map_id = bm_data.get('id', 0)
-            
-            # Update map display
-            if map_id and map_id != 0:
-                # Artist and title are directly in beatmap, not in metadata
-                artist = bm_data.get('artist', '').strip()
-                title = bm_data.get('title', '').strip()
-                difficulty = bm_data.get('version', '').strip()  # 'version' is difficulty name
-                
-                # Get map stats
-                stats = bm_data.get('stats', {})
-                cs = stats.get('CS', 0)
-                ar = stats.get('AR', 0)
-                od = stats.get('OD', 0)
-                hp = stats.get('HP', 0)
-                
-                # Only update if we have valid data
-                if artist and title:
-                    map_name = f"{artist} - {title}"
-                    if difficulty:
-                        map_name += f" [{difficulty}]"
-                    
-                    # Only update if changed
-                    if self.current_map_name != map_name:
-                        self.current_map_name = map_name
-                        
-                        if hasattr(self, 'map_label'):
-                            self.root.after(0, lambda name=map_name: self.map_label.configure(text=name))
-                        if hasattr(self, 'mini_map_label'):
-                            self.root.after(0, lambda name=map_name: self.mini_map_label.configure(text=name))
-                    
-                    # Update map stats display
-                    if cs or ar or od or hp:  # Only show if we have stats
-                        stats_text = f"CS: {cs:.1f}  AR: {ar:.1f}  OD: {od:.1f}  HP: {hp:.1f}"
-                        if hasattr(self, 'map_stats_label'):
-                            self.root.after(0, lambda text=stats_text: self.map_stats_label.configure(text=text))
-                elif self.current_map_name != "Unknown":
-                    # No metadata but have map ID - show loading
-                    self.current_map_name = "Loading..."
-                    if hasattr(self, 'map_label'):
-                        self.root.after(0, lambda: self.map_label.configure(text="Loading..."))
-                    if hasattr(self, 'mini_map_label'):
-                        self.root.after(0, lambda: self.mini_map_label.configure(text="Loading..."))
-            else:
-                # No map or invalid map ID - show "not playing"
-                if self.current_map_name != self.lang.get('not_playing'):
-                    self.current_map_name = self.lang.get('not_playing')
-                    if hasattr(self, 'map_label'):
-                        self.root.after(0, lambda: self.map_label.configure(text=self.lang.get('not_playing')))
-                    if hasattr(self, 'mini_map_label'):
-                        self.root.after(0, lambda: self.mini_map_label.configure(text=self.lang.get('not_playing')))
-                    if hasattr(self, 'map_stats_label'):
-                        self.root.after(0, lambda: self.map_stats_label.configure(text=""))
-            
-            # Check for new map
-            if map_id != self.current_map_id and map_id is not None:
-                self.current_map_id = map_id
-                self.our_miss_count = 0
-                self.last_tosu_misses = 0
-                self.threshold_triggered = False
-                self.current_hit100 = 0  # Reset hit100 tracking
-                self.current_hit50 = 0  # Reset hit50 tracking
-                
-                # Update displays
-                if hasattr(self, 'miss_value'):
-                    self.root.after(0, lambda: self.miss_value.configure(text="0"))
-                if hasattr(self, 'mini_miss_value'):
-                    self.root.after(0, lambda: self.mini_miss_value.configure(text="0"))
-                if hasattr(self, 'hit100_value'):
-                    self.root.after(0, lambda: self.hit100_value.configure(text="0"))
-                if hasattr(self, 'hit50_value'):
-                    self.root.after(0, lambda: self.hit50_value.configure(text="0"))
-                    
-                self.stats.add_map_played()
-                self.log_message(self.lang.get('new_map'), "blue")
-                return
-                
-            # Get gameplay data (use 'play' key)
-            gameplay_data = data.get('play', {})
-            
-            if not gameplay_data:
-                return  # No gameplay data available
-            
-            hits_data = gameplay_data.get('hits', {})
-            if not hits_data:
-                return  # No hits data available
-            
-            # Try both integer and string keys for compatibility
-            current_tosu_misses = hits_data.get(0, 0) if 0 in hits_data else hits_data.get('0', 0)
-            
-            # Get 100-hit data (try both int and string keys)
-            current_hit100 = hits_data.get(100, 0) if 100 in hits_data else hits_data.get('100', 0)
-            
-            # Get 50-hit data (try both int and string keys)
-            current_hit50 = hits_data.get(50, 0) if 50 in hits_data else hits_data.get('50', 0)
+        # Warn if restart key not set, but still allow monitoring
+        if not self.restart_key:
+            self.log_message("⚠ Restart key not set - auto-restart disabled", "orange")
             
-            # Additional TOSU data
-            self.current_accuracy = gameplay_data.get('accuracy', 0.0)
-            self.current_combo = gameplay_data.get('combo', {}).get('current', 0) if isinstance(gameplay_data.get('combo'), dict) else gameplay_data.get('combo', 0)
-            self.current_pp = gameplay_data.get('pp', {}).get('current', 0.0) if isinstance(gameplay_data.get('pp'), dict) else gameplay_data.get('pp', 0.0)
-            self.current_hp = gameplay_data.get('hp', {}).get('normal', 0.0) * 100 if isinstance(gameplay_data.get('hp'), dict) else gameplay_data.get('hp', 0.0) * 100
+        self.running = True
+        self.ingestor.start()
+        self.ws_thread = threading.Thread(target=self.websocket_worker, daemon=True)
+        self.ws_thread.start()
+        self.start_precise()
+        self.log_message(self.lang.get('monitoring_started'), "green")
+        
+    def stop_monitoring(self):
+        """Stop monitoring"""
+        self.running = False
+        self._wake_reconnect.set()
+        if self._disconnected_since is not None:
+            self.connection_metrics['disconnected_seconds'] += time.monotonic() - self._disconnected_since
+            self._disconnected_since = None
+        if self.ws:
+            self.ws.close()
+        self.stop_precise()
+        self.ingestor.stop()
+        self.log_message(self.lang.get('monitoring_stopped'), "orange")
+        metrics = self.ingestor.get_metrics()
+        self.log_message(self.lang.get('ingest_metrics').format(
+            metrics['processed'], metrics['dropped'], metrics['max_depth']
+        ), "blue")
+        counters = self.ui.get_counters()
+        self.log_message(self.lang.get('ui_update_counters').format(
+            counters['applied'], counters['coalesced'], counters['skipped']
+        ), "blue")
+        self.log_message(self.format_latency_summary(), "blue")
+        self.log_connection_metrics()
+        
+    def log_connection_metrics(self):
+        """Log reconnect attempts, disconnected time and time to first frame"""
+        metrics = self.get_connection_metrics()
+        first_frame = metrics['time_to_first_frame']
+        self.log_message(self.lang.get('connection_metrics').format(
+            metrics['attempts'], metrics['disconnected_seconds'],
+            f"{first_frame * 1000:.0f} ms" if first_frame is not None else "-"
+        ), "blue")
+        
+    def clear_log(self):
+        """Clear activity log"""
+        self.log_buffer.clear()
+        if hasattr(self, 'log_text'):
+            self.log_text.delete("1.0", "end")
+        self.log_message(self.lang.get('log_cleared'))
+        
+    def log_message(self, message, color=None):
+        """Add message to log (safe from any thread; rendered on the next UI tick)"""
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        log_entry = f"[{timestamp}] {message}"
+        
+        if self.log_listener:
+            self.log_listener(log_entry)
             
-            # No score data needed - we only track hit100 count
+        self.log_buffer.append(log_entry, color)
+        
+    def render_log(self):
+        """Move newly logged lines into the log box (Tk thread)"""
+        entries, dropped = self.log_buffer.drain()
+        if not entries:
+            return
+        # A burst longer than the window only renders its tail
+        skipped = dropped + max(0, len(entries) - self.LOG_VISIBLE_LINES)
+        entries = entries[-self.LOG_VISIBLE_LINES:]
+        if skipped:
+            entries.insert(0, (f"… {skipped} lines skipped", "orange"))
+        self._insert_log_lines(entries)
+        
+    def _insert_log_lines(self, entries):
+        """Append entries to the log box and keep only the visible window"""
+        widget = getattr(self, 'log_text', None)
+        if widget is None or not entries:
+            return
+        try:
+            for text, color in entries:
+                tags = f"log_{color}" if color in self.LOG_COLORS else None
+                widget.insert("end", text + "\n", tags)
+                
+            # Drop lines scrolled out of the window
+            lines = int(widget.index("end-1c").split('.')[0])
+            if lines > self.LOG_VISIBLE_LINES:
+                widget.delete("1.0", f"{lines - self.LOG_VISIBLE_LINES}.0")
+            widget.see("end")
+        except Exception:
+            pass  # Log box destroyed by a GUI rebuild
+        
+    def is_osu_focused(self):
+        """Check if osu! is the active window (cached by the focus tracker)"""
+        return self.focus.is_osu_focused()
             
-            # Progress calculation (simplified)
-            time_data = gameplay_data.get('time', {})
-            current_time = time_data.get('current', 0)
-            total_time = time_data.get('full', 1)
-            self.current_progress = (current_time / total_time * 100) if total_time > 0 else 0
+    def websocket_worker(self):
+        """WebSocket worker thread: connect, and back off between failed attempts"""
+        self.reconnect.reset()
+        self._disconnected_since = time.monotonic()
+        while self.running:
+            self.connection_state = 'connecting'
+            self.connection_metrics['attempts'] += 1
+            self._attempt_started = time.monotonic()
+            if self.reconnect.failures == 0:
+                self.log_message(self.lang.get('connecting').format(self.tosu_url))
+            try:
+                self.ws = websocket.WebSocketApp(
+                    self.tosu_url,
+                    on_message=self.on_message,
+                    on_error=self.on_error,
+                    on_close=self.on_close,
+                    on_open=self.on_open
+                )
+                self.ws.run_forever(skip_utf8_validation=True)
+            except Exception as e:
+                if self.reconnect.failures == 0:
+                    self.log_message(self.lang.get('connection_error').format(str(e)), "red")
+            if self.connected:
+                # run_forever returned without on_close
+                self._mark_disconnected()
+                
+            if not self.running:
+                break
+                
+            self.connection_state = 'backoff'
+            delay = self.reconnect.next_delay()
+            self.log_message(self.lang.get('reconnect_in').format(delay, self.reconnect.failures + 1))
+            self._wait_for_retry(delay)
             
-            # Update additional data displays
-            self.update_tosu_displays()
+        self.connection_state = 'disconnected'
+        
+    def _wait_for_retry(self, delay):
+        """Sleep until the retry is due, waking early when TOSU/osu! starts"""
+        self._wake_reconnect.clear()
+        self.process_watcher.reset()
+        deadline = time.monotonic() + delay
+        while self.running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if self._wake_reconnect.wait(min(remaining, 1.0)):
+                return
+            name = self.process_watcher.appeared()
+            if name:
+                self.log_message(self.lang.get('process_appeared').format(name), "blue")
+                self.reconnect.reset()
+                return
+                
+    def _mark_disconnected(self):
+        self.connected = False
+        self._disconnected_since = time.monotonic()
+        self._awaiting_first_frame = False
+        self.call_on_ui(self.update_connection_status)
+        
+    def on_open(self, ws):
+        """WebSocket opened"""
+        now = time.monotonic()
+        self.connected = True
+        self.connection_state = 'connected'
+        self.connection_metrics['connections'] += 1
+        if self._disconnected_since is not None:
+            self.connection_metrics['disconnected_seconds'] += now - self._disconnected_since
+            self._disconnected_since = None
+        self._awaiting_first_frame = True
+        self.call_on_ui(self.update_connection_status)
+        self.log_message(self.lang.get('connected_tosu'), "green")
+        
+    def on_close(self, ws, close_status_code, close_msg):
+        """WebSocket closed"""
+        if not self.connected:
+            return  # Failed attempt; the worker logs the retry
+        self._mark_disconnected()
+        self.log_message(self.lang.get('disconnected_tosu'), "orange")
+        
+    def on_error(self, ws, error):
+        """WebSocket error"""
+        # Only the first failure of an outage is worth a log line
+        if self.connected or self.reconnect.failures == 0:
+            self.log_message(self.lang.get('websocket_error').format(str(error)), "red")
             
-            # Add gameplay data to statistics
-            self.stats.add_gameplay_data(
-                accuracy=self.current_accuracy,
-                combo=self.current_combo,
-                pp=self.current_pp,
-                hp=self.current_hp
-            )
+    def get_connection_metrics(self):
+        """Connection metrics including the current disconnected stretch"""
+        metrics = dict(self.connection_metrics, state=self.connection_state,
+                       failures=self.reconnect.failures)
+        if self._disconnected_since is not None:
+            metrics['disconnected_seconds'] += time.monotonic() - self._disconnected_since
+        return metrics
+        
+    def precise_url(self):
+        """URL of TOSU's precise feed, next to the main one"""
+        return self.tosu_url.rstrip('/') + '/precise'
+        
+    def precise_wanted(self):
+        """Whether the precise feed is needed (UR display or a restart rule using UR)"""
+        rule = self.engine.rule
+        return self.precise_enabled or self.ur_threshold_enabled or (rule is not None and 'ur' in rule.names)
+        
+    def start_precise(self):
+        """Open the precise feed when wanted (a separate thread and socket)"""
+        if not (self.running and self.precise_wanted()):
+            return
+        self._wake_precise.clear()
+        if self.precise_thread and self.precise_thread.is_alive():
+            return  # A worker that is still winding down keeps going
+        self.precise_thread = threading.Thread(target=self.precise_worker, daemon=True)
+        self.precise_thread.start()
+        
+    def stop_precise(self):
+        """Close the precise feed"""
+        self._wake_precise.set()
+        if self.precise_ws:
+            self.precise_ws.close()
             
-            # Update miss count, hit100 and hit50 counts
-            self.update_miss_count(current_tosu_misses, current_hit100, current_hit50)
+    def precise_worker(self):
+        """Precise feed thread: hit errors only, never touches the frame queue"""
+        backoff = ReconnectBackoff()
+        
+        def on_open(ws):
+            backoff.reset()
+            self.precise_metrics['connections'] += 1
+            self.log_message(self.lang.get('precise_connected'), "green")
             
+        while self.running and self.precise_wanted() and not self._wake_precise.is_set():
+            try:
+                self.precise_ws = websocket.WebSocketApp(
+                    self.precise_url(),
+                    on_message=self.on_precise_message,
+                    on_open=on_open
+                )
+                self.precise_ws.run_forever(skip_utf8_validation=True)
+            except Exception as e:
+                if backoff.failures == 0:
+                    self.log_message(self.lang.get('precise_error').format(str(e)), "orange")
+            # Retries follow the main connection's backoff policy, quietly
+            self._wake_precise.wait(backoff.next_delay())
+        self.precise_ws = None
+        
+    def on_precise_message(self, ws, message):
+        """Handle a precise message; bursts are thinned since the newest one has every hit"""
+        self.precise_metrics['received'] += 1
+        now = time.perf_counter()
+        if now - self._precise_parsed_at < self.PRECISE_INTERVAL:
+            return
+        self._precise_parsed_at = now
+        self.precise_metrics['parsed'] += 1
+        if isinstance(message, bytes):
+            message = message.decode('utf-8', errors='replace')
+        self.engine.handle_precise_frame(message)
+        
+    def on_message(self, ws, message):
+        """Handle WebSocket message (queue it for the processor thread)"""
+        if isinstance(message, bytes):
+            # UTF-8 validation is skipped in the socket thread; decode here in C
+            message = message.decode('utf-8', errors='replace')
+        received_at = time.perf_counter()
+        if self._awaiting_first_frame:
+            self._awaiting_first_frame = False
+            self.connection_metrics['time_to_first_frame'] = time.monotonic() - self._attempt_started
+            self.reconnect.reset()
+        if self.recorder:
+            self.recorder.record(message)
+        self.ingestor.submit(message, received_at)
+        
+    def handle_frame(self, message, received_at=None):
+        """Decode and process a raw frame on the processor thread"""
+        try:
+            if received_at is not None:
+                self.engine.latency.record('receive', time.perf_counter() - received_at)
+            # Log first message to confirm data is received
+            if not hasattr(self, '_first_message_logged'):
+                self._first_message_logged = True
+                self.log_message("✓ Receiving data from TOSU", "green")
+                
+            self.engine.handle_frame(message, received_at)
         except Exception as e:
-            self.log_message(self.lang.get('data_error').format(str(e)), "red")
+            self.log_message(f"✗ Error: {str(e)}", "red")
+            
+    def _on_engine_event(self, event, data):
+        """Mirror engine events into the window, log and persistence"""
+        if event == 'log':
+            self.log_message(data['message'], data['color'])
+        elif event == 'counts':
+            self.ui.set_text('miss_value', str(data['misses']))
+            self.ui.set_text('mini_miss_value', str(data['misses']))
+            self.ui.set_text('hit100_value', str(data['hit100']))
+            self.ui.set_text('hit50_value', str(data['hit50']))
+        elif event == 'gameplay':
+            self.update_tosu_displays()
+        elif event == 'map':
+            self.ui.set_text('map_label', data['name'])
+            self.ui.set_text('mini_map_label', data['name'])
+            if data['stats_text'] is not None:
+                self.map_stats_text = data['stats_text']
+                self.ui.set_text('map_stats_label', data['stats_text'])
+        elif event == 'miss':
+            self.refresh_stats_labels()
+        elif event in ('new_map', 'attempt'):
+            self.save_config()
+        elif event == 'map_history':
+            self.map_history_text = data['text']
+            self.ui.set_text('map_history_label', data['text'])
+        elif event == 'hit_errors':
+            self.update_hit_error_displays()
+        elif event == 'restart':
+            if not data['dry_run']:
+                self.trigger_restart(data['restart_id'], data['received_at'])
+        elif event == 'reset':
+            self.ui.set_text('restart_value', str(data['total_restarts']))
+            self.refresh_stats_labels()
+            # Make the restart durable without waiting for a settings change
+            self.save_config()
             
     def update_tosu_displays(self):
         """Update additional TOSU data displays"""
-        # Full mode updates
-        if hasattr(self, 'accuracy_label') and self.show_accuracy:
-            self.root.after(0, lambda: self.accuracy_label.configure(
-                text=f"{self.current_accuracy:.2f}%"
-            ))
-            
-        if hasattr(self, 'combo_label') and self.show_combo:
-            self.root.after(0, lambda: self.combo_label.configure(
-                text=f"{self.current_combo}x"
-            ))
-            
-        if hasattr(self, 'pp_label') and self.show_pp:
-            self.root.after(0, lambda: self.pp_label.configure(
-                text=f"{self.current_pp:.0f}"
-            ))
-            
-        if hasattr(self, 'hp_label') and self.show_hp:
-            self.root.after(0, lambda: self.hp_label.configure(
-                text=f"{self.current_hp:.1f}%"
-            ))
-            
-        if hasattr(self, 'progress_label') and self.show_progress:
-            self.root.after(0, lambda: self.progress_label.configure(
-                text=f"{self.current_progress:.1f}%"
-            ))
-            
-        # Mini mode updates
-        if hasattr(self, 'mini_accuracy_label') and self.show_accuracy:
-            self.root.after(0, lambda: self.mini_accuracy_label.configure(
-                text=f"{self.current_accuracy:.2f}%"
-            ))
-            
-        if hasattr(self, 'mini_combo_label') and self.show_combo:
-            self.root.after(0, lambda: self.mini_combo_label.configure(
-                text=f"{self.current_combo}x"
-            ))
-            
-        if hasattr(self, 'mini_pp_label') and self.show_pp:
-            self.root.after(0, lambda: self.mini_pp_label.configure(
-                text=f"{self.current_pp:.0f}"
-            ))
-            
-        if hasattr(self, 'mini_hp_label') and self.show_hp:
-            self.root.after(0, lambda: self.mini_hp_label.configure(
-                text=f"{self.current_hp:.1f}%"
-            ))
-            
-        if hasattr(self, 'mini_progress_label') and self.show_progress:
-            self.root.after(0, lambda: self.mini_progress_label.configure(
-                text=f"{self.current_progress:.1f}%"
-            ))
-            
-    def update_miss_count(self, current_tosu_misses, current_hit100, current_hit50):
-        """Update miss count and check thresholds"""
-        # Block during restart
-        if self.is_restarting:
-            return
+        if self.show_accuracy:
+            text = f"{self.current_accuracy:.2f}%"
+            self.ui.set_text('accuracy_label', text)
+            self.ui.set_text('mini_accuracy_label', text)
             
-        # Calculate new misses
-        miss_diff = current_tosu_misses - self.last_tosu_misses
-        
-        # Update hit100 count
-        hit100_diff = current_hit100 - self.current_hit100
-        self.current_hit100 = current_hit100
-        
-        # Update hit100 display
-        if hasattr(self, 'hit100_value'):
-            self.root.after(0, lambda: self.hit100_value.configure(text=str(self.current_hit100)))
-        
-        # Log hit100 changes if threshold is enabled
-        if self.hit100_threshold_enabled and hit100_diff > 0:
-            if self.current_hit100 >= self.hit100_threshold:
-                # Will be handled below
-                pass
-            elif self.current_hit100 == self.hit100_threshold - 1:
-                self.log_message(f"⚠️ Hit 100: {self.current_hit100}/{self.hit100_threshold} (близко к порогу!)", "orange")
-            else:
-                self.log_message(f"📊 Hit 100: +{hit100_diff} (всего: {self.current_hit100}/{self.hit100_threshold})", "blue")
-        
-        # Update hit50 count
-        hit50_diff = current_hit50 - self.current_hit50
-        self.current_hit50 = current_hit50
-        
-        # Update hit50 display
-        if hasattr(self, 'hit50_value'):
-            self.root.after(0, lambda: self.hit50_value.configure(text=str(self.current_hit50)))
-        
-        # Log hit50 changes if threshold is enabled
-        if self.hit50_threshold_enabled and hit50_diff > 0:
-            if self.current_hit50 >= self.hit50_threshold:
-                # Will be handled below
-                pass
-            elif self.current_hit50 == self.hit50_threshold - 1:
-                self.log_message(f"⚠️ Hit 50: {self.current_hit50}/{self.hit50_threshold} (близко к порогу!)", "orange")
-            else:
-                self.log_message(f"📊 Hit 50: +{hit50_diff} (всего: {self.current_hit50}/{self.hit50_threshold})", "blue")
-        
-        # Check miss threshold
-        miss_threshold_reached = False
-        if miss_diff > 0:
-            self.our_miss_count += miss_diff
-            self.last_tosu_misses = current_tosu_misses
+        if self.show_combo:
+            text = f"{self.current_combo}x"
+            self.ui.set_text('combo_label', text)
+            self.ui.set_text('mini_combo_label', text)
             
-            # Add to statistics
-            self.stats.add_miss(self.our_miss_count, self.current_map_name)
+        if self.show_pp:
+            text = f"{self.current_pp:.0f}"
+            self.ui.set_text('pp_label', text)
+            self.ui.set_text('mini_pp_label', text)
             
-            # Update displays
-            if hasattr(self, 'miss_value'):
-                self.root.after(0, lambda: self.miss_value.configure(text=str(self.our_miss_count)))
-            if hasattr(self, 'mini_miss_value'):
-                self.root.after(0, lambda: self.mini_miss_value.configure(text=str(self.our_miss_count)))
+        if self.show_hp:
+            text = f"{self.current_hp:.1f}%"
+            self.ui.set_text('hp_label', text)
+            self.ui.set_text('mini_hp_label', text)
             
-            # Check if miss threshold is reached
-            miss_threshold_reached = self.our_miss_count >= self.miss_threshold
+        if self.show_progress:
+            text = f"{self.current_progress:.1f}%"
+            self.ui.set_text('progress_label', text)
+            self.ui.set_text('mini_progress_label', text)
             
-            if miss_threshold_reached:
-                self.log_message(self.lang.get('threshold_reached').format(
-                    miss_diff, self.our_miss_count, self.miss_threshold
-                ), "red")
-            elif self.our_miss_count == self.miss_threshold - 1:
-                self.log_message(self.lang.get('close_to_threshold').format(
-                    miss_diff, self.our_miss_count, self.miss_threshold
-                ), "orange")
-            else:
-                self.log_message(self.lang.get('miss_logged').format(
-                    miss_diff, self.our_miss_count, self.miss_threshold
-                ))
-        
-        # Check 100-hit threshold if enabled (always check, not just on misses)
-        hit100_threshold_reached = False
-        if self.hit100_threshold_enabled:
-            if self.current_hit100 >= self.hit100_threshold and not self.threshold_triggered:
-                hit100_threshold_reached = True
-                self.log_message(self.lang.get('hit100_threshold_reached').format(
-                    self.current_hit100, self.hit100_threshold
-                ), "red")
-        
-        # Check 50-hit threshold if enabled
-        hit50_threshold_reached = False
-        if self.hit50_threshold_enabled:
-            if self.current_hit50 >= self.hit50_threshold and not self.threshold_triggered:
-                hit50_threshold_reached = True
-                self.log_message(self.lang.get('hit50_threshold_reached').format(
-                    self.current_hit50, self.hit50_threshold
-                ), "red")
-        
-        # Trigger restart if any threshold is reached
-        if (miss_threshold_reached or hit100_threshold_reached or hit50_threshold_reached) and not self.threshold_triggered:
-            # Check cooldown
-            time_since_restart = time.time() - self.last_restart_time
-            if time_since_restart < self.cooldown_duration:
-                remaining = self.cooldown_duration - time_since_restart
-                self.log_message(self.lang.get('cooldown_active').format(remaining), "orange")
-                return
-                
-            self.threshold_triggered = True
-            self.trigger_restart()
-                
-    def trigger_restart(self):
-        """Trigger map restart"""
-        if self.is_restarting:
+    def update_hit_error_displays(self):
+        """Update unstable rate and mean hit error from the precise feed"""
+        if not self.precise_enabled:
             return
-        
+        window = self.engine.hit_errors
+        ur = f"{window.unstable_rate:.1f}"
+        error = self.lang.get('mean_hit_error').format(window.mean)
+        self.ui.set_text('ur_label', ur)
+        self.ui.set_text('hit_error_label', error)
+        self.ui.set_text('mini_ur_label', f"{ur}  ({error})")
+        
+    def trigger_restart(self, restart_id, received_at):
+        """Actuate a restart requested by the engine"""
         # Check if restart key is set
-        if not self.restart_key:
+        if not self.restart_key or not self.keyboard:
             self.log_message("⚠ Cannot restart - restart key not set", "orange")
+            self.engine.end_restart(restart_id)
             return
             
-        # Set flags immediately
-        self.is_restarting = True
-        self.last_restart_time = time.time()
+        # Press now, release after hold_duration (actuator thread)
+        self.actuator.schedule(0, self._press_restart_key, restart_id, received_at)
         
-        # Start restart in separate thread
-        restart_thread = threading.Thread(target=self._do_restart, daemon=True)
-        restart_thread.start()
-        
-    def _do_restart(self):
-        """Perform the restart"""
+    def _press_restart_key(self, restart_id, received_at):
+        """Press the restart key and schedule its release"""
         try:
             # Check if osu! is in focus
             if not self.is_osu_focused():
                 self.log_message("⚠ osu! not in focus - skipping restart", "orange")
-                self.is_restarting = False
+                self.engine.end_restart(restart_id)
                 return
             
             self.log_message(self.lang.get('restarting'), "orange")
             self.log_message(self.lang.get('pressing_key').format(self.restart_key_name), "blue")
             
-            # Press key
+            pressed_at = time.monotonic()
             self.keyboard.press(self.restart_key)
-            time.sleep(self.hold_duration)
-            self.keyboard.release(self.restart_key)
+            self.engine.latency.record('press', time.perf_counter() - received_at)
+            self.key_held = True
+            self.actuator.schedule_at(pressed_at + self.hold_duration, self._release_restart_key, restart_id)
+        except Exception as e:
+            self.log_message(self.lang.get('key_error').format(str(e)), "red")
+            self.engine.end_restart(restart_id)
             
+    def _release_restart_key(self, restart_id):
+        """Release the restart key and wait for TOSU to show the retry"""
+        try:
+            self.keyboard.release(self.restart_key)
+            self.key_held = False
             self.log_message(self.lang.get('key_released'), "green")
             
-            # Reset counters
-            self.our_miss_count = 0
-            self.last_tosu_misses = 0
-            self.threshold_triggered = False
-            self.total_restarts += 1
-            
-            # Add to statistics
-            self.stats.add_restart()
-            
-            # Update displays
-            if hasattr(self, 'miss_value'):
-                self.root.after(0, lambda: self.miss_value.configure(text="0"))
-            if hasattr(self, 'mini_miss_value'):
-                self.root.after(0, lambda: self.mini_miss_value.configure(text="0"))
-            if hasattr(self, 'hit100_value'):
-                self.root.after(0, lambda: self.hit100_value.configure(text="0"))
-            if hasattr(self, 'hit50_value'):
-                self.root.after(0, lambda: self.hit50_value.configure(text="0"))
-            if hasattr(self, 'restart_value'):
-                self.root.after(0, lambda: self.restart_value.configure(text=str(self.total_restarts)))
-            
-            self.log_message(self.lang.get('counter_reset'), "green")
-            
-            # Wait for TOSU to update
-            self.log_message(self.lang.get('waiting'), "blue")
-            time.sleep(3)
-            
-            self.log_message(self.lang.get('ready'), "green")
+            self.engine.complete_restart()
             
+            # The engine resumes on the confirming frame; this is only the fallback
+            self.log_message(self.lang.get('waiting').format(self.retry_timeout), "blue")
+            self.actuator.schedule(self.retry_timeout, self._retry_timed_out, restart_id)
         except Exception as e:
             self.log_message(self.lang.get('key_error').format(str(e)), "red")
-        finally:
-            self.is_restarting = False
+            self.engine.end_restart(restart_id)
+            
+    def _retry_timed_out(self, restart_id):
+        """Resume tracking if no frame confirmed the retry in time"""
+        if self.engine.end_restart(restart_id):
+            self.log_message(self.lang.get('ready_timeout'), "orange")
+            
+    def _actuator_failed(self, func, error):
+        """A scheduled restart step raised (actuator thread)"""
+        self.log_message(self.lang.get('actuator_error').format(getattr(func, '__name__', func), error), "red")
+        
+    def stop_actuator(self):
+        """Stop the actuator and make sure the restart key is not left held"""
+        self.actuator.stop()
+        if self.key_held:
+            try:
+                self.keyboard.release(self.restart_key)
+            except Exception:
+                pass
+            self.key_held = False
             
     def save_config(self):
-        """Save configuration"""
+        """Schedule a debounced save of configuration and statistics"""
+        self.persistence.mark_dirty()
+        
+    def write_config(self):
+        """Write configuration and statistics (persistence thread)"""
         config = self.get_current_config()
         
         try:
@@ -2767,6 +6576,19 @@ class OsuHelper:
             self.hit100_threshold = config.get('hit100_threshold', 10)
             self.hit50_threshold_enabled = config.get('hit50_threshold_enabled', False)
             self.hit50_threshold = config.get('hit50_threshold', 5)
+            self.ui_refresh_rate = config.get('ui_refresh_rate', 30)
+            self.save_debounce = config.get('save_debounce', 1.0)
+            self.retry_timeout = config.get('retry_timeout', 3.0)
+            self.log_capacity = config.get('log_capacity', 1000)
+            self.show_graph = config.get('show_graph', False)
+            self.graph_fps = config.get('graph_fps', 10)
+            self.precise_enabled = config.get('precise_enabled', False)
+            self.ur_window = config.get('ur_window', 200)
+            self.accuracy_threshold_enabled = config.get('accuracy_threshold_enabled', False)
+            self.accuracy_threshold = config.get('accuracy_threshold', 98.0)
+            self.ur_threshold_enabled = config.get('ur_threshold_enabled', False)
+            self.ur_threshold = config.get('ur_threshold', 120.0)
+            self.restart_rule = config.get('restart_rule', "")
             
             # Restore key
             key_str = config.get('restart_key')
@@ -2784,7 +6606,8 @@ class OsuHelper:
                     
             self.lang.current = config.get('language', 'ru')
             self.current_theme = config.get('theme', 'dark')
-            ctk.set_appearance_mode(self.current_theme)
+            if not self.headless:
+                ctk.set_appearance_mode(self.current_theme)
             
         except Exception as e:
             # Can't log here as GUI might not exist yet
@@ -2805,6 +6628,12 @@ class OsuHelper:
             self.root.mainloop()
         finally:
             # Cleanup
+            if self.recorder:
+                self.recorder.close()
+            self.stop_actuator()
+            self.focus.stop()
+            # Flush pending config/stats writes
+            self.persistence.stop()
             if self.hotkeys:
                 self.hotkeys.stop()
             if self.key_listener:
@@ -2817,21 +6646,491 @@ class OsuHelper:
             self.start_monitoring()
 
 
-if __name__ == "__main__":
+def load_frames(path):
+    """Load raw TOSU frames from a capture or a plain frames file"""
+    return [raw for _, raw in read_capture(path)]
+
+
+def run_decode_benchmark(path, repeat=5):
+    """Compare full json.loads with TosuFrameDecoder on recorded frames"""
+    frames = load_frames(path)
+    if not frames:
+        print(f"No frames in {path}")
+        return
+        
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            json.loads(frame)
+    full_time = time.perf_counter() - start
+    
+    decoder = TosuFrameDecoder()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        decoder.reset()
+        for frame in frames:
+            decoder.decode(frame)
+    fast_time = time.perf_counter() - start
+    
+    total = len(frames) * repeat
+    counters = decoder.get_counters()
+    print(f"Frames: {len(frames)} x {repeat} (avg {sum(map(len, frames)) // len(frames)} bytes)")
+    print(f"json.loads:       {full_time / total * 1e6:8.1f} us/frame")
+    print(f"TosuFrameDecoder: {fast_time / total * 1e6:8.1f} us/frame")
+    print(f"Speedup:          {full_time / fast_time:8.2f}x" if fast_time > 0 else "Speedup: n/a")
+    print(f"Decoded {counters['decoded']}, unchanged {counters['unchanged']}, fallbacks {counters['fallbacks']}")
+
+
+def run_restyle_benchmark(repeat=10):
+    """Compare rebuilding the full GUI with restyling it in place (needs a display)"""
+    if ctk is None:
+        print("customtkinter is not installed")
+        return
+    try:
+        root = ctk.CTk()
+    except Exception as e:
+        print(f"No display available for the GUI benchmark: {e}")
+        return
+
+    # Headless app (no hotkeys, focus tracking or config writes) drawn into a bare window
+    app = OsuHelper(None, stats=Statistics(MemoryStatsStore()))
+    app.root = root
+    app.create_gui()
+    root.update()
+
+    schemes = list(ColorSchemes.SCHEMES)
+    sizes = [10, 12, 14, 16, 18]
+
+    def next_style(i):
+        app.color_scheme = schemes[i % len(schemes)]
+        app.font_size = sizes[i % len(sizes)]
+        app.lang.toggle()
+
+    timings = {'rebuild': [], 'restyle': []}
+    for i in range(repeat):
+        for mode, apply in (('rebuild', app.create_gui), ('restyle', app.restyle_gui)):
+            next_style(i)
+            start = time.perf_counter()
+            apply()
+            root.update_idletasks()
+            timings[mode].append((time.perf_counter() - start) * 1000)
+
+    print(f"Widgets registered: {len(app.widgets)}, passes: {repeat}")
+    for mode, values in timings.items():
+        values.sort()
+        print(f"{mode:8} mean {sum(values) / len(values):8.1f} ms   "
+              f"median {values[len(values) // 2]:8.1f} ms   max {values[-1]:8.1f} ms")
+    rebuild = sum(timings['rebuild'])
+    restyle = sum(timings['restyle'])
+    print(f"Speedup: {rebuild / restyle:.1f}x" if restyle > 0 else "Speedup: n/a")
+    app.stop_actuator()
+    root.destroy()
+
+
+def measure_import_time(args):
+    """Run `python -X importtime` and return {top-level module: cumulative ms}"""
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + args,
+                            capture_output=True, text=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        parts = line.split('|')
+        if not line.startswith('import time:') or len(parts) != 3 or 'self [us]' in line:
+            continue
+        name = parts[2][1:]
+        if name.startswith(' '):
+            continue  # Nested import, already in its parent's cumulative time
+        times[name] = times.get(name, 0) + int(parts[1]) / 1000
+    return times
+
+
+def run_import_budget(budget_ms, repeat=3):
+    """Check the entry module's import time against a budget (exit code 1 if over).
+
+    Imports the interpreter does anyway are left out; heavy optional modules
+    (LAZY_MODULES) must not be imported at all."""
+    baseline = set(measure_import_time(['-c', 'pass']))
+    best = None
+    for _ in range(repeat):
+        times = measure_import_time([os.path.abspath(__file__), '--help'])
+        own = {name: ms for name, ms in times.items() if name not in baseline}
+        if best is None or sum(own.values()) < sum(best.values()):
+            best = own
+            
+    total = sum(best.values())
+    print(f"Import time: {total:.1f} ms (budget {budget_ms:.0f} ms, best of {repeat})")
+    for name, ms in sorted(best.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {ms:8.1f} ms  {name}")
+        
+    eager = [name for name in best if name.split('.')[0] in LAZY_MODULES]
+    if eager:
+        print(f"FAIL: imported at startup: {', '.join(eager)}")
+        return 1
+    if total > budget_ms:
+        print("FAIL: over budget")
+        return 1
+    print("OK")
+    return 0
+
+
+def print_engine_log(event, data):
+    """Engine subscriber that prints log events to stdout"""
+    if event == 'log':
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] {data['message']}")
+
+
+def run_replay(path, realtime=False, verbose=False):
+    """Replay a capture headlessly and print throughput and restart decisions"""
+    replayer = FrameReplayer(path)
+    stats = Statistics(MemoryStatsStore())
+    if realtime:
+        # Realtime replay exercises the ingestion queue as well
+        app = OsuHelper(None, stats=stats)
+        engine = app.engine
+    else:
+        # Fast replay drives the decision core directly in a tight loop
+        app = engine = RestartEngine(stats=stats)
+    engine.dry_run = True
+    if verbose:
+        engine.subscribe(print_engine_log)
+    
+    elapsed = replayer.replay(app, realtime=realtime)
+    last = engine.segmenter.close()
+    if last is not None:
+        engine.finish_attempt(last)
+    
+    frames = len(replayer.frames)
+    print(f"Frames: {frames} in {elapsed:.3f}s ({frames / elapsed if elapsed > 0 else 0:.0f} frames/s)")
+    print(f"Decoder: {engine.decoder.get_counters()}")
+    if realtime:
+        print(f"Ingestion: {app.ingestor.get_metrics()}")
+    print(f"Restart decisions: {len(engine.restart_decisions)}")
+    for decision in engine.restart_decisions:
+        print(f"  +{decision['time'] - engine.restart_decisions[0]['time']:8.2f}s  "
+              f"misses={decision['misses']} 100={decision['hit100']} 50={decision['hit50']} "
+              f"progress={decision['progress']}%  {decision['map']}")
+    attempts = list(engine.segmenter.recent)
+    print(f"Attempts: {len(attempts)} ({sum(a.by_helper for a in attempts)} ended by a helper restart)")
+    for attempt in attempts:
+        print(f"  {attempt.duration:8.2f}s  progress={attempt.progress:.1f}% misses={attempt.misses} "
+              f"100={attempt.hit100} 50={attempt.hit50}{'  [helper]' if attempt.by_helper else ''}")
+    heatmap = engine.stats.get_heatmap(engine.stats.current_map_key)
+    if heatmap is not None:
+        bars, section = engine.stats.format_heatmap(heatmap)
+        if section is not None:
+            print(f"Miss heatmap: {bars}  (most at {section[0]}-{section[1]}%)")
+    print(engine.latency.report())
+
+
+def _percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def run_rule_benchmark(source, frames=200000):
+    """Time compiling a restart rule and checking it per frame"""
+    try:
+        start = time.perf_counter()
+        rule = RestartRule(source)
+        compile_ms = (time.perf_counter() - start) * 1000
+    except ValueError as e:
+        print(f"Invalid rule: {e}")
+        return
+        
+    # Frame values from synthetic gameplay, judged as RestartEngine would see them
+    gameplay = SyntheticGameplay(seed=1)
+    inputs = []
+    for _ in range(min(frames, 20000)):
+        frame = gameplay.next_frame()
+        hits = frame['play']['hits']
+        accuracy = AccuracyProjection()
+        accuracy.set_total(frame['beatmap']['stats']['objects']['total'])
+        accuracy.update(hits['300'], hits['100'], hits['50'], hits['0'])
+        progress = frame['play']['time']['current'] / frame['play']['time']['full'] * 100
+        inputs.append((hits['0'], hits['300'], hits['100'], hits['50'], progress,
+                       frame['play']['accuracy'], accuracy.value, 0.0,
+                       frame['play']['combo']['current'], frame['play']['hp']['normal'] * 100))
+    inputs = (inputs * (frames // len(inputs) + 1))[:frames]
+    
+    check = rule.check
+    start = time.perf_counter()
+    for values in inputs:
+        pass
+    loop = time.perf_counter() - start
+    start = time.perf_counter()
+    met = 0
+    for values in inputs:
+        if check(*values):
+            met += 1
+    elapsed = time.perf_counter() - start - loop
+    
+    print(f"Rule:     {rule}")
+    print(f"Compile:  {compile_ms:.3f} ms (once, when config is applied)")
+    print(f"Check:    {elapsed / frames * 1e9:.0f} ns/frame over {frames} frames, met on {met}")
+    
+    # Whole decision step on a dry-run engine (no subscribers)
+    engine = RestartEngine(stats=Statistics(MemoryStatsStore()))
+    engine.dry_run = True
+    engine.restart_rule = source
+    engine.cooldown_duration = float('inf')
+    engine.last_restart_time = engine.clock()
+    engine.compile_rule()
+    start = time.perf_counter()
+    for values in inputs:
+        engine.update_miss_count(values[0], values[2], values[3])
+    elapsed = time.perf_counter() - start
+    print(f"Decision: {elapsed / frames * 1e6:.2f} us/frame for update_miss_count with this rule")
+
+
+def _self_test_rules():
+    """Restart rule parsing and evaluation"""
+    values = dict.fromkeys(RestartRule.VARIABLES, 0)
+    
+    def check(source, **frame):
+        return RestartRule(source).check(**dict(values, **frame))
+        
+    def rejected(source):
+        try:
+            RestartRule(source)
+        except ValueError:
+            return True
+        return False
+        
+    yield "percent suffix", check("misses >= 5 or (n100 >= 10 and progress < 30%)", n100=10, progress=20)
+    yield "percent suffix before and", not check("progress < 30% and misses > 1", progress=20)
+    yield "percent between numbers rejected", rejected("misses >= 5%5")
+    yield "percent before a name rejected", rejected("misses >= 5%misses")
+    yield "division by zero is 0", check("n100 / n300 >= 0", n100=3) and not check("n100 / n300 > 0.5", n100=3)
+    yield "division", check("n100 / n300 > 0.5", n100=3, n300=4)
+    yield "calls rejected", rejected("misses >= len('x')")
+    yield "unknown names rejected", rejected("misses >= open")
+    yield "non-comparison rejected", rejected("misses + 1")
+    
+    
+def _self_test_decoder():
+    """TosuFrameDecoder top-level lookup"""
+    nested_first = ('{"state":{"number":2},"folders":{"beatmap":"123 x - y","play":1},'
+                    '"beatmap": {"id":1,"stats":{"objects":{"total":10}}},"settings":{"play":{"x":1}},'
+                    '"play":{"hits":{"0":3}},"files":{"beatmap":"x.osu"}}')
+    decoder = TosuFrameDecoder()
+    data = decoder.decode(nested_first)
+    yield "nested key before the top-level one", data == {'beatmap': {'id': 1, 'stats': {'objects': {'total': 10}}},
+                                                        'play': {'hits': {'0': 3}}}
+    yield "nested key first, no fallback", decoder.fallbacks == 0
+    yield "same frame is unchanged", decoder.decode(nested_first) is None
+    changed = nested_first.replace('"number":2', '"number":5').replace('"0":3', '"0":4')
+    yield "changed frame after cached keys", decoder.decode(changed)['play'] == {'hits': {'0': 4}}
+    yield "grown number is not a cached prefix", (
+        decoder.decode(changed.replace('{"id":1,', '{"id":12,'))['beatmap']['id'] == 12)
+    only_nested = '{"folders":{"beatmap":"x"},"play":{"hits":{}}}'
+    yield "key only nested falls back to json.loads", (
+        decoder.decode(only_nested) == json.loads(only_nested) and decoder.fallbacks == 1)
+    
+    
+def _self_test_ingestor():
+    """FrameIngestor hit signatures"""
+    ingestor = FrameIngestor(None)
+    frame = ('{"settings":{"hits":{"0":9}},"play":{"mode":{"hits":{"0":8}},"hits":{"0":2,"100":1,"50":0,"300":5},'
+             '"accuracy":99},"resultsScreen":{"hits":{"0":7}}}')
+    yield "nested hits objects before play.hits", ingestor.hits_signature(frame) == (2, 1, 0)
+    yield "unchanged hits text", ingestor.hits_signature(frame.replace('"accuracy":99', '"accuracy":98')) == (2, 1, 0)
+    yield "changed hits", ingestor.hits_signature(frame.replace('"0":2', '"0":3')) == (3, 1, 0)
+    yield "no play object", ingestor.hits_signature('{"hits":{"0":1}}') is None
+    
+    
+def run_self_test():
+    """Run the built-in checks; returns the process exit code"""
+    failed = 0
+    for group in (_self_test_rules, _self_test_decoder, _self_test_ingestor):
+        for name, passed in group():
+            failed += not passed
+            print(f"{'ok  ' if passed else 'FAIL'} {group.__doc__}: {name}")
+    print("OK" if not failed else f"{failed} failed")
+    return 1 if failed else 0
+
+
+def run_load_test(seconds, rate_hz=60, port=24050, script=None, seed=None, disconnect_every=0,
+                  precise=False):
+    """Drive a headless OsuHelper from the mock server and report throughput and latency"""
+    server = MockTosuServer(port=port, rate_hz=rate_hz, script=script, seed=seed,
+                            disconnect_every=disconnect_every)
+    server.start()
+    
+    app = OsuHelper(None, stats=Statistics(MemoryStatsStore()))
+    app.dry_run = True
+    app.tosu_url = server.url
+    app.precise_enabled = precise
+    
+    # Frame-to-decision latency: mockSentAt of the frame that triggered a restart
+    latencies = []
+    frame_sent = [0.0]
+    handle_frame = app.handle_frame
+    
+    def timed_handle_frame(raw, received_at):
+        frame_sent[0] = MockTosuServer.sent_at(raw)
+        handle_frame(raw, received_at)
+        
+    def on_engine_event(event, data):
+        if event == 'restart' and frame_sent[0]:
+            latencies.append((time.time() - frame_sent[0]) * 1000)
+        
+    app.ingestor.handler = timed_handle_frame
+    app.engine.subscribe(on_engine_event)
+    
+    app.start_monitoring()
+    time.sleep(seconds)
+    app.stop_monitoring()
+    server.stop()
+    
+    metrics = app.ingestor.get_metrics()
+    print(f"Server:    {server.frames_sent} frames sent ({server.frames_sent / seconds:.0f}/s at {server.rate_hz} Hz), "
+          f"{server.connections} connections, {server.disconnects} disconnects")
+    print(f"Helper:    {metrics['received']} received ({metrics['received'] / seconds:.0f}/s), "
+          f"{metrics['processed']} processed, {metrics['dropped']} dropped, max queue depth {metrics['max_depth']}")
+    print(f"Decoder:   {app.decoder.get_counters()}")
+    print(f"Decisions: {len(app.restart_decisions)} restarts, frame-to-decision latency "
+          f"p50 {_percentile(latencies, 50):.2f} ms, p95 {_percentile(latencies, 95):.2f} ms, "
+          f"max {max(latencies) if latencies else 0:.2f} ms")
+    connection = app.get_connection_metrics()
+    first_frame = connection['time_to_first_frame']
+    print(f"Reconnect: {connection['attempts']} attempts, {connection['connections']} connections, "
+          f"{connection['disconnected_seconds']:.2f}s disconnected, last time to first frame "
+          f"{first_frame * 1000 if first_frame is not None else 0:.1f} ms")
+    if precise:
+        window = app.engine.hit_errors
+        print(f"Precise:   {server.precise_sent} sent, {app.precise_metrics['received']} received, "
+              f"{app.precise_metrics['parsed']} parsed, {window.hits} hit errors over {window.plays} plays, "
+              f"UR {window.unstable_rate:.1f}, mean {window.mean:+.1f} ms")
+    print(app.engine.latency.report())
+
+
+def run_headless(record=None):
+    """Run against live TOSU without a window until interrupted"""
+    app = OsuHelper(None)
+    app.log_listener = print
+    if record:
+        app.recorder = FrameRecorder(record)
+        app.log_message(f"⏺ Recording frames to {record}", "blue")
+    app.persistence.start()
+    app.focus.start()
+    app.log_message("🚀 osu!helper v2.0 Enhanced Edition started (headless)", "green")
+    app.start_monitoring()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        app.stop_monitoring()
+        if app.recorder:
+            app.recorder.close()
+        app.stop_actuator()
+        app.focus.stop()
+        app.persistence.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="osu!helper v2.0 Enhanced")
+    parser.add_argument('--benchmark-decode', metavar='FRAMES',
+                        help="benchmark frame decoding on a capture or frames file and exit")
+    parser.add_argument('--benchmark-restyle', action='store_true',
+                        help="time full GUI rebuilds against in-place restyles and exit (needs a display)")
+    parser.add_argument('--benchmark-rules', metavar='RULE', nargs='?',
+                        const="misses >= 5 or (n100 >= 10 and progress < 30%)",
+                        help="time compiling and checking a restart rule per frame")
+    parser.add_argument('--self-test', action='store_true',
+                        help="run the built-in checks and exit (non-zero on failure)")
+    parser.add_argument('--import-budget', metavar='MS', type=float,
+                        help="check the module's `python -X importtime` cost against a budget and exit")
+    parser.add_argument('--record', metavar='CAPTURE',
+                        help="record every raw TOSU frame to a gzip capture file")
+    parser.add_argument('--headless', action='store_true',
+                        help="run against TOSU without a window, logging to stdout (Ctrl+C to stop)")
+    parser.add_argument('--replay', metavar='CAPTURE',
+                        help="replay a capture headlessly (no window, no key presses) and exit")
+    parser.add_argument('--realtime', action='store_true',
+                        help="with --replay: keep the original frame timing")
+    parser.add_argument('--verbose', action='store_true',
+                        help="with --replay: print the activity log while replaying")
+    parser.add_argument('--mock-tosu', action='store_true',
+                        help="run a mock TOSU server with synthetic or scripted gameplay")
+    parser.add_argument('--load-test', metavar='SECONDS', type=float,
+                        help="run a headless helper against the mock TOSU server and report metrics")
+    parser.add_argument('--mock-rate', metavar='HZ', type=int, default=60,
+                        help="mock server push rate, 10-1000 Hz (default 60)")
+    parser.add_argument('--mock-port', metavar='PORT', type=int, default=24050,
+                        help="mock server port (default 24050)")
+    parser.add_argument('--mock-script', metavar='CAPTURE',
+                        help="loop frames from a capture instead of synthetic gameplay")
+    parser.add_argument('--mock-seed', metavar='SEED', type=int,
+                        help="random seed for synthetic gameplay")
+    parser.add_argument('--mock-disconnect-every', metavar='SECONDS', type=float, default=0,
+                        help="close each client connection after this many seconds")
+    parser.add_argument('--precise', action='store_true',
+                        help="with --load-test, also stream hit errors from the precise feed")
+    args = parser.parse_args()
+    
+    if args.benchmark_decode:
+        run_decode_benchmark(args.benchmark_decode)
+        return
+        
+    if args.self_test:
+        sys.exit(run_self_test())
+        
+    if args.import_budget is not None:
+        sys.exit(run_import_budget(args.import_budget))
+        
+    if args.benchmark_restyle:
+        run_restyle_benchmark()
+        return
+        
+    if args.benchmark_rules:
+        run_rule_benchmark(args.benchmark_rules)
+        return
+        
+    if args.replay:
+        run_replay(args.replay, realtime=args.realtime, verbose=args.verbose)
+        return
+        
+    if args.mock_tosu:
+        MockTosuServer(port=args.mock_port, rate_hz=args.mock_rate, script=args.mock_script,
+                       seed=args.mock_seed, disconnect_every=args.mock_disconnect_every).serve_forever()
+        return
+        
+    if args.load_test:
+        run_load_test(args.load_test, rate_hz=args.mock_rate, port=args.mock_port,
+                      script=args.mock_script, seed=args.mock_seed,
+                      disconnect_every=args.mock_disconnect_every, precise=args.precise)
+        return
+        
+    if args.headless:
+        run_headless(record=args.record)
+        return
+        
     # Check for required dependencies
     try:
         import customtkinter
         import websocket
-        import matplotlib
         import pynput
         import psutil
         import win32gui
     except ImportError as e:
         print(f"Missing dependency: {e}")
         print("Please install required packages:")
-        print("pip install customtkinter websocket-client matplotlib pynput psutil pywin32")
+        print("pip install customtkinter websocket-client pynput psutil pywin32")
         sys.exit(1)
     
     root = ctk.CTk()
     app = OsuHelper(root)
+    if args.record:
+        app.recorder = FrameRecorder(args.record)
+        app.log_message(f"⏺ Recording frames to {args.record}", "blue")
     app.run()
+
+
+if __name__ == "__main__":
+    main()
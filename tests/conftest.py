@@ -0,0 +1,14 @@
+"""The app is a single script whose file name is not importable; load it as `osu_helper`"""
+
+import importlib.util
+import os
+import sys
+
+MODULE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "osu_helper_v2.0_enhanced.py")
+
+if "osu_helper" not in sys.modules:
+    spec = importlib.util.spec_from_file_location("osu_helper", MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["osu_helper"] = module
+    spec.loader.exec_module(module)
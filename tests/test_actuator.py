@@ -0,0 +1,50 @@
+import threading
+import time
+
+from osu_helper import RestartActuator
+
+
+def test_steps_run_in_due_order():
+    actuator = RestartActuator()
+    ran = []
+    done = threading.Event()
+    actuator.start()
+    now = time.monotonic()
+    actuator.schedule_at(now + 0.02, ran.append, 'second')
+    actuator.schedule_at(now + 0.01, ran.append, 'first')
+    actuator.schedule_at(now + 0.03, done.set)
+    assert done.wait(5)
+    actuator.stop()
+    assert ran == ['first', 'second']
+    assert actuator.executed == 3
+
+
+def test_failing_step_does_not_stop_the_timeline():
+    errors = []
+    actuator = RestartActuator(on_error=lambda func, error: errors.append((func.__name__, str(error))))
+    done = threading.Event()
+
+    def timed_out():
+        raise RuntimeError("log is gone")
+
+    actuator.start()
+    actuator.schedule(0, timed_out)
+    actuator.schedule(0.01, done.set)
+    assert done.wait(5)
+    actuator.stop()
+    assert errors == [('timed_out', "log is gone")]
+    assert actuator.errors == 1
+
+
+def test_failing_error_handler_is_ignored():
+    def on_error(func, error):
+        raise RuntimeError("shutting down")
+
+    actuator = RestartActuator(on_error=on_error)
+    done = threading.Event()
+    actuator.start()
+    actuator.schedule(0, int, 'not a number')
+    actuator.schedule(0.01, done.set)
+    assert done.wait(5)
+    actuator.stop()
+    assert actuator.errors == 1
@@ -0,0 +1,143 @@
+import pytest
+
+from osu_helper import MemoryStatsStore, RestartEngine, Statistics
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def engine():
+    engine = RestartEngine(stats=Statistics(MemoryStatsStore()))
+    engine.clock = Clock()
+    engine.miss_threshold = 3
+    engine.events = []
+    engine.subscribe(lambda event, data: engine.events.append((event, data)))
+    return engine
+
+
+def restarts(engine):
+    return [data for event, data in engine.events if event == 'restart']
+
+
+def logs_starting_with(engine, prefix):
+    return [data['message'] for event, data in engine.events
+            if event == 'log' and data['message'].startswith(prefix)]
+
+
+def frame(engine, misses, hit100=0, hit50=0, play_time=None):
+    """One gameplay frame's worth of state, as process_data would set it"""
+    if play_time is not None:
+        engine.current_play_time = play_time
+    engine.update_miss_count(misses, hit100, hit50)
+
+
+def test_restart_when_the_threshold_is_reached(engine):
+    frame(engine, 1, play_time=5000)
+    frame(engine, 2, play_time=6000)
+    assert restarts(engine) == []
+
+    frame(engine, 3, play_time=7000)
+    [restart] = restarts(engine)
+    assert restart['decision']['misses'] == 3
+    assert restart['restart_id'] == 1 and not restart['dry_run']
+    assert engine.is_restarting
+
+    # Frames during the restart are ignored
+    frame(engine, 5, play_time=7100)
+    assert len(restarts(engine)) == 1
+    assert engine.our_miss_count == 3
+
+
+def test_retry_frame_resumes_tracking(engine):
+    for misses in (1, 2, 3):
+        frame(engine, misses, play_time=7000)
+    engine.complete_restart()
+    assert engine.awaiting_retry and engine.our_miss_count == 0
+    assert engine.stats.session_stats['restarts'] == 1
+
+    # The old attempt is still on screen
+    frame(engine, 3, play_time=7200)
+    assert engine.is_restarting
+
+    # Play time jumped back: the retry started
+    frame(engine, 0, play_time=100)
+    assert not engine.is_restarting and not engine.awaiting_retry
+
+    frame(engine, 1, play_time=900)
+    assert engine.our_miss_count == 1
+
+
+def test_retry_with_zeroed_counts(engine):
+    for misses in (1, 2, 3):
+        frame(engine, misses, play_time=7000)
+    engine.complete_restart()
+    frame(engine, 0, 0, 0, play_time=7300)  # play time not reported back yet
+    assert not engine.is_restarting
+
+
+def test_end_restart_ignores_a_stale_restart_id(engine):
+    for misses in (1, 2, 3):
+        frame(engine, misses, play_time=7000)
+    assert not engine.end_restart(restart_id=engine.restart_id - 1)
+    assert engine.is_restarting
+    assert engine.end_restart(restart_id=engine.restart_id)
+    assert not engine.end_restart(restart_id=engine.restart_id)
+
+
+def test_cooldown_blocks_a_second_restart(engine):
+    engine.dry_run = True
+    engine.cooldown_duration = 10.0
+    for misses in (1, 2, 3):
+        frame(engine, misses, play_time=7000)
+    assert len(engine.restart_decisions) == 1
+
+    # Manual retry, then the threshold is reached again within the cooldown
+    engine.clock.now += 4
+    for misses in (0, 1, 2, 3, 4):
+        frame(engine, misses, play_time=1000 + misses)
+    assert len(engine.restart_decisions) == 1
+    assert len(logs_starting_with(engine, '⏳')) == 1  # cooldown_active, once
+
+    # After the cooldown the next miss restarts
+    engine.clock.now += 7
+    frame(engine, 5, play_time=2000)
+    assert len(engine.restart_decisions) == 2
+
+
+def test_blocked_restart_waits_for_a_new_miss_after_the_cooldown(engine):
+    engine.dry_run = True
+    engine.cooldown_duration = 10.0
+    for misses in (1, 2, 3):
+        frame(engine, misses, play_time=7000)
+
+    # Manual retry straight into the threshold again, inside the cooldown
+    engine.clock.now += 2
+    for misses in (0, 1, 2, 3):
+        frame(engine, misses, play_time=1000 + misses)
+    assert len(engine.restart_decisions) == 1
+
+    # Cooldown over, but nothing new was judged: no restart
+    engine.clock.now += 20
+    for play_time in (2000, 2100, 2200):
+        frame(engine, 3, play_time=play_time)
+    assert len(engine.restart_decisions) == 1
+
+    # A new 100 changes the counts and the rule is checked again
+    frame(engine, 3, hit100=1, play_time=2300)
+    assert len(engine.restart_decisions) == 2
+
+
+def test_rule_is_still_checked_on_every_frame_outside_a_cooldown(engine):
+    engine.dry_run = True
+    engine.restart_rule = "progress >= 50% and misses >= 1"
+    engine.compile_rule()
+    frame(engine, 1, play_time=1000)
+    engine.current_progress = 60.0
+    frame(engine, 1, play_time=1100)  # no new judgement, progress alone meets the rule
+    assert len(engine.restart_decisions) == 1
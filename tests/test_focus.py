@@ -0,0 +1,103 @@
+import os
+import threading
+
+import psutil
+import pytest
+
+import osu_helper
+from osu_helper import FakeFocusBackend, FocusTracker, PollFocusBackend
+
+
+@pytest.fixture
+def tracker():
+    tracker = FocusTracker(FakeFocusBackend())
+    tracker.start()
+    yield tracker
+    tracker.stop()
+
+
+def test_osu_window_is_cached_by_pid(tracker):
+    tracker.backend.set_foreground(1, 100, 'osu!.exe')
+    assert tracker.is_osu_focused()
+    assert (tracker.osu_pid, tracker.osu_hwnd, tracker.lookups) == (100, 1, 1)
+
+    # Another window of the same process: no name lookup
+    tracker.backend.set_foreground(7, 100)
+    assert tracker.is_osu_focused()
+    assert (tracker.osu_hwnd, tracker.lookups) == (7, 1)
+
+
+def test_focus_follows_foreground_changes(tracker):
+    tracker.backend.set_foreground(1, 100, 'osu!.exe')
+    tracker.backend.set_foreground(2, 200, 'explorer.exe')
+    assert not tracker.is_osu_focused()
+    assert tracker.foreground_hwnd == 2
+    assert tracker.osu_pid == 100  # still cached for the way back
+
+    tracker.backend.set_foreground(1, 100)
+    assert tracker.is_osu_focused()
+    assert (tracker.changes, tracker.lookups) == (3, 2)
+
+
+def test_new_osu_process_replaces_the_cached_pid(tracker):
+    tracker.backend.set_foreground(1, 100, 'osu!.exe')
+    tracker.backend.set_foreground(5, 300, 'osu!.exe')  # osu! restarted
+    assert (tracker.osu_pid, tracker.osu_hwnd) == (300, 5)
+    assert tracker.is_osu_focused()
+
+
+def test_unknown_pid_is_not_osu(tracker):
+    tracker.backend.set_foreground(4, 0)
+    assert not tracker.is_osu_focused()
+
+
+def test_stopped_backend_reports_nothing(tracker):
+    tracker.stop()
+    tracker.backend.set_foreground(1, 100, 'osu!.exe')
+    assert not tracker.is_osu_focused()
+    assert tracker.changes == 0
+
+
+class FakeWin32:
+    """GetForegroundWindow/GetWindowThreadProcessId over a scripted window list"""
+
+    def __init__(self, windows, pids):
+        self.windows = list(windows)
+        self.pids = pids
+        self.done = threading.Event()
+
+    def GetForegroundWindow(self):
+        if self.windows:
+            return self.windows.pop(0)
+        self.done.set()  # the poll of the last window was handled before this call
+        return None
+
+    def GetWindowThreadProcessId(self, hwnd):
+        return 0, self.pids[hwnd]
+
+
+def test_default_backend_without_pywin32_is_none(monkeypatch):
+    monkeypatch.setattr(osu_helper, 'win32gui', None)
+    monkeypatch.setattr(osu_helper, 'win32process', None)
+    assert FocusTracker.default_backend() is None
+
+
+def test_poll_fallback_reports_changes_only(monkeypatch):
+    own_pid = os.getpid()
+    win32 = FakeWin32([10, 10, 20, 20, 10], {10: own_pid, 20: own_pid + 1})
+    monkeypatch.setattr(osu_helper, 'win32gui', win32)
+    monkeypatch.setattr(osu_helper, 'win32process', win32)
+    monkeypatch.setattr(osu_helper.sys, 'platform', 'linux')
+    assert isinstance(FocusTracker.default_backend(), PollFocusBackend)
+
+    # Treat this test process as osu! so the real psutil name lookup is used
+    tracker = FocusTracker(PollFocusBackend(interval=0.001))
+    tracker.OSU_NAMES = (psutil.Process(own_pid).name(),)
+    tracker.start()
+    assert win32.done.wait(5)
+    tracker.stop()
+
+    assert tracker.changes == 3  # 10 -> 20 -> 10
+    assert tracker.lookups == 2  # the way back to 10 uses the cached PID
+    assert tracker.is_osu_focused()
+    assert (tracker.osu_pid, tracker.osu_hwnd) == (own_pid, 10)
@@ -0,0 +1,32 @@
+import random
+
+from osu_helper import ReconnectBackoff
+
+
+def test_delays_grow_exponentially_within_jitter():
+    backoff = ReconnectBackoff(base=0.5, factor=2.0, cap=30.0, rng=random.Random(1))
+    for failures in range(5):
+        ceiling = 0.5 * 2 ** failures
+        assert ceiling / 2 <= backoff.next_delay() <= ceiling
+    assert backoff.failures == 5
+
+
+def test_delays_are_capped():
+    backoff = ReconnectBackoff(base=0.5, factor=2.0, cap=3.0, rng=random.Random(2))
+    delays = [backoff.next_delay() for _ in range(20)]
+    assert max(delays) <= 3.0
+    assert min(delays[-10:]) >= 1.5
+
+
+def test_reset_starts_over():
+    backoff = ReconnectBackoff(base=1.0, factor=3.0, cap=100.0, rng=random.Random(3))
+    for _ in range(4):
+        backoff.next_delay()
+    backoff.reset()
+    assert backoff.failures == 0
+    assert backoff.next_delay() <= 1.0
+
+
+def test_jitter_spreads_clients():
+    delays = {ReconnectBackoff(rng=random.Random(seed)).next_delay() for seed in range(10)}
+    assert len(delays) == 10
@@ -0,0 +1,75 @@
+from osu_helper import Attempt, AttemptSegmenter
+
+
+def feed_all(segmenter, frames):
+    """Feed (now, map_key, play_time, progress, misses, hit100, hit50) frames; return closed attempts"""
+    closed = [segmenter.feed(*frame) for frame in frames]
+    return [attempt for attempt in closed if attempt is not None]
+
+
+def test_retry_closes_the_attempt():
+    segmenter = AttemptSegmenter()
+    closed = feed_all(segmenter, [
+        (0.0, 'a', 1000, 1.0, 0, 0, 0),
+        (1.0, 'a', 9000, 9.0, 2, 3, 1),
+        (2.0, 'a', 200, 0.2, 2, 3, 1),  # play time jumped back
+    ])
+    [attempt] = closed
+    assert (attempt.map_key, attempt.start, attempt.end) == ('a', 0.0, 1.0)
+    assert (attempt.play_time, attempt.progress, attempt.misses, attempt.hit100, attempt.hit50) == (9000, 9.0, 2, 3, 1)
+    assert segmenter.current.start == 2.0
+
+
+def test_map_change_and_zeroed_counts_close_the_attempt():
+    segmenter = AttemptSegmenter()
+    closed = feed_all(segmenter, [
+        (0.0, 'a', 1000, 1.0, 1, 0, 0),
+        (1.0, 'b', 1500, 1.0, 1, 0, 0),   # map changed
+        (2.0, 'b', 3000, 2.0, 4, 2, 0),
+        (3.0, 'b', 3100, 2.1, 0, 2, 0),   # misses went down
+    ])
+    assert [(attempt.map_key, attempt.misses) for attempt in closed] == [('a', 1), ('b', 4)]
+    assert segmenter.finished == 2
+
+
+def test_small_play_time_wobble_is_not_a_retry():
+    segmenter = AttemptSegmenter()
+    closed = feed_all(segmenter, [
+        (0.0, 'a', 5000, 5.0, 0, 0, 0),
+        (0.1, 'a', 5000 - AttemptSegmenter.REWIND_MS + 1, 5.0, 0, 0, 0),
+    ])
+    assert closed == []
+
+
+def test_empty_attempts_are_dropped():
+    segmenter = AttemptSegmenter()
+    assert feed_all(segmenter, [(0.0, 'a', 0, 0.0, 0, 0, 0), (1.0, 'b', 0, 0.0, 0, 0, 0)]) == []
+    assert segmenter.close() is None
+    assert segmenter.finished == 0
+
+
+def test_helper_restart_is_marked():
+    segmenter = AttemptSegmenter(capacity=2)
+    segmenter.feed(0.0, 'a', 4000, 4.0, 5, 0, 0)
+    segmenter.mark_restart()
+    attempt = segmenter.close()
+    assert attempt.by_helper
+    assert list(segmenter.recent) == [attempt]
+
+
+def test_recent_attempts_are_bounded():
+    segmenter = AttemptSegmenter(capacity=2)
+    for index in range(3):
+        segmenter.feed(float(index), 'a', 1000, 1.0, index + 1, 0, 0)
+        segmenter.close()
+    assert [attempt.misses for attempt in segmenter.recent] == [2, 3]
+
+
+def test_attempt_list_round_trip():
+    attempt = Attempt('a', 1.23456)
+    attempt.end = 5.0
+    attempt.progress = 33.333
+    attempt.misses = 4
+    attempt.by_helper = True
+    copy = Attempt.from_list(attempt.to_list())
+    assert copy.to_list() == ['a', 1.235, 5.0, 0, 33.3, 4, 0, 0, True]
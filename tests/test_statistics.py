@@ -0,0 +1,136 @@
+import json
+
+import pytest
+
+from osu_helper import Statistics, StatsStore
+
+
+def make_store(tmp_path):
+    return StatsStore(snapshot_path=str(tmp_path / "stats.json"), log_path=str(tmp_path / "stats.log"),
+                      archive_path=str(tmp_path / "stats_archive.log"))
+
+
+def log_seqs(tmp_path):
+    with open(tmp_path / "stats.log", encoding="utf-8") as f:
+        return [json.loads(line)['seq'] for line in f]
+
+
+def test_failed_compaction_does_not_requeue_appended_records(tmp_path):
+    stats = Statistics(make_store(tmp_path))
+    stats.store.COMPACT_RECORDS = 0  # compact on every save
+    real_compact = stats.store.compact
+
+    def compact(state, archive=()):
+        raise PermissionError("snapshot is locked")
+    stats.store.compact = compact
+
+    stats.add_restart()
+    with pytest.raises(PermissionError):
+        stats.save_stats()
+    assert log_seqs(tmp_path) == [1]
+    assert Statistics(make_store(tmp_path)).all_time_stats['restarts'] == 1
+
+    # The next save retries the compaction without writing the restart again
+    stats.store.compact = real_compact
+    stats.save_stats()
+    assert log_seqs(tmp_path) == []
+    assert Statistics(make_store(tmp_path)).all_time_stats['restarts'] == 1
+
+
+def test_compaction_failing_after_snapshot_replace(tmp_path):
+    stats = Statistics(make_store(tmp_path))
+    stats.add_restart()
+    stats.save_stats()
+
+    # Snapshot written, then truncating the log fails
+    log_path = tmp_path / "stats.log"
+    real_compact = stats.store.compact
+
+    def compact(state, archive=()):
+        data = log_path.read_bytes()
+        real_compact(state, archive)
+        log_path.write_bytes(data)
+        raise PermissionError("log is locked")
+    stats.store.compact = compact
+    stats.store.COMPACT_RECORDS = 0
+
+    stats.add_restart()
+    with pytest.raises(PermissionError):
+        stats.save_stats()
+
+    assert log_seqs(tmp_path) == [1, 2]
+    assert Statistics(make_store(tmp_path)).all_time_stats['restarts'] == 2
+
+
+def test_failed_append_is_retried_with_the_same_seq(tmp_path):
+    stats = Statistics(make_store(tmp_path))
+    real_append = stats.store.append
+
+    def append(records):
+        # The write reaches the disk, then fsync fails
+        real_append(records)
+        raise OSError("fsync failed")
+    stats.store.append = append
+
+    stats.add_restart()
+    with pytest.raises(OSError):
+        stats.save_stats()
+    stats.store.append = real_append
+    stats.save_stats()
+
+    assert log_seqs(tmp_path) == [1, 1]
+    assert Statistics(make_store(tmp_path)).all_time_stats['restarts'] == 1
+
+
+def read_csv_counts(path):
+    with open(path, encoding="utf-8") as f:
+        return [int(line.split(',')[1]) for line in f.read().splitlines()[1:]]
+
+
+def test_compaction_archives_old_entries_and_exports_keep_them(tmp_path, monkeypatch):
+    monkeypatch.setattr(Statistics, 'MISS_LOG_LIMIT', 5)
+    stats = Statistics(make_store(tmp_path))
+    stats.store.COMPACT_RECORDS = 4
+    for count in range(1, 13):
+        stats.add_miss(count, "map")
+        stats.save_stats()
+
+    assert len(stats.all_time_stats['misses']) <= 5 + stats.store.COMPACT_RECORDS
+    stats.export_csv(str(tmp_path / "all.csv"))
+    assert read_csv_counts(tmp_path / "all.csv") == list(range(1, 13))
+
+    reloaded = Statistics(make_store(tmp_path))
+    assert reloaded.all_time_stats['miss_stats'].count == 12
+    reloaded.export_csv(str(tmp_path / "reloaded.csv"))
+    assert read_csv_counts(tmp_path / "reloaded.csv") == list(range(1, 13))
+    reloaded.export_json(str(tmp_path / "all.json"))
+    with open(tmp_path / "all.json", encoding="utf-8") as f:
+        assert [miss['count'] for miss in json.load(f)['misses']] == list(range(1, 13))
+
+
+def test_unfinished_compaction_leaves_no_archive_duplicates(tmp_path, monkeypatch):
+    monkeypatch.setattr(Statistics, 'MISS_LOG_LIMIT', 2)
+    stats = Statistics(make_store(tmp_path))
+    for count in range(1, 6):
+        stats.add_miss(count, "map")
+    stats.save_stats()
+
+    # Archive written, then the snapshot replace fails
+    def replace(src, dst):
+        raise PermissionError("snapshot is locked")
+    monkeypatch.setattr("osu_helper.os.replace", replace)
+    stats.store.COMPACT_RECORDS = 0
+    with pytest.raises(PermissionError):
+        stats.save_stats()
+    assert (tmp_path / "stats_archive.log").stat().st_size > 0
+    monkeypatch.undo()
+
+    reloaded = Statistics(make_store(tmp_path))
+    assert (tmp_path / "stats_archive.log").stat().st_size == 0
+    reloaded.export_csv(str(tmp_path / "all.csv"))
+    assert read_csv_counts(tmp_path / "all.csv") == [1, 2, 3, 4, 5]
+
+    # The live instance retries and archives each entry once
+    stats.save_stats()
+    stats.export_csv(str(tmp_path / "live.csv"))
+    assert read_csv_counts(tmp_path / "live.csv") == [1, 2, 3, 4, 5]
@@ -0,0 +1,87 @@
+import json
+
+from osu_helper import StatsStore
+
+
+def make_store(tmp_path):
+    return StatsStore(snapshot_path=str(tmp_path / "stats.json"), log_path=str(tmp_path / "stats.log"),
+                      archive_path=str(tmp_path / "stats_archive.log"))
+
+
+def test_load_without_files(tmp_path):
+    store = make_store(tmp_path)
+    assert store.load() == (None, [])
+    assert store.seq == 0
+
+
+def test_appended_records_load_in_order(tmp_path):
+    store = make_store(tmp_path)
+    store.append([{'type': 'restart'}, {'type': 'miss', 'count': 1}])
+    store.append([{'type': 'restart'}])
+
+    snapshot, records = make_store(tmp_path).load()
+    assert snapshot is None
+    assert [record['seq'] for record in records] == [1, 2, 3]
+    assert records[1]['count'] == 1
+
+
+def test_torn_last_line_is_cut_off(tmp_path):
+    store = make_store(tmp_path)
+    store.append([{'type': 'restart'}, {'type': 'restart'}])
+    with open(tmp_path / "stats.log", 'ab') as f:
+        f.write(b'{"type":"restart","se')  # crash in the middle of a write
+
+    store = make_store(tmp_path)
+    snapshot, records = store.load()
+    assert [record['seq'] for record in records] == [1, 2]
+
+    # The next append starts on a clean line
+    store.append([{'type': 'restart'}])
+    assert [record['seq'] for record in make_store(tmp_path).load()[1]] == [1, 2, 3]
+
+
+def test_compaction_replaces_the_log_with_a_snapshot(tmp_path):
+    store = make_store(tmp_path)
+    store.append([{'type': 'restart'}, {'type': 'restart'}])
+    store.compact({'restarts': 2})
+    assert (tmp_path / "stats.log").read_text() == ""
+    assert (store.log_records, store.log_bytes) == (0, 0)
+    store.append([{'type': 'restart'}])
+
+    snapshot, records = make_store(tmp_path).load()
+    assert snapshot == {'restarts': 2}
+    assert [record['seq'] for record in records] == [3]
+
+
+def test_log_left_behind_by_a_compaction_is_not_replayed(tmp_path):
+    store = make_store(tmp_path)
+    store.append([{'type': 'restart'}, {'type': 'restart'}])
+    log = (tmp_path / "stats.log").read_bytes()
+    store.compact({'restarts': 2})
+    (tmp_path / "stats.log").write_bytes(log)  # crash before the log was truncated
+
+    snapshot, records = make_store(tmp_path).load()
+    assert snapshot == {'restarts': 2}
+    assert records == []
+
+
+def test_compaction_threshold(tmp_path):
+    store = make_store(tmp_path)
+    store.COMPACT_RECORDS = 3
+    store.append([{'type': 'restart'}] * 2)
+    assert not store.needs_compaction
+    store.append([{'type': 'restart'}])
+    assert store.needs_compaction
+
+
+def test_archive_is_written_before_the_snapshot(tmp_path):
+    store = make_store(tmp_path)
+    store.compact({'misses': []}, archive=[{'type': 'miss', 'count': 1}])
+    store.compact({'misses': []}, archive=[{'type': 'miss', 'count': 2}])
+
+    store = make_store(tmp_path)
+    snapshot, _ = store.load()
+    assert 'archive_bytes' not in snapshot
+    assert [record['count'] for record in store.archived()] == [1, 2]
+    with open(tmp_path / "stats.json", encoding="utf-8") as f:
+        assert json.load(f)['archive_bytes'] == (tmp_path / "stats_archive.log").stat().st_size
@@ -0,0 +1,45 @@
+from osu_helper import TimeSeriesBuffer
+
+
+def test_view_is_in_time_order_before_wrapping():
+    buffer = TimeSeriesBuffer(capacity=8)
+    for t in range(3):
+        buffer.append(float(t), t * 10.0)
+    times, values = buffer.view()
+    assert list(times) == [0.0, 1.0, 2.0]
+    assert list(values) == [0.0, 10.0, 20.0]
+    assert buffer.latest() == (2.0, 20.0)
+
+
+def test_ring_without_downsampling_keeps_the_newest_points():
+    buffer = TimeSeriesBuffer(capacity=4, downsample=False)
+    for t in range(10):
+        buffer.append(float(t), float(t))
+    times, values = buffer.view()
+    assert list(times) == [6.0, 7.0, 8.0, 9.0]
+    assert len(buffer) == 4
+    assert buffer.total_appended == 10
+
+
+def test_downsampling_covers_the_whole_session_in_fixed_memory():
+    buffer = TimeSeriesBuffer(capacity=16)
+    for t in range(1000):
+        buffer.append(float(t), float(t))
+    times, values = buffer.view()
+    times = list(times)
+
+    assert len(buffer) <= 16
+    assert times == sorted(times)
+    assert times[0] < 100           # history (averaged) reaches back to the start
+    assert times[-8:] == [float(t) for t in range(992, 1000)]  # newest half at full resolution
+    assert list(values) == times    # averaging keeps (t, t) on the diagonal
+
+
+def test_clear():
+    buffer = TimeSeriesBuffer(capacity=8)
+    for t in range(20):
+        buffer.append(float(t), 1.0)
+    buffer.clear()
+    assert len(buffer) == 0
+    assert buffer.latest() is None
+    assert list(buffer.view()[0]) == []